@@ -2,6 +2,7 @@
 Django settings for task_management project.
 """
 
+import os
 from pathlib import Path
 from datetime import timedelta
 
@@ -32,20 +33,27 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # First, so its timings cover the other middleware too
+    'tasks.middleware.RequestProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'tasks.middleware.replica_routing_middleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
 ROOT_URLCONF = 'task_management.urls'
 
+# Compiled templates are kept in memory: without an explicit 'loaders'
+# option Django 4.2 wraps the filesystem and app loaders in the cached
+# loader, and with DEBUG on it still reloads templates when they change
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates timing the templates of profiled requests (tasks/profiling.py)
+        'BACKEND': 'tasks.profiling.ProfiledDjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -65,13 +73,79 @@ WSGI_APPLICATION = 'task_management.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
+# Write transactions take SQLite's write lock at BEGIN and wait up to
+# 'timeout' seconds for it. With a deferred BEGIN, an update whose search
+# index triggers (migration 0007) read before they write could not wait
+# for the lock and failed at once with "database is locked".
+SQLITE_DEFAULT_OPTIONS = {
+    'timeout': 20,
+    'transaction_mode': 'IMMEDIATE',
+}
+
+# Django's SQLite backend with extra OPTIONS for concurrent writers
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'tasks.sqlite_backend',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': dict(SQLITE_DEFAULT_OPTIONS),
+        # A file, so tests can run concurrent writers against it
+        'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
     }
 }
 
+# Production mode for SQLite (SQLITE_PRODUCTION_MODE=1) adds to the above:
+# WAL lets reads run during writes, and a BEGIN that still finds the
+# database locked after the timeout is retried a few times.
+SQLITE_PRODUCTION_OPTIONS = {
+    **SQLITE_DEFAULT_OPTIONS,
+    'lock_retries': 3,
+    'pragmas': {
+        'journal_mode': 'WAL',
+        # A power loss may drop the last commits but cannot corrupt a WAL database
+        'synchronous': 'NORMAL',
+        'mmap_size': 256 * 1024 * 1024,
+    },
+}
+if os.environ.get('SQLITE_PRODUCTION_MODE') == '1':
+    DATABASES['default']['OPTIONS'] = SQLITE_PRODUCTION_OPTIONS
+
+# Read replicas (see tasks/routers.py): reads made while serving requests go
+# to these aliases, writes and everything else to 'default'. To try it
+# locally, point REPLICA_DATABASE_PATH at a second SQLite file and keep it
+# copied from the primary with `python manage.py sync_replicas --interval 5`
+REPLICA_DATABASE_PATH = os.environ.get('REPLICA_DATABASE_PATH')
+if REPLICA_DATABASE_PATH:
+    DATABASES['replica'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': REPLICA_DATABASE_PATH,
+        'TEST': {'MIRROR': 'default'},
+    }
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['tasks.routers.PrimaryReplicaRouter']
+
+# Replicas whose replication heartbeat is older than this are not read;
+# after a write, the user's reads stay on the primary for as long
+REPLICA_MAX_LAG_SECONDS = 10
+# Seconds between replica heartbeat checks in each process
+REPLICA_LAG_CHECK_INTERVAL = 2
+
+
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+# Seconds dashboard statistics are served from cache (see tasks/stats.py)
+DASHBOARD_STATS_CACHE_TIMEOUT = 30
+
+# Seconds rendered panel list tables are cached (see tasks/fragments.py);
+# writes switch to a new cache key at once, so this only bounds memory use
+PANEL_FRAGMENT_CACHE_TIMEOUT = 600
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -120,14 +194,133 @@ AUTH_USER_MODEL = 'tasks.CustomUser'
 
 # REST Framework Configuration
 REST_FRAMEWORK = {
+    # Builds request.user from the token's role claims instead of loading it
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'tasks.authentication.StatelessJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
+    # ORJSONRenderer falls back to the stock JSONRenderer when orjson is
+    # missing; swap in 'rest_framework.renderers.JSONRenderer' to opt out
+    'DEFAULT_RENDERER_CLASSES': (
+        'tasks.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+}
+
+# Bulk task creation (POST /api/tasks/bulk/)
+TASKS_BULK_CREATE_MAX_ITEMS = 10000
+TASKS_BULK_CREATE_BATCH_SIZE = 500
+TASKS_BULK_CREATE_MAX_BATCH_SIZE = 2000
+
+# Batch task updates (PUT /api/tasks/batch/)
+TASKS_BATCH_UPDATE_MAX_ITEMS = 500
+
+# Streaming task exports: rows fetched from the database and written per chunk
+TASKS_EXPORT_CHUNK_SIZE = 2000
+
+# Panel task lists count filtered results up to this many rows ("1000+")
+PANEL_TASK_COUNT_LIMIT = 1000
+
+# Delta sync (GET /api/tasks/changes/, tasks/changes.py): changes per
+# response, and days change log rows are kept by prune_task_changes;
+# clients whose cursors are older must download the full list again
+TASKS_CHANGES_PAGE_SIZE = 500
+TASKS_CHANGES_MAX_PAGE_SIZE = 2000
+TASKS_CHANGE_LOG_RETENTION_DAYS = 30
+
+# Task search (GET /api/tasks/search/ and the panel task lists)
+TASKS_SEARCH_RESULTS = 20
+TASKS_SEARCH_MAX_RESULTS = 100
+# Queries matching more tasks than this are returned newest first, unranked
+TASKS_SEARCH_RANK_LIMIT = 1000
+# Largest user set named in a scoped search expression
+TASKS_SEARCH_MAX_SCOPE_USERS = 200
+
+# Completed-task analytics (GET /api/analytics/tasks/, tasks/rollups.py)
+# Buckets returned when no date range is given, and the most per request
+TASKS_ANALYTICS_DEFAULT_BUCKETS = 12
+TASKS_ANALYTICS_MAX_BUCKETS = 366
+# Weeks shown in the dashboard widgets
+TASKS_ANALYTICS_WIDGET_WEEKS = 8
+
+# Server-Sent Events of task writes (GET /api/events/, /panel/events/,
+# tasks/events.py). The in-process broker only reaches streams served by
+# the same process; run one ASGI worker or plug in a shared broker
+TASKS_EVENT_BROKER = 'tasks.events.InProcessBroker'
+# Seconds between heartbeat comments on idle streams
+TASKS_EVENTS_HEARTBEAT_SECONDS = 15
+# Seconds before a stream is closed and the client reconnects
+TASKS_EVENTS_MAX_STREAM_SECONDS = 300
+# Latest events kept for clients reconnecting with Last-Event-ID
+TASKS_EVENTS_REPLAY_SIZE = 1000
+# Undelivered events per stream before it is closed as too slow
+TASKS_EVENTS_QUEUE_SIZE = 100
+
+# Background jobs run after the write that queued them commits (tasks/jobs.py).
+# With JOBS_RUN_INLINE, on by default in development, the writing process
+# runs them right after its commit; otherwise run `manage.py run_jobs` next
+# to the web server, or analytics stop updating and the job table grows
+JOBS_RUN_INLINE = DEBUG
+# Jobs of each queue running at once, across all workers
+JOBS_QUEUE_CONCURRENCY = {
+    'default': 4,
+    # SQLite runs one write transaction at a time anyway, and concurrent
+    # read-then-write jobs in deferred transactions fail each other
+    'rollups': 1,
+}
+# Attempts before a job is left as failed, and seconds before the first
+# retry, doubled for each further one
+JOBS_MAX_ATTEMPTS = 5
+JOBS_RETRY_DELAY = 5
+# Seconds an idle worker waits before looking for due jobs again
+JOBS_POLL_INTERVAL = 1
+# Seconds after which a running job's worker is assumed dead and the job
+# is queued again
+JOBS_RUNNING_TIMEOUT = 600
+
+# Per-request profiling (tasks/profiling.py): SQL, template and response
+# rendering times in a Server-Timing header and a 'tasks.profiling' log line.
+# SuperAdmins switch it at runtime with PUT /api/profiling/ for a limited
+# time; processes reread the switch from the cache every CHECK_INTERVAL
+# seconds, so several server processes need a shared cache
+REQUEST_PROFILING_ENABLED = os.environ.get('REQUEST_PROFILING') == '1'
+REQUEST_PROFILING_CHECK_INTERVAL = 5
+# Seconds a runtime switch holds by default and at most
+REQUEST_PROFILING_SWITCH_SECONDS = 3600
+REQUEST_PROFILING_MAX_SWITCH_SECONDS = 24 * 3600
+# Requests slower than this are logged as warnings and, when sampled, dumped
+REQUEST_PROFILING_SLOW_MS = 500
+# Share of profiled requests run under a profiler: 'cprofile' writes .prof
+# files for pstats/snakeviz, 'pyinstrument' (when installed) HTML pages
+REQUEST_PROFILING_SAMPLE_RATE = 0.0
+REQUEST_PROFILING_PROFILER = 'cprofile'
+REQUEST_PROFILING_DUMP_DIR = BASE_DIR / 'profiles'
+
+# Profiling log lines go to the console
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'tasks.profiling': {'handlers': ['console'], 'level': 'INFO', 'propagate': False},
+    },
 }
 
+# Serve GET /api/tasks/, PUT /api/tasks/{id}/ and GET /api/tasks/{id}/report/
+# with the async views in tasks/async_api_views.py. Only worth enabling
+# under an ASGI server; compare with `manage.py benchmark_asgi`
+TASKS_ASYNC_API_VIEWS = False
+
+# Per-process LRU of user token versions and roles checked on every API
+# request (tasks/authentication.py); other processes notice a revoked
+# token within the timeout, in seconds
+JWT_USER_STATE_CACHE_SIZE = 10000
+JWT_USER_STATE_CACHE_TIMEOUT = 60
+
 # JWT Settings
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(hours=5),
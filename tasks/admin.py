@@ -1,6 +1,6 @@
 from django.contrib import admin
-from .models import CustomUser, Task
+from .models import CustomUser, Task, UserTaskStats
 
 admin.site.register(CustomUser)
 admin.site.register(Task)
-
+admin.site.register(UserTaskStats)
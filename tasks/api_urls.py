@@ -1,12 +1,28 @@
+from django.conf import settings
 from django.urls import path
 from rest_framework_simplejwt.views import TokenRefreshView
 from .api_views import (
     CustomTokenObtainPairView,
     get_tasks,
+    get_task_changes,
+    search_tasks,
     update_task,
-    get_task_report
+    get_task_report,
+    bulk_create_tasks,
+    batch_update_tasks,
+    export_tasks,
+    task_analytics,
+    task_analytics_users,
+    job_metrics,
+    request_profiling
 )
 
+# Event streams are async-only
+from .async_api_views import task_events
+
+if settings.TASKS_ASYNC_API_VIEWS:
+    from .async_api_views import get_tasks, update_task, get_task_report
+
 urlpatterns = [
     # JWT Authentication endpoints
     path('token/', CustomTokenObtainPairView.as_view(), name='token_obtain_pair'),
@@ -14,7 +30,25 @@ urlpatterns = [
     
     # Task API endpoints
     path('tasks/', get_tasks, name='api_get_tasks'),
+    path('tasks/changes/', get_task_changes, name='api_get_task_changes'),
+    path('tasks/search/', search_tasks, name='api_search_tasks'),
+    path('tasks/bulk/', bulk_create_tasks, name='api_bulk_create_tasks'),
+    path('tasks/batch/', batch_update_tasks, name='api_batch_update_tasks'),
+    path('tasks/export/', export_tasks, name='api_export_tasks'),
     path('tasks/<int:id>/', update_task, name='api_update_task'),
     path('tasks/<int:id>/report/', get_task_report, name='api_task_report'),
+    
+    # Server-Sent Events of task writes (ASGI only)
+    path('events/', task_events, name='api_task_events'),
+    
+    # Completed-task analytics, read from the rollup tables
+    path('analytics/tasks/', task_analytics, name='api_task_analytics'),
+    path('analytics/tasks/users/', task_analytics_users, name='api_task_analytics_users'),
+    
+    # Background job queue depths
+    path('jobs/metrics/', job_metrics, name='api_job_metrics'),
+    
+    # Runtime switch of per-request profiling
+    path('profiling/', request_profiling, name='api_request_profiling'),
 ]
 
@@ -1,21 +1,73 @@
+import hashlib
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
 from rest_framework import status
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, parser_classes, permission_classes
+from rest_framework.parsers import JSONParser
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from rest_framework_simplejwt.views import TokenObtainPairView
-from .models import Task
+from .changes import (
+    changes_since, cursor_expired, encode_cursor, latest_change_id, parse_cursor, record_task_changes
+)
+from .counters import apply_created_tasks, apply_task_changes
+from .events import publish_task_events, task_event_data
+from .exports import EXPORT_FORMATS, export_response, parse_export_filters
+from .jobs import queue_metrics
+from .models import CustomUser, Task, UserTaskStats
+from .pagination import TaskCursorPagination
+from . import profiling
+from .rollups import (
+    defer_rollup_changes, loaded_rollup_state, parse_analytics_params, parse_day, parse_period,
+    period_start, rollup_series, task_rollup_state, user_rollups
+)
+from . import search
+from .parsers import NDJSONParser
 from .serializers import (
+    CustomTokenObtainPairSerializer,
     TaskSerializer, 
     TaskUpdateSerializer, 
-    TaskReportSerializer
+    TaskReportSerializer,
+    ValuesSerializer,
+    TaskBulkCreateSerializer
 )
+from .stats import invalidate_task_stats
 
 
 class CustomTokenObtainPairView(TokenObtainPairView):
     """
     Custom JWT Token view - Returns JWT tokens for authentication
+    The tokens carry role claims (see CustomTokenObtainPairSerializer)
+    """
+    serializer_class = CustomTokenObtainPairSerializer
+
+
+def _conditional_response(request, etag, last_modified):
     """
-    pass
+    304 response when the client's If-None-Match / If-Modified-Since
+    validators still match, otherwise None
+    """
+    response = get_conditional_response(
+        request,
+        etag=etag,
+        last_modified=int(last_modified.timestamp()) if last_modified else None,
+    )
+    if response is not None:
+        _set_validators(response, etag, last_modified)
+    return response
+
+
+def _set_validators(response, etag, last_modified):
+    response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+    # Clients may keep the response but must revalidate before reuse
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
 
 
 @api_view(['GET'])
@@ -25,6 +77,12 @@ def get_tasks(request):
     GET /api/tasks
     Fetch all tasks assigned to the logged-in user
     Only returns tasks for the logged user who is sending the request
+    Results are cursor paginated: ?ordering=-created_at|due_date|status,
+    ?page_size=N and the opaque ?cursor= from the next/prev links
+    Supports conditional GET: the ETag changes whenever any of the user's
+    tasks is written, so unchanged lists are answered with 304
+    ?fields=a,b or ?exclude=a,b limits the serialized fields and the
+    columns read, e.g. ?exclude=description for list screens
     """
     # Only regular users can access this endpoint
     if not request.user.is_regular_user():
@@ -33,9 +91,273 @@ def get_tasks(request):
             status=status.HTTP_403_FORBIDDEN
         )
     
-    tasks = Task.objects.filter(assigned_to=request.user)
-    serializer = TaskSerializer(tasks, many=True)
-    return Response(serializer.data, status=status.HTTP_200_OK)
+    # Per-user task version, bumped on every write (see tasks/counters.py)
+    validator = UserTaskStats.objects.filter(user_id=request.user.id).values_list(
+        'tasks_version', 'tasks_modified_at'
+    ).first()
+    etag = last_modified = None
+    if validator is not None:
+        version, last_modified = validator
+        page_key = hashlib.md5(request.get_full_path().encode()).hexdigest()[:16]
+        etag = quote_etag(f'{request.user.id}-{version}-{page_key}')
+        not_modified = _conditional_response(request, etag, last_modified)
+        if not_modified is not None:
+            return not_modified
+    
+    try:
+        fields = TaskSerializer.select_fields(request.query_params)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    
+    paginator = TaskCursorPagination()
+    serializer = ValuesSerializer(TaskSerializer, fields=fields)
+    # The sort key and id are read from the page edges to build the cursors
+    tasks = serializer.values(
+        Task.objects.filter(assigned_to_id=request.user.id),
+        required=['id', paginator.get_ordering(request).lstrip('-')],
+    )
+    page = paginator.paginate_queryset(tasks, request)
+    response = paginator.get_paginated_response(serializer.serialize(page))
+    if etag is not None:
+        _set_validators(response, etag, last_modified)
+    return response
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_task_changes(request):
+    """
+    GET /api/tasks/changes?since=<cursor>
+    Tasks of the logged-in user written since the cursor, for offline sync
+    Returns the current state of created or updated tasks in "changes",
+    the ids of tasks deleted or reassigned away in "deleted" and the
+    cursor for the next sync. Without ?since= only the current cursor is
+    returned: take it, then download the full list from GET /api/tasks.
+    With "has_more" true, call again with the new cursor straight away.
+    Cursors older than TASKS_CHANGE_LOG_RETENTION_DAYS get 410 Gone and
+    the client must download the full list again.
+    ?page_size=N limits the changes per response; ?fields= / ?exclude=
+    work like the task list
+    """
+    # Only regular users can access this endpoint
+    if not request.user.is_regular_user():
+        return Response(
+            {'error': 'This endpoint is only accessible to regular users.'},
+            status=status.HTTP_403_FORBIDDEN
+        )
+    
+    since = request.query_params.get('since')
+    if since is None:
+        cursor = encode_cursor(latest_change_id(request.user.id))
+        return Response(
+            {'changes': [], 'deleted': [], 'cursor': cursor, 'has_more': False},
+            status=status.HTTP_200_OK
+        )
+    
+    try:
+        change_id, issued_at = parse_cursor(since)
+        fields = TaskSerializer.select_fields(request.query_params)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    if cursor_expired(issued_at):
+        return Response(
+            {'error': 'The cursor has expired. Download the full task list and sync from a new cursor.'},
+            status=status.HTTP_410_GONE
+        )
+    
+    try:
+        page_size = int(request.query_params.get('page_size', settings.TASKS_CHANGES_PAGE_SIZE))
+    except ValueError:
+        page_size = settings.TASKS_CHANGES_PAGE_SIZE
+    page_size = max(1, min(page_size, settings.TASKS_CHANGES_MAX_PAGE_SIZE))
+    
+    changed_ids, deleted_ids, last_id, has_more = changes_since(request.user.id, change_id, page_size)
+    serializer = ValuesSerializer(TaskSerializer, fields=fields)
+    rows = {}
+    if changed_ids:
+        rows = {
+            row['id']: row for row in serializer.values(
+                Task.objects.filter(assigned_to_id=request.user.id, id__in=changed_ids), required=['id']
+            )
+        }
+    # Tasks deleted or reassigned since the change was logged; a later
+    # change in the log records that too
+    deleted_ids += [task_id for task_id in changed_ids if task_id not in rows]
+    tasks = [rows[task_id] for task_id in changed_ids if task_id in rows]
+    
+    return Response(
+        {
+            'changes': serializer.serialize(tasks),
+            'deleted': deleted_ids,
+            # Rows after last_id may be as old as the incoming cursor, so
+            # its issue time carries over until the log is drained
+            'cursor': encode_cursor(last_id, issued_at if has_more else None),
+            'has_more': has_more,
+        },
+        status=status.HTTP_200_OK
+    )
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def search_tasks(request):
+    """
+    GET /api/tasks/search?q=...
+    Full-text search over task titles, descriptions and completion reports
+    Users search their own tasks, Admins the tasks of their users and
+    SuperAdmins all tasks. Returns the best ?limit=N matches (default 20,
+    maximum 100); "ranked" is false when the query matched too many tasks
+    to rank and the newest matches are returned instead.
+    Supports ?fields= / ?exclude= like the task list
+    """
+    query = request.query_params.get('q', '').strip()
+    if not query:
+        return Response(
+            {'error': 'The q parameter is required.'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    try:
+        fields = TaskSerializer.select_fields(request.query_params)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    
+    try:
+        limit = int(request.query_params.get('limit', settings.TASKS_SEARCH_RESULTS))
+    except ValueError:
+        limit = settings.TASKS_SEARCH_RESULTS
+    limit = min(max(limit, 1), settings.TASKS_SEARCH_MAX_RESULTS)
+    
+    # Same scoping as get_tasks and get_task_report
+    if request.user.is_regular_user():
+        tasks, user_ids = Task.objects.filter(assigned_to_id=request.user.id), [request.user.id]
+    elif request.user.is_admin():
+        tasks, user_ids = Task.objects.for_admin(request.user.id), search.admin_search_scope(request.user.id)
+    elif request.user.is_superadmin():
+        tasks, user_ids = Task.objects.all(), None
+    else:
+        return Response(
+            {'error': 'You do not have permission to search tasks.'},
+            status=status.HTTP_403_FORBIDDEN
+        )
+    
+    tasks, ranked = search.search_tasks(tasks, query, user_ids)
+    serializer = ValuesSerializer(TaskSerializer, fields=fields)
+    results = serializer.serialize(serializer.values(tasks)[:limit])
+    return Response({'query': query, 'ranked': ranked, 'results': results}, status=status.HTTP_200_OK)
+
+
+def _analytics_scope(request):
+    """
+    Rollup (scope, scope_id) requested with ?admin= / ?user=, or an error Response
+    SuperAdmins see everyone by default, Admins their own users
+    """
+    try:
+        admin_id = int(request.query_params['admin']) if request.query_params.get('admin') else None
+        user_id = int(request.query_params['user']) if request.query_params.get('user') else None
+    except ValueError:
+        return Response({'error': 'admin and user must be ids.'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    if request.user.is_admin():
+        if admin_id not in (None, request.user.id):
+            return Response(
+                {'error': 'Admins can only view analytics of their own users.'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        admin_id = request.user.id
+    elif not request.user.is_superadmin():
+        return Response(
+            {'error': 'This endpoint is only accessible to Admins and SuperAdmins.'},
+            status=status.HTTP_403_FORBIDDEN
+        )
+    
+    if user_id is not None:
+        users = CustomUser.objects.filter(id=user_id, role='user')
+        if admin_id is not None:
+            users = users.filter(assigned_to_admin_id=admin_id)
+        if not users.exists():
+            return Response({'error': 'User not found.'}, status=status.HTTP_404_NOT_FOUND)
+        return 'user', user_id
+    if admin_id is not None:
+        return 'admin', admin_id
+    return 'all', 0
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def task_analytics(request):
+    """
+    GET /api/analytics/tasks
+    Completed tasks and worked hours per day, week or month, read from the
+    rollup tables (one row per bucket, however many tasks)
+    ?period=day|week|month (default week), ?from= / ?to= completion dates
+    (default: the last 12 buckets), ?admin= / ?user= to narrow the scope
+    """
+    scope = _analytics_scope(request)
+    if isinstance(scope, Response):
+        return scope
+    scope, scope_id = scope
+    
+    try:
+        period, start, end = parse_analytics_params(request.query_params)
+        buckets = rollup_series(scope, scope_id, period, start, end)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    
+    totals = {
+        'completed_tasks': sum(bucket['completed_tasks'] for bucket in buckets),
+        'worked_hours': sum(bucket['worked_hours'] for bucket in buckets),
+    }
+    # Decimals are rendered as strings, like the task serializers do
+    for row in buckets + [totals]:
+        row['worked_hours'] = str(row['worked_hours'])
+    return Response(
+        {
+            'scope': scope,
+            'scope_id': scope_id or None,
+            'period': period,
+            'from': buckets[0]['period_start'],
+            'to': end,
+            'totals': totals,
+            'buckets': buckets,
+        },
+        status=status.HTTP_200_OK
+    )
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def task_analytics_users(request):
+    """
+    GET /api/analytics/tasks/users
+    Completed tasks and worked hours of each user in one day, week or
+    month (?period=, ?date= within it, default today), most hours first
+    Admins see their own users, SuperAdmins everyone or ?admin='s users
+    """
+    scope = _analytics_scope(request)
+    if isinstance(scope, Response):
+        return scope
+    scope, scope_id = scope
+    if scope == 'user':
+        return Response(
+            {'error': 'Use /api/analytics/tasks/?user= for a single user.'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    try:
+        period = parse_period(request.query_params)
+        day = parse_day(request.query_params, 'date') or timezone.localdate()
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    
+    start = period_start(day, period)
+    users = user_rollups(period, start, admin_id=scope_id if scope == 'admin' else None)
+    for user in users:
+        user['worked_hours'] = str(user['worked_hours'])
+    return Response(
+        {'scope': scope, 'scope_id': scope_id or None, 'period': period, 'period_start': start, 'users': users},
+        status=status.HTTP_200_OK
+    )
 
 
 @api_view(['PUT'])
@@ -55,7 +377,7 @@ def update_task(request, id):
         )
     
     try:
-        task = Task.objects.get(id=id, assigned_to=request.user)
+        task = Task.objects.get(id=id, assigned_to_id=request.user.id)
     except Task.DoesNotExist:
         return Response(
             {'error': 'Task not found or you do not have permission to update this task.'},
@@ -82,6 +404,8 @@ def get_task_report(request, id):
     GET /api/tasks/{id}/report
     Admins and SuperAdmins can view the Completion Report and Worked Hours for a specific task
     This is only available for tasks that are marked as Completed
+    Supports conditional GET based on the task's updated_at
+    Supports ?fields= / ?exclude= like the task list
     """
     # Only admins and superadmins can access this endpoint
     if not (request.user.is_admin() or request.user.is_superadmin()):
@@ -91,11 +415,20 @@ def get_task_report(request, id):
         )
     
     try:
-        task = Task.objects.get(id=id)
+        fields = TaskReportSerializer.select_fields(request.query_params)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    
+    serializer = ValuesSerializer(TaskReportSerializer, fields=fields)
+    try:
+        task = serializer.values(
+            Task.objects.all(),
+            required=['id', 'status', 'updated_at', 'assigned_to__assigned_to_admin'],
+        ).get(id=id)
         
         # If admin, check if task is assigned to one of their users
         if request.user.is_admin():
-            if not task.assigned_to.assigned_to_admin == request.user:
+            if not task['assigned_to__assigned_to_admin'] == request.user.id:
                 return Response(
                     {'error': 'You do not have permission to view this task report.'},
                     status=status.HTTP_403_FORBIDDEN
@@ -108,12 +441,305 @@ def get_task_report(request, id):
         )
     
     # Check if task is completed
-    if task.status != 'completed':
+    if task['status'] != 'completed':
         return Response(
             {'error': 'Task report is only available for completed tasks.'},
             status=status.HTTP_400_BAD_REQUEST
         )
     
-    serializer = TaskReportSerializer(task)
-    return Response(serializer.data, status=status.HTTP_200_OK)
+    field_key = hashlib.md5(','.join(fields).encode()).hexdigest()[:8]
+    etag = quote_etag(f'{task["id"]}-{task["updated_at"].timestamp()}-{field_key}')
+    not_modified = _conditional_response(request, etag, task['updated_at'])
+    if not_modified is not None:
+        return not_modified
+    
+    response = Response(serializer.to_representation(task), status=status.HTTP_200_OK)
+    return _set_validators(response, etag, task['updated_at'])
+
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+@parser_classes([JSONParser, NDJSONParser])
+def bulk_create_tasks(request):
+    """
+    POST /api/tasks/bulk
+    Allows admins to create many tasks for their users in one request
+    Accepts a JSON array or an NDJSON stream (application/x-ndjson) of tasks.
+    All tasks are created in one transaction, or none if any item is invalid.
+    ?batch_size=N controls the rows per INSERT
+    """
+    # Only admins can access this endpoint
+    if not request.user.is_admin():
+        return Response(
+            {'error': 'This endpoint is only accessible to Admins.'},
+            status=status.HTTP_403_FORBIDDEN
+        )
+    
+    items = request.data
+    if not isinstance(items, list) or not items:
+        return Response(
+            {'error': 'Expected a non-empty list of tasks.'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    if len(items) > settings.TASKS_BULK_CREATE_MAX_ITEMS:
+        return Response(
+            {'error': f'At most {settings.TASKS_BULK_CREATE_MAX_ITEMS} tasks can be created per request.'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    try:
+        batch_size = int(request.query_params.get('batch_size', settings.TASKS_BULK_CREATE_BATCH_SIZE))
+    except ValueError:
+        batch_size = settings.TASKS_BULK_CREATE_BATCH_SIZE
+    batch_size = max(1, min(batch_size, settings.TASKS_BULK_CREATE_MAX_BATCH_SIZE))
+    
+    # many=True builds the serializer fields once for the whole list
+    serializer = TaskBulkCreateSerializer(data=items, many=True)
+    if serializer.is_valid():
+        rows = serializer.validated_data
+        default_status = Task._meta.get_field('status').get_default()
+        for row in rows:
+            row.setdefault('status', default_status)
+        
+        # Validate all assignees in a single query
+        assignee_ids = {row['assigned_to_id'] for row in rows}
+        my_user_ids = set(
+            CustomUser.objects.filter(
+                id__in=assignee_ids, assigned_to_admin_id=request.user.id, role='user'
+            ).values_list('id', flat=True)
+        )
+        errors = [
+            {'index': index, 'errors': {'assigned_to': ['User not found or not assigned to you.']}}
+            for index, row in enumerate(rows)
+            if row['assigned_to_id'] not in my_user_ids
+        ]
+    elif isinstance(serializer.errors, list):
+        errors = [
+            {'index': index, 'errors': item_errors}
+            for index, item_errors in enumerate(serializer.errors)
+            if item_errors
+        ]
+    else:
+        errors = [{'index': None, 'errors': serializer.errors}]
+    
+    if errors:
+        return Response(
+            {
+                'error': 'No tasks were created because some items are invalid.',
+                'results': errors
+            },
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    now = timezone.now()
+    # request.user is a token user, not a model instance
+    tasks = [Task(created_by_id=request.user.id, **row) for row in rows]
+    for task in tasks:
+        task.set_completed_at(now)
+    with transaction.atomic():
+        # Sets the ids on SQLite 3.35+, which returns rows from bulk inserts
+        Task.objects.bulk_create(tasks, batch_size=batch_size)
+        # bulk_create sends no signals, so counters and caches are updated here
+        apply_created_tasks((task.assigned_to_id, task.status, task.worked_hours) for task in tasks)
+        defer_rollup_changes((None, task_rollup_state(task)) for task in tasks)
+        record_task_changes((task.id, task.assigned_to_id, False) for task in tasks)
+        publish_task_events([('task.created', task_event_data(task), task.assigned_to_id) for task in tasks])
+        transaction.on_commit(lambda: invalidate_task_stats(assignee_ids))
+    
+    return Response(
+        {
+            'message': f'{len(tasks)} tasks created successfully.',
+            'results': [{'index': index, 'id': task.id} for index, task in enumerate(tasks)]
+        },
+        status=status.HTTP_201_CREATED
+    )
+
 
+@api_view(['PUT'])
+@permission_classes([IsAuthenticated])
+def batch_update_tasks(request):
+    """
+    PUT /api/tasks/batch
+    Allows users to update many of their tasks in one request
+    Accepts a list of {id, status, completion_report, worked_hours} items,
+    validated with the same rules as PUT /api/tasks/{id}.
+    By default nothing is saved if any item fails (?atomic=true);
+    with ?atomic=false the valid items are saved and failures reported
+    """
+    # Only regular users can access this endpoint
+    if not request.user.is_regular_user():
+        return Response(
+            {'error': 'This endpoint is only accessible to regular users.'},
+            status=status.HTTP_403_FORBIDDEN
+        )
+    
+    items = request.data
+    if not isinstance(items, list) or not items:
+        return Response(
+            {'error': 'Expected a non-empty list of task updates.'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    if len(items) > settings.TASKS_BATCH_UPDATE_MAX_ITEMS:
+        return Response(
+            {'error': f'At most {settings.TASKS_BATCH_UPDATE_MAX_ITEMS} tasks can be updated per request.'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    atomic = request.query_params.get('atomic', 'true').lower() not in ('false', '0', 'no')
+    
+    # Fetch every referenced task of this user in a single query
+    ids = []
+    for item in items:
+        try:
+            ids.append(int(item['id']))
+        except (TypeError, KeyError, ValueError):
+            ids.append(None)
+    tasks = Task.objects.filter(
+        id__in=[i for i in ids if i is not None], assigned_to_id=request.user.id
+    ).in_bulk()
+    
+    results = []
+    changed = []
+    seen = set()
+    for index, (task_id, item) in enumerate(zip(ids, items)):
+        if task_id is None:
+            results.append({'index': index, 'errors': {'id': ['A valid task id is required.']}})
+            continue
+        if task_id in seen:
+            results.append({'index': index, 'id': task_id, 'errors': {'id': ['Duplicate task id in batch.']}})
+            continue
+        seen.add(task_id)
+        task = tasks.get(task_id)
+        if task is None:
+            results.append({
+                'index': index,
+                'id': task_id,
+                'errors': {'id': ['Task not found or you do not have permission to update this task.']}
+            })
+            continue
+        
+        serializer = TaskUpdateSerializer(task, data=item, partial=True)
+        if not serializer.is_valid():
+            results.append({'index': index, 'id': task_id, 'errors': serializer.errors})
+            continue
+        for field, value in serializer.validated_data.items():
+            setattr(task, field, value)
+        changed.append(task)
+        results.append({'index': index, 'id': task_id, 'updated': True})
+    
+    failed = [result for result in results if 'errors' in result]
+    if failed and atomic:
+        return Response(
+            {
+                'error': 'No tasks were updated because some items are invalid.',
+                'results': failed
+            },
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    if changed:
+        now = timezone.now()
+        for task in changed:
+            task.updated_at = now
+            task.set_completed_at(now)
+        with transaction.atomic():
+            Task.objects.bulk_update(
+                changed, ['status', 'completion_report', 'worked_hours', 'completed_at', 'updated_at']
+            )
+            # bulk_update sends no signals, so counters and caches are updated here
+            apply_task_changes(
+                (
+                    (task.assigned_to_id, task.get_loaded_value('status'), task.get_loaded_value('worked_hours')),
+                    (task.assigned_to_id, task.status, task.worked_hours),
+                )
+                for task in changed
+            )
+            defer_rollup_changes((loaded_rollup_state(task), task_rollup_state(task)) for task in changed)
+            record_task_changes((task.id, task.assigned_to_id, False) for task in changed)
+            publish_task_events([('task.updated', task_event_data(task), task.assigned_to_id) for task in changed])
+            transaction.on_commit(lambda: invalidate_task_stats([request.user.id]))
+    
+    return Response(
+        {
+            'message': f'{len(changed)} tasks updated successfully.',
+            'results': results
+        },
+        status=status.HTTP_200_OK
+    )
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def export_tasks(request):
+    """
+    GET /api/tasks/export
+    Allows SuperAdmins to download all tasks with completion reports and
+    worked hours, streamed as CSV (default) or NDJSON with ?output=ndjson
+    Filters: ?admin=ID, ?status=..., ?date_from= / ?date_to= (created date)
+    """
+    # Only superadmins can access this endpoint
+    if not request.user.is_superadmin():
+        return Response(
+            {'error': 'This endpoint is only accessible to SuperAdmins.'},
+            status=status.HTTP_403_FORBIDDEN
+        )
+    
+    export_format = request.query_params.get('output', 'csv')
+    if export_format not in EXPORT_FORMATS:
+        return Response(
+            {'error': f'output must be one of: {", ".join(EXPORT_FORMATS)}.'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    try:
+        filters = parse_export_filters(request.query_params)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    
+    return export_response(filters, export_format)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def job_metrics(request):
+    """
+    GET /api/jobs/metrics
+    Allows SuperAdmins to monitor the background job queues: jobs queued,
+    due, running and failed per queue, and how long the oldest due job has
+    been waiting for a worker
+    """
+    # Only superadmins can access this endpoint
+    if not request.user.is_superadmin():
+        return Response(
+            {'error': 'This endpoint is only accessible to SuperAdmins.'},
+            status=status.HTTP_403_FORBIDDEN
+        )
+    
+    return Response({'queues': queue_metrics()}, status=status.HTTP_200_OK)
+
+
+@api_view(['GET', 'PUT'])
+@permission_classes([IsAuthenticated])
+def request_profiling(request):
+    """
+    GET /api/profiling
+    PUT /api/profiling
+    Allows SuperAdmins to see and switch per-request profiling without a
+    restart: {"enabled": true, "sample_rate": 0.1, "slow_ms": 300,
+    "seconds": 600}; after "seconds" the settings apply again
+    """
+    # Only superadmins can access this endpoint
+    if not request.user.is_superadmin():
+        return Response(
+            {'error': 'This endpoint is only accessible to SuperAdmins.'},
+            status=status.HTTP_403_FORBIDDEN
+        )
+    
+    if request.method == 'GET':
+        return Response({'profiling': profiling.read_switch()}, status=status.HTTP_200_OK)
+    
+    try:
+        switch, seconds = profiling.parse_switch(request.data)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    
+    return Response({'profiling': profiling.set_switch(switch, seconds)}, status=status.HTTP_200_OK)
@@ -0,0 +1,237 @@
+"""
+Async versions of the task list, update and report API views
+
+Enabled with TASKS_ASYNC_API_VIEWS = True and meant to be served by an
+ASGI server (task_management/asgi.py). Every database call goes through
+the async ORM and JWT authentication uses AsyncJWTAuthentication, so a
+slow request waits in the event loop instead of holding a worker thread.
+Requests and responses are the same as the sync views in api_views.py,
+except that responses are always rendered as JSON (no browsable API).
+"""
+
+import hashlib
+from functools import wraps
+
+from django.utils.http import quote_etag
+from rest_framework import status
+from rest_framework.exceptions import (
+    APIException, AuthenticationFailed, MethodNotAllowed, NotAuthenticated
+)
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from .api_views import _conditional_response, _set_validators
+from .authentication import AsyncJWTAuthentication
+from .events import served_over_asgi, stream_response
+from .models import Task, UserTaskStats
+from .pagination import TaskCursorPagination
+from .serializers import TaskSerializer, TaskUpdateSerializer, TaskReportSerializer, ValuesSerializer
+
+
+def async_api_view(http_method_names):
+    """
+    Async counterpart of @api_view(...) with IsAuthenticated
+    Wraps the request in a DRF Request, authenticates its JWT, turns API
+    exceptions into error responses with the configured exception handler
+    and renders Response objects with the first default renderer
+    """
+    def decorator(view):
+        @wraps(view)
+        async def wrapped_view(request, *args, **kwargs):
+            authenticator = AsyncJWTAuthentication()
+            request = Request(request, parsers=[parser() for parser in api_settings.DEFAULT_PARSER_CLASSES])
+            try:
+                user_auth = await authenticator.aauthenticate(request)
+                if user_auth is None:
+                    raise NotAuthenticated()
+                request.user, request.auth = user_auth
+                if request.method not in http_method_names:
+                    raise MethodNotAllowed(request.method)
+                response = await view(request, *args, **kwargs)
+            except APIException as exc:
+                response = _handle_exception(request, exc, authenticator)
+
+            response['Allow'] = ', '.join(http_method_names)
+            if isinstance(response, Response):
+                renderer = api_settings.DEFAULT_RENDERER_CLASSES[0]()
+                response.accepted_renderer = renderer
+                response.accepted_media_type = renderer.media_type
+                response.renderer_context = {
+                    'view': None, 'args': args, 'kwargs': kwargs, 'request': request, 'response': response
+                }
+                # Render here; Django would otherwise render in a worker thread
+                response.render()
+            return response
+
+        # Authentication is by bearer token only, so there is no CSRF risk
+        wrapped_view.csrf_exempt = True
+        return wrapped_view
+    return decorator
+
+
+def _handle_exception(request, exc, authenticator):
+    # As APIView.handle_exception: authentication errors are 401s that
+    # name the expected scheme
+    if isinstance(exc, (NotAuthenticated, AuthenticationFailed)):
+        exc.auth_header = authenticator.authenticate_header(request)
+    response = api_settings.EXCEPTION_HANDLER(exc, {'view': None, 'args': (), 'kwargs': {}, 'request': request})
+    if response is None:
+        raise exc
+    response.exception = True
+    return response
+
+
+@async_api_view(['GET'])
+async def get_tasks(request):
+    """
+    GET /api/tasks
+    Async version of api_views.get_tasks
+    """
+    # Only regular users can access this endpoint
+    if not request.user.is_regular_user():
+        return Response(
+            {'error': 'This endpoint is only accessible to regular users.'},
+            status=status.HTTP_403_FORBIDDEN
+        )
+
+    # Per-user task version, bumped on every write (see tasks/counters.py)
+    validator = await UserTaskStats.objects.filter(user_id=request.user.id).values_list(
+        'tasks_version', 'tasks_modified_at'
+    ).afirst()
+    etag = last_modified = None
+    if validator is not None:
+        version, last_modified = validator
+        page_key = hashlib.md5(request.get_full_path().encode()).hexdigest()[:16]
+        etag = quote_etag(f'{request.user.id}-{version}-{page_key}')
+        not_modified = _conditional_response(request, etag, last_modified)
+        if not_modified is not None:
+            return not_modified
+
+    try:
+        fields = TaskSerializer.select_fields(request.query_params)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    paginator = TaskCursorPagination()
+    serializer = ValuesSerializer(TaskSerializer, fields=fields)
+    # The sort key and id are read from the page edges to build the cursors
+    tasks = serializer.values(
+        Task.objects.filter(assigned_to_id=request.user.id),
+        required=['id', paginator.get_ordering(request).lstrip('-')],
+    )
+    page = await paginator.apaginate_queryset(tasks, request)
+    response = paginator.get_paginated_response(serializer.serialize(page))
+    if etag is not None:
+        _set_validators(response, etag, last_modified)
+    return response
+
+
+@async_api_view(['PUT'])
+async def update_task(request, id):
+    """
+    PUT /api/tasks/{id}
+    Async version of api_views.update_task
+    """
+    # Only regular users can access this endpoint
+    if not request.user.is_regular_user():
+        return Response(
+            {'error': 'This endpoint is only accessible to regular users.'},
+            status=status.HTTP_403_FORBIDDEN
+        )
+
+    try:
+        # The assignee is serialized in the response
+        task = await Task.objects.select_related('assigned_to').aget(id=id, assigned_to_id=request.user.id)
+    except Task.DoesNotExist:
+        return Response(
+            {'error': 'Task not found or you do not have permission to update this task.'},
+            status=status.HTTP_404_NOT_FOUND
+        )
+
+    serializer = TaskUpdateSerializer(task, data=request.data, partial=True)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    # What serializer.save() does, with the async save
+    for field, value in serializer.validated_data.items():
+        setattr(task, field, value)
+    await task.asave()
+    return Response(
+        {
+            'message': 'Task updated successfully.',
+            'task': TaskSerializer(task).data
+        },
+        status=status.HTTP_200_OK
+    )
+
+
+@async_api_view(['GET'])
+async def get_task_report(request, id):
+    """
+    GET /api/tasks/{id}/report
+    Async version of api_views.get_task_report
+    """
+    # Only admins and superadmins can access this endpoint
+    if not (request.user.is_admin() or request.user.is_superadmin()):
+        return Response(
+            {'error': 'This endpoint is only accessible to Admins and SuperAdmins.'},
+            status=status.HTTP_403_FORBIDDEN
+        )
+
+    try:
+        fields = TaskReportSerializer.select_fields(request.query_params)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    serializer = ValuesSerializer(TaskReportSerializer, fields=fields)
+    try:
+        task = await serializer.values(
+            Task.objects.all(),
+            required=['id', 'status', 'updated_at', 'assigned_to__assigned_to_admin'],
+        ).aget(id=id)
+    except Task.DoesNotExist:
+        return Response(
+            {'error': 'Task not found.'},
+            status=status.HTTP_404_NOT_FOUND
+        )
+
+    # If admin, check if task is assigned to one of their users
+    if request.user.is_admin() and task['assigned_to__assigned_to_admin'] != request.user.id:
+        return Response(
+            {'error': 'You do not have permission to view this task report.'},
+            status=status.HTTP_403_FORBIDDEN
+        )
+
+    # Check if task is completed
+    if task['status'] != 'completed':
+        return Response(
+            {'error': 'Task report is only available for completed tasks.'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    field_key = hashlib.md5(','.join(fields).encode()).hexdigest()[:8]
+    etag = quote_etag(f'{task["id"]}-{task["updated_at"].timestamp()}-{field_key}')
+    not_modified = _conditional_response(request, etag, task['updated_at'])
+    if not_modified is not None:
+        return not_modified
+
+    response = Response(serializer.to_representation(task), status=status.HTTP_200_OK)
+    return _set_validators(response, etag, task['updated_at'])
+
+
+@async_api_view(['GET'])
+async def task_events(request):
+    """
+    GET /api/events
+    Server-Sent Events stream of task writes the logged-in user can see:
+    task.created, task.updated and task.deleted events with the task's
+    id, title, status, assignee, due date and update time
+    Users get their own tasks, Admins their users' tasks and SuperAdmins
+    every task. Only served under ASGI (see tasks/events.py)
+    """
+    if not served_over_asgi(request):
+        return Response(
+            {'error': 'Event streams are only served by the ASGI application (task_management/asgi.py).'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    return stream_response(request, request.user)
@@ -0,0 +1,201 @@
+"""
+Stateless JWT authentication for the API
+
+Tokens issued by CustomTokenObtainPairView carry the user's role, admin and
+token_version claims, so the request user is built from the token instead
+of loading the CustomUser row. Revocation still works: every user's current
+token_version, activation and role are kept in a small in-process LRU that
+is refilled from the database after JWT_USER_STATE_CACHE_TIMEOUT seconds,
+and tokens with an older version are rejected. Saving a user evicts its
+entry in this process at once; other processes see the change once their
+entry expires. Tokens issued without role claims fall back to the role
+held in the LRU.
+"""
+
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from django.conf import settings
+from django.utils.functional import cached_property
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+from .models import CustomUser
+from .routers import PRIMARY
+
+
+ROLE_CLAIM = 'role'
+ADMIN_CLAIM = 'assigned_to_admin'
+TOKEN_VERSION_CLAIM = 'token_version'
+
+UserState = namedtuple('UserState', ['token_version', 'is_active', 'role', 'assigned_to_admin_id'])
+
+
+class UserStateCache:
+    """
+    Thread-safe LRU of UserState by user id whose entries expire
+    """
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            expires_at, state = entry
+            if expires_at < time.monotonic():
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+            return state
+
+    def set(self, user_id, state):
+        with self._lock:
+            self._entries[user_id] = (time.monotonic() + settings.JWT_USER_STATE_CACHE_TIMEOUT, state)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > settings.JWT_USER_STATE_CACHE_SIZE:
+                self._entries.popitem(last=False)
+
+    def forget(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+user_states = UserStateCache()
+
+
+def _user_state_queryset(user_id):
+    # Always the primary: a lagging replica would reject freshly issued tokens
+    return CustomUser.objects.using(PRIMARY).filter(id=user_id).values_list(*UserState._fields)
+
+
+def get_user_state(user_id):
+    """
+    UserState of a user from the LRU or the database, or None if the user does not exist
+    """
+    state = user_states.get(user_id)
+    if state is None:
+        row = _user_state_queryset(user_id).first()
+        if row is None:
+            return None
+        state = UserState(*row)
+        user_states.set(user_id, state)
+    return state
+
+
+async def aget_user_state(user_id):
+    """
+    Async version of get_user_state
+    """
+    state = user_states.get(user_id)
+    if state is None:
+        row = await _user_state_queryset(user_id).afirst()
+        if row is None:
+            return None
+        state = UserState(*row)
+        user_states.set(user_id, state)
+    return state
+
+
+def add_token_claims(token, user):
+    """
+    Add the claims StatelessJWTAuthentication reads to a new token
+    """
+    token[ROLE_CLAIM] = user.role
+    token[ADMIN_CLAIM] = user.assigned_to_admin_id
+    token[TOKEN_VERSION_CLAIM] = user.token_version
+    return token
+
+
+class RoleTokenUser(TokenUser):
+    """
+    Request user built from a validated token
+    Offers the role checks of CustomUser; query with request.user.id, e.g.
+    Task.objects.filter(assigned_to_id=request.user.id), since it is not a
+    model instance.
+    """
+
+    def __init__(self, token, state):
+        super().__init__(token)
+        self.state = state
+
+    @cached_property
+    def role(self):
+        return self.token.get(ROLE_CLAIM, self.state.role)
+
+    @cached_property
+    def assigned_to_admin_id(self):
+        return self.token.get(ADMIN_CLAIM, self.state.assigned_to_admin_id)
+
+    def is_superadmin(self):
+        return self.role == 'superadmin'
+
+    def is_admin(self):
+        return self.role == 'admin'
+
+    def is_regular_user(self):
+        return self.role == 'user'
+
+
+class StatelessJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication returning a RoleTokenUser instead of loading the user
+    Authorized requests make no user query while the user's LRU entry is fresh.
+    """
+
+    def get_user(self, validated_token):
+        user_id = self.get_user_id(validated_token)
+        return self.build_user(validated_token, get_user_state(user_id))
+
+    def get_user_id(self, validated_token):
+        try:
+            return validated_token[jwt_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_('Token contained no recognizable user identification'))
+
+    def build_user(self, validated_token, state):
+        if state is None:
+            raise AuthenticationFailed(_('User not found'), code='user_not_found')
+        if not state.is_active:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+        # Tokens issued before token versions existed count as version 0
+        if validated_token.get(TOKEN_VERSION_CLAIM, 0) != state.token_version:
+            raise AuthenticationFailed(_('Token has been revoked'), code='token_revoked')
+        return RoleTokenUser(validated_token, state)
+
+
+class AsyncJWTAuthentication(StatelessJWTAuthentication):
+    """
+    StatelessJWTAuthentication for async views
+
+    The token is decoded and verified in the event loop (no I/O) and a
+    missing LRU entry is loaded with the async ORM, so authentication does
+    not block a worker thread.
+    """
+
+    async def aauthenticate(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+
+        validated_token = self.get_validated_token(raw_token)
+        return await self.aget_user(validated_token), validated_token
+
+    async def aget_user(self, validated_token):
+        user_id = self.get_user_id(validated_token)
+        return self.build_user(validated_token, await aget_user_state(user_id))
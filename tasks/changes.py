@@ -0,0 +1,126 @@
+"""
+Per-user task change log for delta sync (GET /api/tasks/changes/)
+
+Every task write appends a TaskChange row for each user whose task list
+it changed: a change for the assignee and, when the task is deleted or
+reassigned away, a tombstone for the user who lost it. Sync clients keep
+a cursor naming the last change they have seen and when it was issued;
+the rows after it are read through the (user, id) index, so a sync costs
+one row per change however many tasks the user has.
+
+prune_task_changes drops rows superseded by a later change to the same
+task and rows older than TASKS_CHANGE_LOG_RETENTION_DAYS. Cursors issued
+before that window may have missed pruned tombstones, so they are
+rejected and the client downloads the full list again. A cursor handed
+out mid-way through a backlog keeps the issue time of the cursor that
+started reading it, since the unread rows are as old as that; only a
+drained log yields a freshly issued cursor.
+"""
+
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from .models import TaskChange
+
+
+def encode_cursor(change_id, issued_at=None):
+    """
+    Opaque cursor for the changes after change_id, issued at issued_at
+    (default now)
+    """
+    return f'{change_id}.{int((issued_at or timezone.now()).timestamp())}'
+
+
+def parse_cursor(value):
+    """
+    (change id, issue time) of a cursor made by encode_cursor
+    Raises ValueError for anything else
+    """
+    try:
+        change_id, issued_at = (int(part) for part in value.split('.'))
+        if change_id < 0:
+            raise ValueError
+        return change_id, datetime.fromtimestamp(issued_at, tz=dt_timezone.utc)
+    except (ValueError, OverflowError, OSError):
+        raise ValueError(f'Invalid cursor "{value}".')
+
+
+def cursor_expired(issued_at):
+    """
+    Whether changes a cursor still needs may have been pruned
+    """
+    return issued_at < timezone.now() - timedelta(days=settings.TASKS_CHANGE_LOG_RETENTION_DAYS)
+
+
+def record_task_changes(changes):
+    """
+    Append log rows for (task_id, user_id, deleted) changes
+    Called by the task signals and by bulk writes, which send none
+    """
+    now = timezone.now()
+    TaskChange.objects.bulk_create([
+        TaskChange(task_id=task_id, user_id=user_id, deleted=deleted, changed_at=now)
+        for task_id, user_id, deleted in changes
+        if user_id
+    ])
+
+
+def task_save_changes(task, created):
+    """
+    Log rows for a saved task: a change for its assignee and a tombstone
+    for the previous assignee when it was reassigned
+    """
+    changes = [(task.pk, task.assigned_to_id, False)]
+    old_user_id = None if created else task.get_loaded_value('assigned_to_id')
+    if old_user_id and old_user_id != task.assigned_to_id:
+        changes.append((task.pk, old_user_id, True))
+    return changes
+
+
+def latest_change_id(user_id):
+    """
+    Id of the user's latest change, or 0 if there is none
+    """
+    return TaskChange.objects.filter(user_id=user_id).order_by('-id').values_list('id', flat=True).first() or 0
+
+
+def changes_since(user_id, change_id, limit):
+    """
+    Up to limit of the user's changes after change_id
+    Returns (changed task ids, deleted task ids, last change id, has_more),
+    keeping only the latest change of each task, in change order
+    """
+    rows = list(
+        TaskChange.objects.filter(user_id=user_id, id__gt=change_id)
+        .order_by('id')
+        .values_list('id', 'task_id', 'deleted')[:limit + 1]
+    )
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    latest = {}
+    for _, task_id, deleted in rows:
+        # Re-inserted so the dict keeps the order of each task's last change
+        latest.pop(task_id, None)
+        latest[task_id] = deleted
+    changed = [task_id for task_id, deleted in latest.items() if not deleted]
+    deleted = [task_id for task_id, deleted in latest.items() if deleted]
+    return changed, deleted, rows[-1][0] if rows else change_id, has_more
+
+
+def prune_task_changes(retention_days=None):
+    """
+    Delete superseded and expired change rows
+    Returns (superseded, expired) row counts
+    """
+    if retention_days is None:
+        retention_days = settings.TASKS_CHANGE_LOG_RETENTION_DAYS
+    # A later change to the same task of the same user replaces a row for
+    # every cursor that could still read it
+    later = TaskChange.objects.filter(user_id=OuterRef('user_id'), task_id=OuterRef('task_id'), id__gt=OuterRef('id'))
+    superseded, _ = TaskChange.objects.filter(Exists(later)).delete()
+    cutoff = timezone.now() - timedelta(days=retention_days)
+    expired, _ = TaskChange.objects.filter(changed_at__lt=cutoff).delete()
+    return superseded, expired
@@ -0,0 +1,166 @@
+from decimal import Decimal
+
+from django.db.models import Count, F, Q, Sum
+from django.utils import timezone
+
+from .models import CustomUser, Task, UserTaskStats
+
+
+STATUS_COUNTERS = {
+    'pending': 'pending_tasks',
+    'in_progress': 'in_progress_tasks',
+    'completed': 'completed_tasks',
+}
+COUNTER_FIELDS = ['total_tasks', 'pending_tasks', 'in_progress_tasks', 'completed_tasks', 'worked_hours']
+
+
+def _contribution(assigned_to_id, status, worked_hours):
+    """
+    Counter deltas one task adds to its assignee's UserTaskStats row
+    """
+    # Views may assign worked_hours as a float before saving
+    hours = Decimal(str(worked_hours or 0)).quantize(Decimal('0.01'))
+    delta = {'total_tasks': 1, 'worked_hours': hours}
+    if status in STATUS_COUNTERS:
+        delta[STATUS_COUNTERS[status]] = 1
+    return assigned_to_id, delta
+
+
+def _apply(user_id, delta, sign):
+    changes = {field: F(field) + sign * value for field, value in delta.items() if value}
+    # Any write to the user's tasks invalidates their list validators
+    changes['tasks_version'] = F('tasks_version') + 1
+    changes['tasks_modified_at'] = timezone.now()
+    if not UserTaskStats.objects.filter(user_id=user_id).update(**changes):
+        # No counter row yet: build it from the tasks, which already
+        # reflect the current write
+        rebuild_user_task_stats([user_id])
+
+
+def apply_task_change(old, new):
+    """
+    Move a task's contribution from its old state to its new state
+    old/new are (assigned_to_id, status, worked_hours) tuples or None for
+    a created or deleted task
+    """
+    if old == new:
+        # Counters are unchanged but the task itself was written
+        if new is not None and new[0]:
+            _apply(new[0], {}, 1)
+        return
+    if old is not None and old[0]:
+        user_id, delta = _contribution(*old)
+        _apply(user_id, delta, -1)
+    if new is not None and new[0]:
+        user_id, delta = _contribution(*new)
+        _apply(user_id, delta, 1)
+
+
+def apply_task_changes(changes):
+    """
+    Apply many (old, new) task state changes, as in apply_task_change,
+    with one counter update per affected user
+    Used by bulk writes, which send no signals
+    """
+    deltas = {}
+    for old, new in changes:
+        if old == new:
+            if new is not None and new[0]:
+                deltas.setdefault(new[0], {})
+            continue
+        for state, sign in ((old, -1), (new, 1)):
+            if state is None or not state[0]:
+                continue
+            user_id, delta = _contribution(*state)
+            totals = deltas.setdefault(user_id, {})
+            for field, value in delta.items():
+                totals[field] = totals.get(field, 0) + sign * value
+    for user_id, delta in deltas.items():
+        _apply(user_id, delta, 1)
+
+
+def apply_created_tasks(states):
+    """
+    Add the contribution of tasks inserted in bulk
+    states are (assigned_to_id, status, worked_hours) tuples
+    """
+    apply_task_changes((None, state) for state in states)
+
+
+def compute_user_task_stats(user_ids=None):
+    """
+    Aggregate the counters from the task table, keyed by user id
+    Users without tasks are included with zero counts
+    """
+    users = CustomUser.objects.all()
+    tasks = Task.objects.all()
+    if user_ids is not None:
+        users = users.filter(pk__in=user_ids)
+        tasks = tasks.filter(assigned_to_id__in=user_ids)
+
+    stats = {
+        user_id: UserTaskStats(user_id=user_id)
+        for user_id in users.values_list('pk', flat=True).iterator()
+    }
+    rows = tasks.order_by().values('assigned_to_id').annotate(
+        total_tasks=Count('id'),
+        pending_tasks=Count('id', filter=Q(status='pending')),
+        in_progress_tasks=Count('id', filter=Q(status='in_progress')),
+        completed_tasks=Count('id', filter=Q(status='completed')),
+        worked_hours=Sum('worked_hours'),
+    )
+    for row in rows.iterator():
+        user_stats = stats.get(row.pop('assigned_to_id'))
+        if user_stats is None:
+            continue
+        row['worked_hours'] = Decimal(row['worked_hours'] or 0).quantize(Decimal('0.01'))
+        for field, value in row.items():
+            setattr(user_stats, field, value)
+    return stats
+
+
+def rebuild_user_task_stats(user_ids=None, batch_size=1000):
+    """
+    Recompute counters from the task table and upsert them in bulk
+    Call this after writes that bypass model signals (bulk_create, update)
+    """
+    stats = compute_user_task_stats(user_ids)
+    now = timezone.now()
+    for user_stats in stats.values():
+        user_stats.tasks_modified_at = now
+    UserTaskStats.objects.bulk_create(
+        stats.values(),
+        batch_size=batch_size,
+        update_conflicts=True,
+        unique_fields=['user'],
+        update_fields=COUNTER_FIELDS + ['tasks_modified_at'],
+    )
+    # Upserts cannot increment, so bump the versions in one statement
+    versions = UserTaskStats.objects.all()
+    if user_ids is not None:
+        versions = versions.filter(user_id__in=user_ids)
+    versions.update(tasks_version=F('tasks_version') + 1)
+    return len(stats)
+
+
+def find_task_stats_drift(user_ids=None):
+    """
+    Compare stored counters with the task table
+    Returns {user_id: (stored, expected)} for every row that differs,
+    where stored is None when the counter row is missing
+    """
+    expected = compute_user_task_stats(user_ids)
+    stored = UserTaskStats.objects.all()
+    if user_ids is not None:
+        stored = stored.filter(user_id__in=user_ids)
+    stored = {row['user_id']: row for row in stored.values('user_id', *COUNTER_FIELDS).iterator()}
+
+    drift = {}
+    for user_id, user_stats in expected.items():
+        expected_row = {field: getattr(user_stats, field) for field in COUNTER_FIELDS}
+        stored_row = stored.get(user_id)
+        if stored_row is not None:
+            stored_row = {field: stored_row[field] for field in COUNTER_FIELDS}
+        if stored_row != expected_row:
+            drift[user_id] = (stored_row, expected_row)
+    return drift
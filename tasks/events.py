@@ -0,0 +1,329 @@
+"""
+Server-Sent Events pushed on task writes (GET /api/events/, /panel/events/)
+
+Task signals and the bulk write paths publish an event once the write
+commits, on the channel of every role that can see the task: 'user:<id>'
+for its assignee, 'admin:<id>' for the assignee's admin and 'all' for
+SuperAdmins. Each stream subscribes to its caller's channel through the
+broker named by TASKS_EVENT_BROKER.
+
+InProcessBroker fans events out inside one process, which is all a
+single ASGI worker needs and serves as the local stand-in; with several
+workers, a broker shared between them (Redis pub/sub, Postgres LISTEN /
+NOTIFY) implements the EventBroker methods instead.
+
+Streams send a comment every TASKS_EVENTS_HEARTBEAT_SECONDS so proxies
+keep the connection open, and end after TASKS_EVENTS_MAX_STREAM_SECONDS
+(Django 4.2 does not notice clients that went away). Clients reconnect
+with Last-Event-ID and are sent the events they missed while those are
+among the last TASKS_EVENTS_REPLAY_SIZE, or a 'reset' event telling them
+to resync (e.g. from GET /api/tasks/changes/). A stream whose client
+reads too slowly to drain TASKS_EVENTS_QUEUE_SIZE queued events is ended
+the same way rather than buffering without bound.
+"""
+
+import asyncio
+import itertools
+import json
+import threading
+import uuid
+from collections import deque, namedtuple
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.http import StreamingHttpResponse
+from django.utils.module_loading import import_string
+
+from .models import CustomUser
+
+
+ALL_CHANNEL = 'all'
+
+# Milliseconds EventSource waits before reconnecting
+RECONNECT_DELAY_MS = 1000
+
+Event = namedtuple('Event', ['id', 'type', 'data'])
+
+
+def user_channel(user_id):
+    return f'user:{user_id}'
+
+
+def admin_channel(admin_id):
+    return f'admin:{admin_id}'
+
+
+def subscriber_channels(user):
+    """
+    Channels the event stream of a user subscribes to
+    """
+    if user.is_superadmin():
+        return [ALL_CHANNEL]
+    if user.is_admin():
+        return [admin_channel(user.id)]
+    return [user_channel(user.id)]
+
+
+class Subscription:
+    """
+    Events of some channels for one stream, queued in the stream's event loop
+    """
+
+    def __init__(self, channels):
+        self.channels = channels
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=settings.TASKS_EVENTS_QUEUE_SIZE)
+        # Missed events sent before the queued ones
+        self.replay = []
+        # Set once an event was dropped because the client fell behind
+        self.overflowed = False
+
+    def deliver(self, event):
+        """
+        Queue an event; runs in the subscription's event loop
+        """
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+    async def next_event(self, timeout):
+        """
+        Next queued event, or None after timeout seconds without one
+        """
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class EventBroker:
+    """
+    Interface of the broker behind the event streams
+    """
+
+    def publish(self, channels, event_type, data):
+        """
+        Send an event to the subscribers of the channels; callable from any thread
+        """
+        raise NotImplementedError
+
+    def subscribe(self, channels, last_event_id=None):
+        """
+        Subscription to the channels for the running event loop, with the
+        events after last_event_id in its replay (or a 'reset' event)
+        """
+        raise NotImplementedError
+
+    def unsubscribe(self, subscription):
+        raise NotImplementedError
+
+
+class InProcessBroker(EventBroker):
+    """
+    EventBroker for the streams served by this process
+
+    Event ids are '<broker id>-<sequence>', so ids from before a restart
+    are recognised and answered with a 'reset' event.
+    """
+
+    def __init__(self):
+        self.broker_id = uuid.uuid4().hex[:8]
+        self._sequence = itertools.count(1)
+        self._lock = threading.Lock()
+        # (sequence, channels, event) of the latest events, for replays
+        self._recent = deque(maxlen=settings.TASKS_EVENTS_REPLAY_SIZE)
+        self._last_sequence = 0
+        self._subscribers = {}
+
+    def publish(self, channels, event_type, data):
+        with self._lock:
+            sequence = next(self._sequence)
+            self._last_sequence = sequence
+            event = Event(f'{self.broker_id}-{sequence}', event_type, data)
+            self._recent.append((sequence, set(channels), event))
+            targets = {
+                subscription
+                for channel in channels
+                for subscription in self._subscribers.get(channel, ())
+            }
+        for subscription in targets:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.deliver, event)
+            except RuntimeError:
+                # The stream's event loop is closed
+                self.unsubscribe(subscription)
+        return event
+
+    def subscribe(self, channels, last_event_id=None):
+        subscription = Subscription(channels)
+        # Replay and registration under one lock, so each event is either
+        # replayed or delivered
+        with self._lock:
+            if last_event_id:
+                subscription.replay = self._missed_events(set(channels), last_event_id)
+            for channel in channels:
+                self._subscribers.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            for channel in subscription.channels:
+                subscribers = self._subscribers.get(channel)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._subscribers[channel]
+
+    def _missed_events(self, channels, last_event_id):
+        broker_id, _, sequence = last_event_id.partition('-')
+        oldest = self._recent[0][0] if self._recent else self._last_sequence + 1
+        if broker_id != self.broker_id or not sequence.isdigit() or int(sequence) < oldest - 1:
+            # Issued before a restart, or older than the replay buffer
+            return [Event(f'{self.broker_id}-{self._last_sequence}', 'reset', {})]
+        return [
+            event for event_sequence, event_channels, event in self._recent
+            if event_sequence > int(sequence) and event_channels & channels
+        ]
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    """
+    The process's TASKS_EVENT_BROKER instance
+    """
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                _broker = import_string(settings.TASKS_EVENT_BROKER)()
+    return _broker
+
+
+def publish_on_commit(channels, event_type, data):
+    """
+    Publish an event once the current transaction commits
+    """
+    transaction.on_commit(lambda: get_broker().publish(channels, event_type, data))
+
+
+def task_event_data(task):
+    """
+    Payload of a task.created / task.updated event
+    """
+    return {
+        'id': task.pk,
+        'title': task.title,
+        'status': task.status,
+        'assigned_to': task.assigned_to_id,
+        'due_date': task.due_date,
+        'updated_at': task.updated_at,
+    }
+
+
+def task_save_events(task, created):
+    """
+    (event type, data, user id) events of a saved task; a task reassigned
+    away is deleted for its previous assignee
+    """
+    events = [('task.created' if created else 'task.updated', task_event_data(task), task.assigned_to_id)]
+    old_user_id = None if created else task.get_loaded_value('assigned_to_id')
+    if old_user_id and old_user_id != task.assigned_to_id:
+        events.append(('task.deleted', {'id': task.pk}, old_user_id))
+    return events
+
+
+def publish_task_events(events):
+    """
+    Publish (event type, data, user id) task events once the current
+    transaction commits, to each user's channel, their admin's and the
+    SuperAdmins'
+    A task.deleted event skips the channels a task.updated event of the
+    same task reaches, e.g. the admin of a task moved between their users
+    """
+    def publish():
+        admin_of = dict(
+            CustomUser.objects.filter(pk__in={user_id for _, _, user_id in events})
+            .values_list('pk', 'assigned_to_admin_id')
+        )
+        channels = []
+        reached = {}
+        for event_type, data, user_id in events:
+            event_channels = [user_channel(user_id), ALL_CHANNEL]
+            if admin_of.get(user_id):
+                event_channels.append(admin_channel(admin_of[user_id]))
+            channels.append(event_channels)
+            if event_type != 'task.deleted':
+                reached.setdefault(data['id'], set()).update(event_channels)
+        broker = get_broker()
+        for (event_type, data, _), event_channels in zip(events, channels):
+            if event_type == 'task.deleted':
+                event_channels = [c for c in event_channels if c not in reached.get(data['id'], ())]
+            if event_channels:
+                broker.publish(event_channels, event_type, data)
+
+    if events:
+        transaction.on_commit(publish)
+
+
+def format_event(event):
+    """
+    An event in the text/event-stream format
+    """
+    data = json.dumps(event.data, cls=DjangoJSONEncoder)
+    return f'id: {event.id}\nevent: {event.type}\ndata: {data}\n\n'
+
+
+async def event_stream(broker, subscription):
+    """
+    Body of an event stream: the missed events, then live events and
+    heartbeats until the stream's time is up or the client falls behind
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + settings.TASKS_EVENTS_MAX_STREAM_SECONDS
+    try:
+        yield f'retry: {RECONNECT_DELAY_MS}\n\n'
+        for event in subscription.replay:
+            yield format_event(event)
+        while True:
+            if subscription.overflowed and subscription.queue.empty():
+                # The client reconnects and is replayed what was dropped
+                return
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return
+            event = await subscription.next_event(min(settings.TASKS_EVENTS_HEARTBEAT_SECONDS, remaining))
+            yield format_event(event) if event is not None else ': heartbeat\n\n'
+    finally:
+        broker.unsubscribe(subscription)
+
+
+def served_over_asgi(request):
+    """
+    Whether a request came through the ASGI handler; under WSGI a stream
+    would hold a worker thread and Django 4.2 would buffer it whole
+    """
+    return isinstance(getattr(request, '_request', request), ASGIRequest)
+
+
+def stream_response(request, user):
+    """
+    Event stream of the task writes a user can see, resuming after the
+    Last-Event-ID header (or ?last_event_id= for clients that cannot set it)
+    Call from an async view
+    """
+    last_event_id = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+    broker = get_broker()
+    subscription = broker.subscribe(subscriber_channels(user), last_event_id)
+    response = StreamingHttpResponse(event_stream(broker, subscription), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Stops nginx from buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
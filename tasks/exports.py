@@ -0,0 +1,133 @@
+"""
+Streaming task exports (CSV / NDJSON) for billing
+
+Rows are read with a chunked server-side iterator over values_list() and
+written out as they arrive, so memory use does not depend on the number
+of tasks exported.
+"""
+
+import csv
+import io
+import json
+
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+from .filters import filter_tasks, parse_task_filters
+from .models import Task
+
+
+# (column header, values_list lookup)
+EXPORT_COLUMNS = [
+    ('id', 'id'),
+    ('title', 'title'),
+    ('description', 'description'),
+    ('status', 'status'),
+    ('due_date', 'due_date'),
+    ('assigned_to_id', 'assigned_to_id'),
+    ('assigned_to_username', 'assigned_to__username'),
+    ('assigned_to_email', 'assigned_to__email'),
+    ('admin_id', 'assigned_to__assigned_to_admin_id'),
+    ('admin_username', 'assigned_to__assigned_to_admin__username'),
+    ('created_by_username', 'created_by__username'),
+    ('completion_report', 'completion_report'),
+    ('worked_hours', 'worked_hours'),
+    ('created_at', 'created_at'),
+    ('updated_at', 'updated_at'),
+]
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+# Query string filters accepted by the exports (see tasks.filters)
+EXPORT_FILTERS = ('admin', 'status', 'date_from', 'date_to')
+
+
+def parse_export_filters(params):
+    """
+    Export filters from query parameters: ?admin=ID, ?status=..., and an
+    inclusive created date range ?date_from=YYYY-MM-DD&date_to=YYYY-MM-DD
+    Raises ValueError for invalid values
+    """
+    return parse_task_filters(params, EXPORT_FILTERS)
+
+
+def export_queryset(filters):
+    """
+    values_list() rows for EXPORT_COLUMNS matching the filters, in id order
+    """
+    tasks = filter_tasks(Task.objects.all(), filters)
+    return tasks.order_by('id').values_list(*(lookup for _, lookup in EXPORT_COLUMNS))
+
+
+def _export_value(value):
+    # Dates and datetimes as ISO 8601, decimals as exact strings
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    if value is None or isinstance(value, (str, int)):
+        return value
+    return str(value)
+
+
+# Leading characters that make spreadsheets read a cell as a formula
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def _csv_value(value):
+    # Text written by users opens as text, not as a formula (CSV injection)
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def _rows(queryset):
+    for row in queryset.iterator(chunk_size=settings.TASKS_EXPORT_CHUNK_SIZE):
+        yield [_export_value(value) for value in row]
+
+
+def iter_csv(queryset):
+    """
+    CSV lines for the queryset, header first, yielded in chunks
+    Cells starting like a formula are prefixed with a quote
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([header for header, _ in EXPORT_COLUMNS])
+    for count, row in enumerate(_rows(queryset), start=1):
+        writer.writerow([_csv_value(value) for value in row])
+        if count % settings.TASKS_EXPORT_CHUNK_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def iter_ndjson(queryset):
+    """
+    One JSON object per task and line, yielded in chunks
+    """
+    headers = [header for header, _ in EXPORT_COLUMNS]
+    lines = []
+    for row in _rows(queryset):
+        lines.append(json.dumps(dict(zip(headers, row)), ensure_ascii=False))
+        if len(lines) == settings.TASKS_EXPORT_CHUNK_SIZE:
+            yield '\n'.join(lines) + '\n'
+            lines = []
+    if lines:
+        yield '\n'.join(lines) + '\n'
+
+
+def export_response(filters, export_format='csv'):
+    """
+    StreamingHttpResponse downloading the filtered tasks as CSV or NDJSON
+    """
+    queryset = export_queryset(filters)
+    content = iter_csv(queryset) if export_format == 'csv' else iter_ndjson(queryset)
+    response = StreamingHttpResponse(content, content_type=EXPORT_FORMATS[export_format])
+    filename = f'tasks-{timezone.now():%Y%m%d-%H%M%S}.{export_format}'
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
@@ -0,0 +1,65 @@
+"""
+Versions for the cached table fragments of the panel list pages
+
+Templates wrap their tables in {% cache fragment_timeout name fragment_version %}
+blocks. fragment_version names the role scope the table shows ('superadmin'
+for everything, 'admin:<id>' for one admin's users) and that scope's
+current version. Task and CustomUser writes bump the versions of the scopes
+they touch (see tasks.stats.invalidate_stats), so the next request renders
+under a new key and the stale fragments simply expire.
+"""
+
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+
+SUPERADMIN_SCOPE = 'superadmin'
+
+
+def admin_scope(admin_id):
+    return f'admin:{admin_id}'
+
+
+def _version_key(scope):
+    return f'fragment_version:{scope}'
+
+
+def fragment_version(scope):
+    """
+    '<scope>:<version>' for the vary_on arguments of {% cache %}
+    """
+    key = _version_key(scope)
+    version = cache.get(key)
+    if version is None:
+        # Start from the clock so an evicted version is never reused
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return f'{scope}:{version}'
+
+
+def fragment_context(scope):
+    """
+    Template context for the cached fragments of a list page
+    """
+    return {
+        'fragment_version': fragment_version(scope),
+        'fragment_timeout': settings.PANEL_FRAGMENT_CACHE_TIMEOUT,
+    }
+
+
+def bump_fragment_versions(scopes):
+    """
+    Move the given scopes to new versions once the current transaction
+    commits, so no request can cache the old rows under the new version
+    """
+    def bump():
+        for scope in scopes:
+            try:
+                cache.incr(_version_key(scope))
+            except ValueError:
+                # No version yet: nothing has been cached for this scope
+                pass
+    transaction.on_commit(bump)
@@ -20,9 +20,15 @@ def api_info(request):
                 "POST /api/token/refresh/": "Refresh JWT access token"
             },
             "tasks": {
-                "GET /api/tasks/": "Get user's assigned tasks",
+                "GET /api/tasks/": "Get user's assigned tasks (cursor paginated)",
+                "POST /api/tasks/bulk/": "Create many tasks at once (Admin only)",
+                "PUT /api/tasks/batch/": "Update many of the user's tasks at once",
+                "GET /api/tasks/export/": "Stream all tasks as CSV or NDJSON (SuperAdmin only)",
+                "GET /api/tasks/search/?q=": "Full-text search over the tasks visible to the caller",
                 "PUT /api/tasks/{id}/": "Update task status",
-                "GET /api/tasks/{id}/report/": "View task completion report (Admin/SuperAdmin only)"
+                "GET /api/tasks/{id}/report/": "View task completion report (Admin/SuperAdmin only)",
+                "GET /api/analytics/tasks/": "Completed tasks and worked hours per day/week/month (Admin/SuperAdmin only)",
+                "GET /api/analytics/tasks/users/": "Completed work of each user in one period (Admin/SuperAdmin only)"
             }
         },
         "admin_panel": "/panel/login/",
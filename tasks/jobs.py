@@ -0,0 +1,233 @@
+"""
+Database-backed queue for work a write can leave until after it commits
+
+enqueue() inserts a Job row in the caller's transaction, so the job exists
+exactly when the write does and the request returns without running it.
+`manage.py run_jobs` claims due jobs and runs them in a thread pool, at
+most JOBS_QUEUE_CONCURRENCY[queue] of a queue at once across all workers
+(claim_jobs enforces it).
+
+A job's writes and the deletion of its row commit together, so a job that
+succeeded never runs again. One that raises is retried after
+JOBS_RETRY_DELAY seconds, doubled on each further attempt, and left as
+'failed' after its max attempts; one whose worker died is queued again
+after JOBS_RUNNING_TIMEOUT. Job functions take JSON-serializable keyword
+arguments and are registered with @job when their module is imported.
+
+With JOBS_RUN_INLINE, jobs run in the writing process right after the
+commit instead, for development without a worker.
+"""
+
+import json
+import logging
+import os
+import socket
+import traceback
+import uuid
+from collections import namedtuple
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Count, F, Min, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Job
+
+
+logger = logging.getLogger(__name__)
+
+JobSpec = namedtuple('JobSpec', ['func', 'queue', 'max_attempts'])
+
+# Registered job functions by name
+JOBS = {}
+
+# Characters of a traceback kept in Job.last_error
+ERROR_LENGTH = 4000
+
+
+class JobLost(Exception):
+    """
+    The job's row was deleted while it ran: it was cancelled, or queued
+    again and claimed by another worker
+    """
+
+
+def job(name, queue='default', max_attempts=None):
+    """
+    Register a function as the job enqueue(name, ...) runs
+    max_attempts defaults to JOBS_MAX_ATTEMPTS
+    """
+    def register(func):
+        JOBS[name] = JobSpec(func, queue, max_attempts)
+        return func
+    return register
+
+
+def enqueue(name, **payload):
+    """
+    Queue a registered job with the payload as its keyword arguments, to
+    run once the current transaction commits
+    Dates and decimals in the payload arrive as strings
+    """
+    spec = JOBS[name]
+    if settings.JOBS_RUN_INLINE:
+        # Same arguments the worker would pass
+        payload = json.loads(json.dumps(payload, cls=DjangoJSONEncoder))
+        transaction.on_commit(lambda: _run_inline(name, spec, payload))
+        return None
+    return Job.objects.create(name=name, queue=spec.queue, payload=payload)
+
+
+def _run_inline(name, spec, payload):
+    try:
+        with transaction.atomic():
+            spec.func(**payload)
+    except Exception:
+        logger.exception('Job %s failed', name)
+
+
+def worker_name():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def claim_jobs(queue, limit, worker=None):
+    """
+    Mark up to limit due jobs of a queue as running and return them,
+    keeping at most JOBS_QUEUE_CONCURRENCY[queue] running across workers
+    The claim is one UPDATE, so concurrent workers never share a job, and
+    it rechecks the running jobs itself: a worker that claimed after the
+    count below makes it claim nothing rather than exceed the limit
+    """
+    concurrency = settings.JOBS_QUEUE_CONCURRENCY.get(queue)
+    if concurrency is not None:
+        limit = min(limit, concurrency - running_jobs(queue))
+    if limit <= 0:
+        return []
+    now = timezone.now()
+    token = f'{worker or worker_name()}:{uuid.uuid4().hex[:12]}'
+    due = Job.objects.filter(queue=queue, status='queued', run_at__lte=now).order_by('run_at', 'id')
+    claimable = Job.objects.filter(id__in=due.values('id')[:limit], status='queued')
+    if concurrency is not None:
+        running = Job.objects.filter(queue=queue, status='running').order_by().values('queue').annotate(
+            count=Count('id')
+        ).values('count')
+        claimable = claimable.alias(running=Coalesce(Subquery(running), 0)).filter(
+            running__lte=concurrency - limit
+        )
+    claimed = claimable.update(
+        status='running', claimed_by=token, started_at=now, attempts=F('attempts') + 1
+    )
+    if not claimed:
+        return []
+    return list(Job.objects.filter(queue=queue, status='running', claimed_by=token).order_by('run_at', 'id'))
+
+
+def _max_attempts(spec):
+    return (spec.max_attempts if spec else None) or settings.JOBS_MAX_ATTEMPTS
+
+
+def run_job(job):
+    """
+    Run a claimed job; returns True when it succeeded
+    """
+    spec = JOBS.get(job.name)
+    try:
+        if spec is None:
+            raise LookupError(f'No job is registered as "{job.name}".')
+        if job.attempts > _max_attempts(spec):
+            # Queued again after its last attempt took the worker down
+            raise RuntimeError(f'Gave up after {job.attempts - 1} attempts.')
+        with transaction.atomic():
+            spec.func(**job.payload)
+            deleted, _ = Job.objects.filter(id=job.id, claimed_by=job.claimed_by).delete()
+            if not deleted:
+                raise JobLost(f'Job {job.id} was cancelled or claimed by another worker.')
+        return True
+    except JobLost:
+        logger.warning(
+            'Job %s (%s) was cancelled or ran past JOBS_RUNNING_TIMEOUT; its work was rolled back', job.id, job.name
+        )
+        return False
+    except Exception:
+        _record_failure(job, spec)
+        return False
+
+
+def _record_failure(job, spec):
+    """
+    Queue a failed job for a later attempt, or mark it failed after its last
+    """
+    error = traceback.format_exc()[-ERROR_LENGTH:]
+    gave_up = spec is None or job.attempts >= _max_attempts(spec)
+    if gave_up:
+        changes = {'status': 'failed'}
+    else:
+        delay = settings.JOBS_RETRY_DELAY * 2 ** (job.attempts - 1)
+        changes = {'status': 'queued', 'run_at': timezone.now() + timedelta(seconds=delay)}
+    updated = Job.objects.filter(id=job.id, claimed_by=job.claimed_by).update(
+        claimed_by='', started_at=None, last_error=error, **changes
+    )
+    if not updated:
+        logger.warning('Job %s (%s) failed after it was cancelled or claimed by another worker', job.id, job.name)
+    elif gave_up:
+        logger.error('Job %s (%s) failed for good after %s attempt(s)', job.id, job.name, job.attempts)
+    else:
+        logger.warning('Job %s (%s) failed, retrying in %ss', job.id, job.name, delay)
+
+
+def requeue_stale_jobs(timeout=None):
+    """
+    Queue again the jobs running for longer than timeout seconds (default
+    JOBS_RUNNING_TIMEOUT), whose workers are assumed dead
+    Returns the number of jobs queued again
+    """
+    if timeout is None:
+        timeout = settings.JOBS_RUNNING_TIMEOUT
+    cutoff = timezone.now() - timedelta(seconds=timeout)
+    return Job.objects.filter(status='running', started_at__lt=cutoff).update(
+        status='queued', claimed_by='', started_at=None, run_at=timezone.now()
+    )
+
+
+def retry_failed_jobs(queues=None):
+    """
+    Queue the failed jobs again with fresh attempts; returns their number
+    """
+    jobs = Job.objects.filter(status='failed')
+    if queues is not None:
+        jobs = jobs.filter(queue__in=queues)
+    return jobs.update(status='queued', attempts=0, run_at=timezone.now())
+
+
+def running_jobs(queue):
+    return Job.objects.filter(queue=queue, status='running').count()
+
+
+def _empty_metrics():
+    return {'queued': 0, 'due': 0, 'running': 0, 'failed': 0, 'oldest_due_seconds': 0}
+
+
+def queue_metrics():
+    """
+    Depth of every queue: {queue: {'queued', 'due', 'running', 'failed',
+    'oldest_due_seconds'}}, where oldest_due_seconds is how long the oldest
+    due job has been waiting for a worker
+    """
+    now = timezone.now()
+    metrics = {queue: _empty_metrics() for queue in settings.JOBS_QUEUE_CONCURRENCY}
+    rows = Job.objects.order_by().values('queue', 'status').annotate(
+        jobs=Count('id'),
+        due=Count('id', filter=Q(run_at__lte=now)),
+        oldest_due=Min('run_at', filter=Q(run_at__lte=now)),
+    )
+    for row in rows:
+        queue = metrics.setdefault(row['queue'], _empty_metrics())
+        queue[row['status']] = row['jobs']
+        if row['status'] == 'queued':
+            queue['due'] = row['due']
+            if row['oldest_due'] is not None:
+                queue['oldest_due_seconds'] = round((now - row['oldest_due']).total_seconds(), 1)
+    return metrics
@@ -0,0 +1,321 @@
+"""
+Concurrent-request throughput of the task API under ASGI and WSGI
+
+Seeds a throwaway SQLite database and drives Django's own WSGIHandler and
+ASGIHandler in process, with no HTTP server or network in between, so the
+numbers compare the request paths rather than servers:
+
+  wsgi       sync views (api_views.py), one thread per concurrent request,
+             like a threaded WSGI server
+  asgi       async views (async_api_views.py) in one event loop; Django
+             4.2's async ORM still runs each query in a per-request thread
+  asgi-sync  sync views under ASGI, which Django runs in a worker thread
+
+Each endpoint is hit with --requests requests at every --concurrency level.
+Every request should succeed: the command fails if any answers 4xx or 5xx.
+
+Usage: python manage.py benchmark_asgi --tasks 10k --concurrency 1,8,32
+"""
+
+import asyncio
+import io
+import json
+import logging
+import os
+import shutil
+import tempfile
+import time
+import types
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+from django.urls import path
+
+from tasks import api_views, async_api_views
+from tasks.models import CustomUser, Task
+from tasks.seeding import Seeder, parse_size
+from tasks.serializers import CustomTokenObtainPairSerializer
+
+
+MODES = {
+    # mode: (views module, handler)
+    'wsgi': (api_views, 'wsgi'),
+    'asgi': (async_api_views, 'asgi'),
+    'asgi-sync': (api_views, 'asgi'),
+}
+
+ENDPOINTS = ('list', 'report', 'update')
+
+# Users whose tasks the requests are spread over
+BENCHMARK_USERS = 20
+
+
+def build_urlconf(views):
+    """
+    URLconf module serving the sync or async task endpoints at their usual paths
+    """
+    urlconf = types.ModuleType('benchmark_asgi_urls')
+    urlconf.urlpatterns = [
+        path('api/tasks/', views.get_tasks, name='api_get_tasks'),
+        path('api/tasks/<int:id>/', views.update_task, name='api_update_task'),
+        path('api/tasks/<int:id>/report/', views.get_task_report, name='api_task_report'),
+    ]
+    return urlconf
+
+
+def percentile(sorted_values, fraction):
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def call_wsgi(handler, method, url, token, body, content_type='application/json', extra=None):
+    """
+    Send one request through a WSGI application; returns the status code
+    token may be None for session requests, whose cookies go in extra
+    """
+    path_info, _, query = url.partition('?')
+    environ = {
+        'REQUEST_METHOD': method,
+        'PATH_INFO': path_info,
+        'QUERY_STRING': query,
+        'SCRIPT_NAME': '',
+        'SERVER_NAME': 'testserver',
+        'SERVER_PORT': '80',
+        'SERVER_PROTOCOL': 'HTTP/1.1',
+        'HTTP_HOST': 'testserver',
+        'CONTENT_TYPE': content_type,
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': io.StringIO(),
+        'wsgi.url_scheme': 'http',
+        'wsgi.version': (1, 0),
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+        **(extra or {}),
+    }
+    if token is not None:
+        environ['HTTP_AUTHORIZATION'] = f'Bearer {token}'
+    statuses = []
+
+    def start_response(status, headers, exc_info=None):
+        statuses.append(int(status.split()[0]))
+
+    response = handler(environ, start_response)
+    try:
+        b''.join(response)
+    finally:
+        response.close()
+    return statuses[0]
+
+
+async def call_asgi(application, method, url, token, body):
+    """
+    Send one request through an ASGI application; returns the status code
+    """
+    path_info, _, query = url.partition('?')
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': method,
+        'scheme': 'http',
+        'path': path_info,
+        'raw_path': path_info.encode(),
+        'query_string': query.encode(),
+        'root_path': '',
+        'headers': [
+            (b'host', b'testserver'),
+            (b'authorization', f'Bearer {token}'.encode()),
+            (b'content-type', b'application/json'),
+            (b'content-length', str(len(body)).encode()),
+        ],
+        'client': ('127.0.0.1', 0),
+        'server': ('testserver', 80),
+    }
+    messages = [{'type': 'http.request', 'body': body, 'more_body': False}]
+    statuses = []
+
+    async def receive():
+        return messages.pop(0) if messages else {'type': 'http.disconnect'}
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            statuses.append(message['status'])
+
+    await application(scope, receive, send)
+    return statuses[0]
+
+
+class Command(BaseCommand):
+    help = 'Compare concurrent-request throughput of the task API under ASGI (async views) and WSGI'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tasks', default='10k', help='Task volume to seed, e.g. 10k or 1M (default: 10k)')
+        parser.add_argument(
+            '--concurrency', default='1,8,32',
+            help='Comma separated numbers of requests in flight (default: 1,8,32)'
+        )
+        parser.add_argument('--requests', type=int, default=400, help='Requests per run (default: 400)')
+        parser.add_argument(
+            '--modes', default=','.join(MODES),
+            help=f'Comma separated request paths to compare (default: {",".join(MODES)})'
+        )
+        parser.add_argument(
+            '--endpoints', default=','.join(ENDPOINTS),
+            help=f'Comma separated endpoints to hit (default: {",".join(ENDPOINTS)})'
+        )
+        parser.add_argument('--json', dest='json_path', help='Write raw results to this JSON file')
+
+    def handle(self, *args, **options):
+        try:
+            size = parse_size(options['tasks'])
+            levels = [int(level) for level in options['concurrency'].split(',')]
+        except ValueError as e:
+            raise CommandError(str(e))
+        if options['requests'] <= 0 or any(level <= 0 for level in levels):
+            raise CommandError('--requests and --concurrency must be positive.')
+        modes = options['modes'].split(',')
+        endpoints = options['endpoints'].split(',')
+        unknown = sorted(set(modes) - set(MODES)) + sorted(set(endpoints) - set(ENDPOINTS))
+        if unknown:
+            raise CommandError(f'Unknown mode or endpoint: {", ".join(unknown)}')
+
+        # Worker threads need their own connections to one database, which
+        # SQLite's shared in-memory test database does not handle under writes
+        test_dir = tempfile.mkdtemp()
+        connection.settings_dict['TEST']['NAME'] = os.path.join(test_dir, 'benchmark_asgi.sqlite3')
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            # Only the test database is seeded; replicas would be stale copies
+            with override_settings(DATABASE_REPLICAS=[]):
+                results = self.run_benchmarks(size, modes, endpoints, levels, options['requests'])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+            shutil.rmtree(test_dir, ignore_errors=True)
+
+        if options['json_path']:
+            with open(options['json_path'], 'w') as f:
+                json.dump({'tasks': size, 'requests': options['requests'], 'results': results}, f, indent=2)
+
+        errors = sum(result['errors'] for result in results)
+        if errors:
+            raise CommandError(f'{errors} request(s) failed; see the errors column.')
+        self.stdout.write(self.style.SUCCESS('All requests succeeded.'))
+
+    def run_benchmarks(self, size, modes, endpoints, levels, count):
+        self.stdout.write(f'Seeding {size} tasks...')
+        Seeder().seed(size)
+        workloads = {endpoint: self.build_requests(endpoint, count) for endpoint in endpoints}
+        # Connections are opened per request by the handlers
+        connection.close()
+
+        self.stdout.write(
+            f'{"endpoint":<8} {"mode":<10} {"conc":>5} {"req/s":>8} '
+            f'{"p50 ms":>8} {"p95 ms":>8} {"p99 ms":>8} {"errors":>6}'
+        )
+        results = []
+        # Failed requests are counted, not logged one traceback at a time
+        request_logger = logging.getLogger('django.request')
+        request_logger.disabled = True
+        try:
+            for endpoint in endpoints:
+                self.run_endpoint(endpoint, workloads[endpoint], modes, levels, results)
+        finally:
+            request_logger.disabled = False
+        return results
+
+    def run_endpoint(self, endpoint, requests, modes, levels, results):
+        for mode in modes:
+            views, handler = MODES[mode]
+            with override_settings(ROOT_URLCONF=build_urlconf(views)):
+                for level in levels:
+                    run = self.wsgi_run if handler == 'wsgi' else self.asgi_run
+                    elapsed, latencies, errors = run(requests, level)
+                    latencies.sort()
+                    result = {
+                        'endpoint': endpoint,
+                        'mode': mode,
+                        'concurrency': level,
+                        'requests_per_second': len(latencies) / elapsed,
+                        'p50_ms': percentile(latencies, 0.50) * 1000,
+                        'p95_ms': percentile(latencies, 0.95) * 1000,
+                        'p99_ms': percentile(latencies, 0.99) * 1000,
+                        'errors': errors,
+                    }
+                    results.append(result)
+                    self.stdout.write(
+                        f'{endpoint:<8} {mode:<10} {level:>5} {result["requests_per_second"]:>8.1f} '
+                        f'{result["p50_ms"]:>8.2f} {result["p95_ms"]:>8.2f} {result["p99_ms"]:>8.2f} '
+                        f'{errors:>6}'
+                    )
+
+    def build_requests(self, endpoint, count):
+        """
+        (method, url, token, body) tuples spread over the first users' tasks
+        """
+        users = list(CustomUser.objects.filter(role='user').order_by('id')[:BENCHMARK_USERS])
+        if endpoint == 'list':
+            tokens = [str(CustomTokenObtainPairSerializer.get_token(user).access_token) for user in users]
+            specs = [('GET', '/api/tasks/?page_size=50', token, b'') for token in tokens]
+        elif endpoint == 'report':
+            specs = []
+            for user in users:
+                task = Task.objects.filter(assigned_to=user, status='completed').order_by('id').first()
+                admin = CustomUser.objects.get(id=user.assigned_to_admin_id)
+                token = str(CustomTokenObtainPairSerializer.get_token(admin).access_token)
+                specs.append(('GET', f'/api/tasks/{task.id}/report/', token, b''))
+        else:
+            specs = []
+            for user in users:
+                token = str(CustomTokenObtainPairSerializer.get_token(user).access_token)
+                for task in Task.objects.filter(assigned_to=user).exclude(status='completed').order_by('id')[:5]:
+                    for status in ('in_progress', 'pending'):
+                        body = json.dumps({'status': status}).encode()
+                        specs.append(('PUT', f'/api/tasks/{task.id}/', token, body))
+        return [specs[i % len(specs)] for i in range(count)]
+
+    def wsgi_run(self, requests, concurrency):
+        handler = WSGIHandler()
+
+        def timed(spec):
+            start = time.perf_counter()
+            status = call_wsgi(handler, *spec)
+            return time.perf_counter() - start, status
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            outcomes = list(pool.map(timed, requests))
+        elapsed = time.perf_counter() - start
+        return self.summarize(elapsed, outcomes)
+
+    def asgi_run(self, requests, concurrency):
+        application = ASGIHandler()
+
+        async def run():
+            pending = iter(requests)
+            outcomes = []
+
+            async def client():
+                for spec in pending:
+                    start = time.perf_counter()
+                    status = await call_asgi(application, *spec)
+                    outcomes.append((time.perf_counter() - start, status))
+
+            start = time.perf_counter()
+            await asyncio.gather(*(client() for _ in range(concurrency)))
+            return time.perf_counter() - start, outcomes
+
+        elapsed, outcomes = asyncio.run(run())
+        return self.summarize(elapsed, outcomes)
+
+    def summarize(self, elapsed, outcomes):
+        latencies = [latency for latency, _ in outcomes]
+        errors = sum(1 for _, status in outcomes if status >= 400)
+        return elapsed, latencies, errors
@@ -0,0 +1,126 @@
+"""
+Render time of the panel list pages with and without fragment caching
+
+Seeds a throwaway test database and requests the user and task list pages
+whose tables are cached per role scope (see tasks/fragments.py):
+
+  uncached  PANEL_FRAGMENT_CACHE_TIMEOUT = 0, so every request queries and
+            renders the whole table, as before fragment caching
+  cached    the table fragment is already in the cache, as for every
+            request after the first one since the last write
+
+Times are whole requests through the test client, also reported per 1000
+table rows so the sizes can be compared.
+
+Usage: python manage.py benchmark_fragments --rows 1k,5k
+"""
+
+import json
+import time
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+from django.urls import reverse
+
+from tasks.seeding import Seeder, parse_size
+
+
+# (URL name, role, query string) of the pages with cached tables
+PAGES = (
+    ('superadmin_manage_users', 'superadmin', ''),
+    ('admin_view_users', 'admin', ''),
+    ('superadmin_manage_tasks', 'superadmin', '?page_size=200'),
+)
+
+
+class Command(BaseCommand):
+    help = 'Compare render time of the panel list pages with and without fragment caching'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rows', default='1k,5k',
+            help='Comma separated user and task volumes to seed, e.g. 1k,10k (default: 1k,5k)'
+        )
+        parser.add_argument('--repeat', type=int, default=5, help='Timed runs per page (default: 5)')
+        parser.add_argument('--json', dest='json_path', help='Write raw results to this JSON file')
+
+    def handle(self, *args, **options):
+        try:
+            sizes = sorted(parse_size(size) for size in options['rows'].split(','))
+        except ValueError as e:
+            raise CommandError(str(e))
+        if options['repeat'] <= 0 or any(size <= 0 for size in sizes):
+            raise CommandError('--rows and --repeat must be positive.')
+
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            # Only the test database is seeded; replicas would be stale copies
+            with override_settings(DATABASE_REPLICAS=[]):
+                results = self.run_benchmarks(sizes, options['repeat'])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        if options['json_path']:
+            with open(options['json_path'], 'w') as f:
+                json.dump({'sizes': sizes, 'results': results}, f, indent=2)
+
+    def run_benchmarks(self, sizes, repeat):
+        seeder = Seeder()
+        results = []
+        for size in sizes:
+            self.stdout.write(f'Seeding {size} users and tasks...')
+            seeder.seed(size, total_users=size)
+            # bulk_create bypasses the signals that bump fragment versions
+            cache.clear()
+            fixtures = seeder.fixtures()
+            self.stdout.write(
+                f'{"page":<26} {"size":>7} {"rows":>6} {"uncached ms":>12} {"cached ms":>10} '
+                f'{"uncached /1k":>13} {"cached /1k":>11} {"speedup":>8}'
+            )
+            for name, role, query in PAGES:
+                client = Client()
+                client.force_login(fixtures[role])
+                url = reverse(name) + query
+                result = self.measure(client, url, repeat)
+                result.update({'page': name, 'size': size})
+                results.append(result)
+                self.stdout.write(
+                    f'{name:<26} {size:>7} {result["rows"]:>6} {result["uncached_ms"]:>12.2f} '
+                    f'{result["cached_ms"]:>10.2f} {result["uncached_ms_per_1k_rows"]:>13.2f} '
+                    f'{result["cached_ms_per_1k_rows"]:>11.2f} {result["speedup"]:>7.1f}x'
+                )
+        return results
+
+    def measure(self, client, url, repeat):
+        with override_settings(PANEL_FRAGMENT_CACHE_TIMEOUT=0):
+            response = client.get(url)
+            uncached = self.time_requests(client, url, repeat)
+        if response.status_code != 200:
+            raise CommandError(f'{url} returned {response.status_code}')
+        # Table rows, without the header row
+        rows = max(response.content.count(b'<tr>') - 1, 1)
+
+        # The first request fills the cache
+        client.get(url)
+        cached = self.time_requests(client, url, repeat)
+        return {
+            'rows': rows,
+            'uncached_ms': round(uncached * 1000, 2),
+            'cached_ms': round(cached * 1000, 2),
+            'uncached_ms_per_1k_rows': round(uncached * 1000 * 1000 / rows, 2),
+            'cached_ms_per_1k_rows': round(cached * 1000 * 1000 / rows, 2),
+            'speedup': round(uncached / cached, 1),
+        }
+
+    def time_requests(self, client, url, repeat):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            client.get(url)
+            timings.append(time.perf_counter() - start)
+        return min(timings)
@@ -0,0 +1,90 @@
+"""
+Per-row cost of the task API read path: DRF serializers vs the values() fast path
+
+Seeds a throwaway test database, then renders the same tasks with
+TaskSerializer / TaskReportSerializer + JSONRenderer (the stock path) and
+with ValuesSerializer + ORJSONRenderer (the path the API views use). Fails
+if the two produce different bytes.
+
+Usage: python manage.py benchmark_serializers --rows 10k
+"""
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+from rest_framework.renderers import JSONRenderer
+
+from tasks.models import Task
+from tasks.renderers import ORJSONRenderer
+from tasks.seeding import Seeder, parse_size
+from tasks.serializers import TaskReportSerializer, TaskSerializer, ValuesSerializer
+
+
+# Text that exercises escaping in both renderers
+AWKWARD_TEXT = 'Quotes " and \\ backslash, tab\t, newline\n,   separator, café \U0001f680'
+
+
+class Command(BaseCommand):
+    help = 'Compare per-row serialization cost of the DRF and values() read paths'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', default='10k', help='Tasks to serialize, e.g. 1k or 100k (default: 10k)')
+        parser.add_argument('--repeat', type=int, default=3, help='Timed runs per path; the best is kept (default: 3)')
+
+    def handle(self, *args, **options):
+        try:
+            rows = parse_size(options['rows'])
+        except ValueError as e:
+            raise CommandError(str(e))
+        if rows <= 0:
+            raise CommandError('--rows must be positive.')
+
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            mismatches = self.run_benchmarks(rows, options['repeat'])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        if mismatches:
+            raise CommandError(f'Fast path output differs for: {", ".join(mismatches)}')
+        self.stdout.write(self.style.SUCCESS('Fast path output is byte-identical.'))
+
+    def run_benchmarks(self, rows, repeat):
+        self.stdout.write(f'Seeding {rows} tasks...')
+        Seeder().seed(rows)
+        Task.objects.filter(pk__in=Task.objects.order_by('id').values('id')[:10]).update(
+            title=AWKWARD_TEXT, description=AWKWARD_TEXT, completion_report=AWKWARD_TEXT,
+        )
+        queryset = Task.objects.order_by('id')[:rows]
+
+        self.stdout.write(f'{"serializer":<22} {"path":<8} {"us/row":>8} {"total ms":>9}')
+        mismatches = []
+        for serializer_class in (TaskSerializer, TaskReportSerializer):
+            name = serializer_class.__name__
+
+            def stock():
+                tasks = list(queryset.select_related('assigned_to'))
+                return JSONRenderer().render(serializer_class(tasks, many=True).data)
+
+            def fast():
+                serializer = ValuesSerializer(serializer_class)
+                return ORJSONRenderer().render(serializer.serialize(serializer.values(queryset)))
+
+            outputs = {}
+            for label, render in (('stock', stock), ('fast', fast)):
+                best = None
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    outputs[label] = render()
+                    elapsed = time.perf_counter() - start
+                    best = elapsed if best is None else min(best, elapsed)
+                self.stdout.write(
+                    f'{name:<22} {label:<8} {best / rows * 1e6:>8.2f} {best * 1000:>9.1f}'
+                )
+            if outputs['stock'] != outputs['fast']:
+                mismatches.append(name)
+        return mismatches
@@ -0,0 +1,241 @@
+"""
+Query-count and latency regression benchmark for every panel and API view
+
+Seeds a throwaway test database at increasing data volumes, requests every
+URL in tasks/panel_urls.py and tasks/api_urls.py as the matching role and
+records query count, wall time and peak Python memory per view. The command
+fails when a view's query count grows with the number of rows, which is the
+signature of an N+1 query.
+
+Usage: python manage.py benchmark_views --sizes 1k,100k,1M
+"""
+
+import json
+import time
+import tracemalloc
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import (
+    CaptureQueriesContext, override_settings, setup_test_environment, teardown_test_environment
+)
+from django.urls import reverse
+
+from tasks import api_urls, panel_urls
+from tasks.changes import encode_cursor
+from tasks.seeding import BENCH_PASSWORD, Seeder, parse_size
+from tasks.serializers import CustomTokenObtainPairSerializer
+
+
+# Every URL name in the task urlconfs must have an entry here:
+# (method, role, kwargs source, request data)
+# role is one of 'anonymous', 'superadmin', 'admin', 'user', 'api_user', 'api_admin', 'api_superadmin'
+# kwargs source names the seeded object whose id fills the URL
+VIEW_REQUESTS = {
+    'panel_login': ('get', 'anonymous', None, None),
+    'panel_logout': ('get', 'admin', None, None),
+    # Event streams are refused to the (WSGI) test client, so only that path is timed
+    'panel_task_events': ('get', 'user', None, None),
+    'superadmin_dashboard': ('get', 'superadmin', None, None),
+    'superadmin_manage_admins': ('get', 'superadmin', None, None),
+    'superadmin_create_admin': ('get', 'superadmin', None, None),
+    'superadmin_delete_admin': ('get', 'superadmin', 'admin', None),
+    'superadmin_manage_users': ('get', 'superadmin', None, None),
+    'superadmin_create_user': ('get', 'superadmin', None, None),
+    'superadmin_edit_user': ('get', 'superadmin', 'user', None),
+    'superadmin_delete_user': ('get', 'superadmin', 'user', None),
+    'superadmin_manage_tasks': ('get', 'superadmin', None, None),
+    'superadmin_export_tasks': ('get', 'superadmin', None, None),
+    'superadmin_view_task_report': ('get', 'superadmin', 'completed_task', None),
+    'admin_dashboard': ('get', 'admin', None, None),
+    'admin_view_users': ('get', 'admin', None, None),
+    'admin_manage_tasks': ('get', 'admin', None, None),
+    'admin_create_task': ('get', 'admin', None, None),
+    'admin_edit_task': ('get', 'admin', 'task', None),
+    'admin_delete_task': ('get', 'admin', 'task', None),
+    'admin_view_task_report': ('get', 'admin', 'completed_task', None),
+    'user_login': ('get', 'anonymous', None, None),
+    'user_logout': ('get', 'user', None, None),
+    'user_dashboard': ('get', 'user', None, None),
+    'user_view_task': ('get', 'user', 'task', None),
+    'user_update_task': ('post', 'user', 'task', {'status': 'in_progress'}),
+    'token_obtain_pair': ('post', 'anonymous', None, 'credentials'),
+    'token_refresh': ('post', 'anonymous', None, 'refresh_token'),
+    'api_get_tasks': ('get', 'api_user', None, None),
+    'api_get_task_changes': ('get', 'api_user', None, 'changes_cursor'),
+    'api_bulk_create_tasks': ('post', 'api_admin', None, 'bulk_tasks'),
+    'api_batch_update_tasks': ('put', 'api_user', None, 'batch_updates'),
+    'api_update_task': ('put', 'api_user', 'task', {'status': 'in_progress'}),
+    'api_task_report': ('get', 'api_admin', 'completed_task', None),
+    'api_export_tasks': ('get', 'api_superadmin', None, None),
+    'api_search_tasks': ('get', 'api_user', None, {'q': 'invoice'}),
+    'api_task_analytics': ('get', 'api_admin', None, {'period': 'day'}),
+    'api_task_analytics_users': ('get', 'api_superadmin', None, None),
+    'api_task_events': ('get', 'api_user', None, None),
+    'api_job_metrics': ('get', 'api_superadmin', None, None),
+    'api_request_profiling': ('get', 'api_superadmin', None, None),
+}
+
+URL_KWARG_NAMES = ('task_id', 'admin_id', 'user_id', 'id')
+
+
+class Command(BaseCommand):
+    help = 'Benchmark query count, wall time and peak memory of every panel and API view'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', default='1k,10k',
+            help='Comma separated task volumes to seed, e.g. 1k,100k,1M (default: 1k,10k)'
+        )
+        parser.add_argument('--repeat', type=int, default=3, help='Timed runs per view (default: 3)')
+        parser.add_argument('--json', dest='json_path', help='Write raw results to this JSON file')
+
+    def handle(self, *args, **options):
+        try:
+            sizes = sorted(parse_size(size) for size in options['sizes'].split(','))
+        except ValueError as e:
+            raise CommandError(str(e))
+        if len(sizes) < 2:
+            raise CommandError('At least two sizes are needed to detect query growth.')
+
+        view_names = self.collect_view_names()
+        missing = sorted(view_names - set(VIEW_REQUESTS))
+        if missing:
+            raise CommandError(f'No benchmark request defined for: {", ".join(missing)}')
+
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            # Only the test database is seeded; replicas would be stale copies
+            with override_settings(DATABASE_REPLICAS=[]):
+                results = self.run_benchmarks(sizes, sorted(view_names), options['repeat'])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        self.report(sizes, results)
+        if options['json_path']:
+            with open(options['json_path'], 'w') as f:
+                json.dump({'sizes': sizes, 'results': results}, f, indent=2)
+
+        regressions = [
+            name for name, per_size in results.items()
+            if per_size[str(sizes[-1])]['queries'] > per_size[str(sizes[0])]['queries']
+        ]
+        if regressions:
+            raise CommandError(f'Query count grows with row count for: {", ".join(regressions)}')
+        self.stdout.write(self.style.SUCCESS('No view query count grows with row count.'))
+
+    def collect_view_names(self):
+        return {
+            pattern.name
+            for pattern in panel_urls.urlpatterns + api_urls.urlpatterns
+            if pattern.name
+        }
+
+    def run_benchmarks(self, sizes, view_names, repeat):
+        seeder = Seeder()
+        results = {name: {} for name in view_names}
+        for size in sizes:
+            self.stdout.write(f'Seeding {size} tasks...')
+            seeder.seed(size)
+            # bulk_create bypasses the signals that invalidate cached stats
+            cache.clear()
+            fixtures = seeder.fixtures()
+            for name in view_names:
+                results[name][str(size)] = self.measure(name, fixtures, repeat)
+        return results
+
+    def build_request(self, name, fixtures):
+        method, role, kwargs_source, data = VIEW_REQUESTS[name]
+
+        kwargs = {}
+        if kwargs_source:
+            pattern = next(
+                p for p in panel_urls.urlpatterns + api_urls.urlpatterns if p.name == name
+            )
+            kwarg_name = next(k for k in URL_KWARG_NAMES if k in pattern.pattern.converters)
+            kwargs[kwarg_name] = fixtures[kwargs_source].id
+        url = reverse(name, kwargs=kwargs)
+
+        client = Client()
+        headers = {}
+        if role in ('superadmin', 'admin', 'user'):
+            client.force_login(fixtures[role])
+        elif role in ('api_user', 'api_admin', 'api_superadmin'):
+            token = CustomTokenObtainPairSerializer.get_token(fixtures[role[4:]]).access_token
+            headers['HTTP_AUTHORIZATION'] = f'Bearer {token}'
+
+        if data == 'credentials':
+            data = {'username': fixtures['user'].username, 'password': BENCH_PASSWORD}
+        elif data == 'refresh_token':
+            data = {'refresh': str(CustomTokenObtainPairSerializer.get_token(fixtures['user']))}
+        elif data == 'bulk_tasks':
+            data = [
+                {'title': f'Bulk task {i}', 'description': 'Bulk task description.',
+                 'assigned_to': fixtures['user'].id, 'due_date': '2030-01-01'}
+                for i in range(10)
+            ]
+        elif data == 'batch_updates':
+            data = [{'id': fixtures['task'].id, 'status': 'in_progress'}]
+        elif data == 'changes_cursor':
+            data = {'since': encode_cursor(0)}
+
+        def send():
+            if method == 'get':
+                response = client.get(url, data=data, **headers)
+            elif url.startswith('/api/'):
+                response = getattr(client, method)(url, data=data, content_type='application/json', **headers)
+            else:
+                response = getattr(client, method)(url, data=data, **headers)
+            # Streamed bodies are produced while they are read
+            if response.streaming:
+                response.streaming_content = [b''.join(response.streaming_content)]
+            return response
+
+        return send
+
+    def measure(self, name, fixtures, repeat):
+        # Logout views end the session, so every run gets a fresh client
+        send = self.build_request(name, fixtures)
+        response = send()
+        if response.status_code >= 500:
+            raise CommandError(f'{name} returned {response.status_code}')
+
+        timings = []
+        queries = 0
+        for _ in range(repeat):
+            send = self.build_request(name, fixtures)
+            with CaptureQueriesContext(connection) as captured:
+                start = time.perf_counter()
+                send()
+                timings.append(time.perf_counter() - start)
+            queries = len(captured)
+
+        send = self.build_request(name, fixtures)
+        tracemalloc.start()
+        try:
+            send()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+        return {
+            'status': response.status_code,
+            'queries': queries,
+            'time_ms': round(min(timings) * 1000, 2),
+            'peak_kb': round(peak / 1024, 1),
+        }
+
+    def report(self, sizes, results):
+        header = f'{"view":<32}' + ''.join(f'{size:>28}' for size in sizes)
+        self.stdout.write(header)
+        self.stdout.write(f'{"":<32}' + ''.join(f'{"queries / ms / peak KB":>28}' for _ in sizes))
+        for name, per_size in results.items():
+            row = f'{name:<32}'
+            for size in sizes:
+                r = per_size[str(size)]
+                row += f'{r["queries"]:>8} / {r["time_ms"]:>8} / {r["peak_kb"]:>8}'
+            self.stdout.write(row)
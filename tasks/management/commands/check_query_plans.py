@@ -0,0 +1,167 @@
+"""
+EXPLAIN QUERY PLAN assertions for the querysets behind every hot view
+
+Seeds a throwaway SQLite test database, runs ANALYZE so the planner sees
+realistic statistics, then fails if any listed queryset needs a full
+table scan or a temporary B-tree sort. tasks/tests/test_query_plans.py
+runs the same checks in the test suite.
+
+Usage: python manage.py check_query_plans --tasks 1M
+"""
+
+import re
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count, Sum
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.utils import timezone
+
+from tasks.models import CustomUser, Job, Task, TaskChange, TaskRollup, UserTaskStats
+from tasks.rollups import period_start, user_rollups_queryset
+from tasks.search import admin_search_scope, search_tasks
+from tasks.seeding import Seeder, parse_size
+
+
+def hot_querysets(fixtures):
+    """
+    (name, queryset, allowed plan issues) for the queries the views run
+    Keep in sync with tasks/panel_views.py, tasks/api_views.py, tasks/stats.py, tasks/rollups.py,
+    tasks/changes.py and tasks/jobs.py
+    """
+    user = fixtures['user']
+    admin = fixtures['admin']
+    user_tasks = Task.objects.filter(assigned_to=user)
+    admin_tasks = Task.objects.for_admin(admin)
+    today = timezone.localdate()
+    return [
+        # API task list: one keyset page per sort key
+        ('get_tasks -created_at', user_tasks.order_by('-created_at', '-id')[:51], ()),
+        ('get_tasks due_date', user_tasks.order_by('due_date', 'id')[:51], ()),
+        ('get_tasks status', user_tasks.order_by('status', 'id')[:51], ()),
+        # Delta sync: the user's changes after a cursor, then their tasks
+        ('get_task_changes', TaskChange.objects.filter(user_id=user.id, id__gt=0).order_by('id').values_list(
+            'id', 'task_id', 'deleted')[:501], ()),
+        ('get_task_changes latest', TaskChange.objects.filter(user_id=user.id).order_by('-id').values_list(
+            'id', flat=True)[:1], ()),
+        ('get_task_changes tasks', user_tasks.filter(id__in=[fixtures['task'].id]), ()),
+        ('get_task_report', Task.objects.filter(id=fixtures['completed_task'].id).order_by(), ()),
+        # User dashboard
+        ('user_dashboard tasks', user_tasks.order_by('-created_at'), ()),
+        ('user_dashboard stats', user_tasks.order_by().values('status').annotate(n=Count('id')), ()),
+        ('user completed tasks', user_tasks.filter(status='completed').order_by('-created_at'), ()),
+        # Admin views
+        ('admin_dashboard stats', CustomUser.objects.filter(assigned_to_admin=admin, role='user').values(
+            'assigned_to_admin').annotate(n=Count('id'), tasks=Sum('task_stats__total_tasks')), ()),
+        ('admin_view_users', CustomUser.objects.filter(assigned_to_admin=admin, role='user').select_related(
+            'task_stats').order_by('-date_joined'), ()),
+        # Depending on the admin's share of the table, SQLite either walks
+        # the created_at index or searches each user's tasks and sorts them
+        ('admin_manage_tasks', admin_tasks.select_related('assigned_to').order_by('-created_at'),
+         ('SCAN', 'TEMP B-TREE')),
+        ('admin_edit_task', admin_tasks.filter(id=fixtures['task'].id).order_by(), ()),
+        # SuperAdmin views: the dashboard counts every row by design, the
+        # task list walks the created_at or due_date index and stops after one page
+        ('superadmin_dashboard users', CustomUser.objects.order_by().values('role').annotate(n=Count('id')),
+         ('SCAN',)),
+        ('superadmin_dashboard tasks', Task.objects.order_by().values('status').annotate(n=Count('id')),
+         ('SCAN',)),
+        ('superadmin_manage_admins', CustomUser.objects.filter(role='admin').order_by('-date_joined'), ()),
+        ('superadmin_manage_users', CustomUser.objects.filter(role='user').select_related(
+            'assigned_to_admin', 'task_stats').order_by('-date_joined'), ()),
+        ('superadmin_manage_tasks', Task.objects.select_related('assigned_to', 'created_by').order_by(
+            '-created_at', '-id')[:51], ('SCAN',)),
+        ('superadmin_manage_tasks due_date', Task.objects.select_related('assigned_to', 'created_by').order_by(
+            'due_date', 'id')[:51], ('SCAN',)),
+        ('superadmin_manage_tasks status', Task.objects.filter(status='pending').select_related(
+            'assigned_to', 'created_by').order_by('-created_at', '-id')[:51], ()),
+        # Task search: the FTS index supplies the task ids; ranked results are
+        # sorted by bm25, at most TASKS_SEARCH_RANK_LIMIT of them
+        ('search_tasks user', search_tasks(user_tasks, 'invoice', [user.id])[0][:21], ('TEMP B-TREE',)),
+        ('search_tasks admin', search_tasks(admin_tasks, 'invoice billing', admin_search_scope(admin))[0][:21],
+         ('TEMP B-TREE',)),
+        ('search_tasks superadmin', search_tasks(Task.objects.all(), 'invoice')[0][:21], ('TEMP B-TREE',)),
+        # Analytics read one rollup row per bucket; the per-user breakdown
+        # sorts the users of one bucket by hours
+        ('task_analytics', TaskRollup.objects.filter(
+            scope='admin', scope_id=admin.id, period='day', period_start__range=(today - timedelta(days=30), today)
+        ), ()),
+        ('task_analytics_users', user_rollups_queryset('week', period_start(today, 'week')), ('TEMP B-TREE',)),
+        ('task_analytics_users admin', user_rollups_queryset('week', period_start(today, 'week'), admin.id),
+         ('TEMP B-TREE',)),
+        # Job worker: due jobs of a queue in order, its running jobs; the
+        # queue metrics count every row by design
+        ('claim_jobs', Job.objects.filter(queue='rollups', status='queued', run_at__lte=timezone.now()).order_by(
+            'run_at', 'id').values('id')[:2], ()),
+        ('claim_jobs claimed', Job.objects.filter(queue='rollups', status='running', claimed_by='worker').order_by(
+            'run_at', 'id'), ()),
+        ('job_metrics', Job.objects.order_by().values('queue', 'status').annotate(n=Count('id')), ('SCAN',)),
+    ]
+
+
+def plan_issues(plan, table_names):
+    """
+    Table scans (with or without an index) and temporary sorts found in a
+    SQLite query plan; only SEARCH steps bound the rows visited
+    """
+    issues = []
+    for line in plan.splitlines():
+        detail = line.strip()
+        if 'TEMP B-TREE' in detail:
+            issues.append(('TEMP B-TREE', detail))
+        scan = re.search(r'\bSCAN (\w+)', detail)
+        if scan and scan.group(1) in table_names:
+            issues.append(('SCAN', detail))
+    return issues
+
+
+class Command(BaseCommand):
+    help = 'Fail if a hot view queryset needs a full table scan or a temp B-tree sort'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tasks', default='10k', help='Task volume to seed, e.g. 100k or 1M (default: 10k)')
+
+    def handle(self, *args, **options):
+        self.verbosity = options['verbosity']
+        if connection.vendor != 'sqlite':
+            raise CommandError('Query plan checks are written for SQLite EXPLAIN QUERY PLAN output.')
+        try:
+            size = parse_size(options['tasks'])
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            failures = self.check_plans(size)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        if failures:
+            raise CommandError(f'Unindexed query plans: {", ".join(failures)}')
+        self.stdout.write(self.style.SUCCESS('All hot query plans passed.'))
+
+    def check_plans(self, size):
+        self.stdout.write(f'Seeding {size} tasks...')
+        seeder = Seeder()
+        seeder.seed(size)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+        table_names = [model._meta.db_table for model in (CustomUser, Job, Task, TaskChange, UserTaskStats)]
+        failures = []
+        for name, queryset, allowed in hot_querysets(seeder.fixtures()):
+            plan = queryset.explain()
+            issues = [issue for issue in plan_issues(plan, table_names) if issue[0] not in allowed]
+            if issues:
+                failures.append(name)
+                self.stdout.write(self.style.ERROR(f'FAIL {name}'))
+                for _, detail in issues:
+                    self.stdout.write(f'    {detail}')
+            else:
+                self.stdout.write(f'ok   {name}')
+            if self.verbosity > 1:
+                self.stdout.write('    ' + plan.replace('\n', '\n    '))
+        return failures
@@ -0,0 +1,178 @@
+"""
+Generate synthetic accounts and tasks at production volumes
+
+Tops the database up to the given numbers of SuperAdmins, admins, users
+and tasks with tasks.seeding.DataGenerator. The distributions of
+assignments, due dates, statuses and worked hours are described there.
+Rows are written with bulk_create in batches, every account shares one
+precomputed password hash, and --workers generates and inserts task
+batches in that many processes. The same options and --seed give the same
+data on an empty database on the same day (or --as-of), whatever the
+number of workers.
+
+Without options it makes a small sample: a SuperAdmin, 2 admins, 5 users
+and 50 tasks. Every account's password is --password.
+
+With several workers on SQLite, concurrent batches wait for each other's
+write lock; SQLITE_PRODUCTION_MODE=1 adds WAL and retries on top.
+
+Usage: python manage.py generate_data --admins 500 --users 100k --tasks 10M --workers 4 --seed 42
+"""
+
+import math
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError, connections
+
+from tasks.counters import rebuild_user_task_stats
+from tasks.models import Task
+from tasks.rollups import parse_day, rebuild_rollups
+from tasks.seeding import (
+    BATCH_SIZE, SAMPLE_PASSWORD, DataGenerator, explicit_timestamps, generated_accounts, parse_size
+)
+
+
+# Task batch inputs of a worker process, set before it forks
+_worker_state = {}
+
+
+def insert_task_batch(args):
+    """
+    Generate and insert the rows skip to stop of one task batch; returns
+    the number of tasks inserted
+    """
+    batch, skip, stop = args
+    tasks = _worker_state['generator'].task_batch(
+        batch, _worker_state['user_ids'], _worker_state['user_weights'], _worker_state['admin_of'],
+        skip=skip, stop=stop,
+    )
+    with explicit_timestamps(Task):
+        Task.objects.bulk_create(tasks)
+    return len(tasks)
+
+
+class Command(BaseCommand):
+    help = 'Generate synthetic admins, users and tasks in bulk, reproducibly from a seed'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--superadmins', default='1', help='SuperAdmin accounts (default: 1)')
+        parser.add_argument('--admins', default='2', help='Admin accounts, e.g. 500 (default: 2)')
+        parser.add_argument('--users', default='5', help='Regular users, e.g. 100k (default: 5)')
+        parser.add_argument('--tasks', default='50', help='Tasks, e.g. 10M (default: 50)')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed (default: 0)')
+        parser.add_argument(
+            '--days', type=int, default=365, help='Tasks are created over this many past days (default: 365)'
+        )
+        parser.add_argument(
+            '--as-of', help='Date the data is generated as of, YYYY-MM-DD (default: today)'
+        )
+        parser.add_argument(
+            '--password', default=SAMPLE_PASSWORD, help=f'Password of every account (default: {SAMPLE_PASSWORD})'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=BATCH_SIZE, help=f'Rows per INSERT batch (default: {BATCH_SIZE})'
+        )
+        parser.add_argument(
+            '--workers', type=int, default=1, help='Processes generating task batches (default: 1)'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            as_of = parse_day({'as-of': options['as_of'] or ''}, 'as-of')
+            counts = {role: parse_size(options[key]) for role, key in (
+                ('superadmin', 'superadmins'), ('admin', 'admins'), ('user', 'users'), ('task', 'tasks'),
+            )}
+        except ValueError as e:
+            raise CommandError(str(e))
+        if any(count < 0 for count in counts.values()):
+            raise CommandError('Counts cannot be negative.')
+        if options['batch_size'] <= 0 or options['workers'] <= 0 or options['days'] <= 0:
+            raise CommandError('--batch-size, --workers and --days must be positive.')
+        if counts['user'] and not counts['admin']:
+            raise CommandError('Users need at least one admin.')
+        if counts['task'] and not counts['user']:
+            raise CommandError('Tasks need at least one user.')
+        workers = options['workers']
+        if workers > 1 and 'fork' not in multiprocessing.get_all_start_methods():
+            self.stdout.write(self.style.WARNING('Worker processes need fork(); generating in this process.'))
+            workers = 1
+
+        start = time.perf_counter()
+        generator = DataGenerator(
+            seed=options['seed'], batch_size=options['batch_size'], days=options['days'], as_of=as_of
+        )
+        # One hash for every account instead of a full hash per user
+        password = make_password(options['password'])
+        try:
+            generator.generate_users('superadmin', counts['superadmin'], password)
+            admin_ids = generator.generate_users('admin', counts['admin'], password)
+            user_ids = generator.generate_users('user', counts['user'], password, admin_ids=admin_ids)
+        except IntegrityError:
+            raise CommandError('A generated username is already taken by another account.')
+        self.stdout.write(
+            f'Accounts: {counts["superadmin"]} SuperAdmin(s), {len(admin_ids)} admin(s), '
+            f'{len(user_ids)} user(s) in {time.perf_counter() - start:.1f}s'
+        )
+
+        created = self.generate_tasks(generator, counts['task'], user_ids, workers)
+        if created:
+            self.stdout.write('Rebuilding task counters and rollups...')
+            # bulk_create bypasses the signals that maintain them
+            rebuild_user_task_stats()
+            rebuild_rollups()
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {created} task(s); {Task.objects.count()} in total. '
+            f'Done in {time.perf_counter() - start:.1f}s.'
+        ))
+        self.stdout.write(f'Generated accounts log in with the password "{options["password"]}".')
+
+    def generate_tasks(self, generator, total, user_ids, workers):
+        """
+        Top the tasks up to total; returns the number created
+        """
+        existing = Task.objects.count()
+        if existing >= total:
+            return 0
+        batch_size = generator.batch_size
+        first = existing // batch_size
+        last = math.ceil(total / batch_size) - 1
+        batches = [
+            (
+                batch,
+                existing - batch * batch_size if batch == first else 0,
+                total - batch * batch_size if batch == last else None,
+            )
+            for batch in range(first, last + 1)
+        ]
+        _worker_state.update({
+            'generator': generator,
+            'user_ids': user_ids,
+            'user_weights': generator.share_weights('user', len(user_ids)),
+            'admin_of': dict(generated_accounts('user').values_list('id', 'assigned_to_admin_id')),
+        })
+        self.stdout.write(f'Generating {total - existing} task(s) in {len(batches)} batch(es)...')
+
+        start = time.perf_counter()
+        created = 0
+        if workers == 1:
+            results = map(insert_task_batch, batches)
+            pool = None
+        else:
+            # Forked workers open their own connections
+            connections.close_all()
+            pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('fork'))
+            results = pool.map(insert_task_batch, batches)
+        try:
+            for done, count in enumerate(results, 1):
+                created += count
+                if done % 20 == 0 or done == len(batches):
+                    elapsed = time.perf_counter() - start
+                    self.stdout.write(f'  {created} task(s), {created / elapsed:.0f}/s')
+        finally:
+            if pool is not None:
+                pool.shutdown(cancel_futures=True)
+        return created
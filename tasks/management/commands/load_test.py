@@ -0,0 +1,582 @@
+"""
+HTTP load test of the task API and panel pages with latency percentiles
+
+Sends a weighted mix of requests from --processes worker processes, each
+running its share of --concurrency client threads, and reports throughput,
+p50/p95/p99 latency and error rates per endpoint. The JSON and Markdown
+reports record the commit and options, and --compare prints the change
+from an earlier JSON report, so runs can be diffed between commits.
+
+Targets:
+  in-process  (default) a throwaway SQLite database filled by generate_data,
+              driven through Django's WSGIHandler with no server between
+  --url       a locally served app (runserver, gunicorn, uvicorn) sharing
+              this checkout's settings and database; fill it with
+              generate_data first, as the requests are built from its accounts
+
+Endpoints:
+  token             POST /api/token/ with a user's password
+  list              GET /api/tasks/?page_size=50 as a user
+  update            PUT /api/tasks/<id>/ toggling a user's open task
+  report            GET /api/tasks/<id>/report/ as the assignee's admin
+  panel_user        GET /panel/user/dashboard/ with a user's session
+  panel_admin       GET /panel/admin/tasks/ with an admin's session
+  panel_superadmin  GET /panel/superadmin/tasks/ with a SuperAdmin's session
+
+The requests are drawn from --seed, so the same options send the same
+requests in every run. Every endpoint answers 200 when it works, so failed
+requests and any other status (including redirects to a login page) count
+as errors, and the command fails after writing its reports when there
+are any.
+
+Usage: python manage.py load_test --mix list=5,update=2,report=2,token=1 --concurrency 16 --processes 2
+       python manage.py load_test --url http://127.0.0.1:8000 --json after.json --compare before.json
+"""
+
+import http.client
+import io
+import json
+import logging
+import multiprocessing
+import os
+import random
+import shutil
+import subprocess
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test import Client
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+
+from tasks.models import Task
+from tasks.seeding import SAMPLE_PASSWORD, generated_accounts, parse_size
+from tasks.serializers import CustomTokenObtainPairSerializer
+
+from .benchmark_asgi import call_wsgi, percentile
+
+
+ENDPOINTS = ('token', 'list', 'update', 'report', 'panel_user', 'panel_admin', 'panel_superadmin')
+
+DEFAULT_MIX = 'list=5,update=2,report=2,token=1,panel_user=1,panel_admin=1'
+
+# Open tasks of each account the update requests toggle
+UPDATE_TASKS_PER_USER = 3
+
+# Seconds a worker process waits for the others before the timed run
+START_TIMEOUT = 120
+
+# Requests and options of the worker processes, set before they fork
+_worker_state = {}
+
+
+def parse_mix(value):
+    """
+    Parse a request mix such as list=5,report=2 into {endpoint: weight}
+    Raises ValueError for unknown endpoints or weights
+    """
+    mix = {}
+    for item in value.split(','):
+        name, _, weight = item.partition('=')
+        name = name.strip()
+        if name not in ENDPOINTS:
+            raise ValueError(f'Unknown endpoint "{name}"; choose from {", ".join(ENDPOINTS)}.')
+        try:
+            mix[name] = float(weight) if weight else 1.0
+        except ValueError:
+            raise ValueError(f'Invalid weight "{weight}" for {name}.')
+        if mix[name] < 0:
+            raise ValueError(f'Invalid weight "{weight}" for {name}.')
+    mix = {name: weight for name, weight in mix.items() if weight > 0}
+    if not mix:
+        raise ValueError('The mix has no endpoint with a positive weight.')
+    return mix
+
+
+def current_commit():
+    """
+    Short hash of the checked out commit, with '-dirty' for local changes,
+    or None outside a git checkout
+    """
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+        dirty = subprocess.run(
+            ['git', 'status', '--porcelain', '--untracked-files=no'], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return f'{commit}-dirty' if dirty else commit
+
+
+class WSGITarget:
+    """
+    Sends requests through this process's WSGIHandler
+    """
+
+    def __init__(self):
+        self.handler = WSGIHandler()
+
+    def client(self):
+        return lambda request: call_wsgi(self.handler, *request)
+
+
+class HTTPClient:
+    """
+    One keep-alive connection to a served app; reconnects after a failure
+    """
+
+    def __init__(self, scheme, netloc):
+        self.connection_class = http.client.HTTPSConnection if scheme == 'https' else http.client.HTTPConnection
+        self.netloc = netloc
+        self.connection = None
+
+    def __call__(self, request):
+        method, url, token, body, content_type, extra = request
+        headers = {'Content-Type': content_type, 'Content-Length': str(len(body))}
+        if token is not None:
+            headers['Authorization'] = f'Bearer {token}'
+        for key, value in extra.items():
+            # WSGI environ names, e.g. HTTP_COOKIE -> Cookie
+            headers[key[5:].replace('_', '-').title()] = value
+        if self.connection is None:
+            self.connection = self.connection_class(self.netloc, timeout=60)
+        try:
+            self.connection.request(method, url, body=body, headers=headers)
+            response = self.connection.getresponse()
+            response.read()
+        except (OSError, http.client.HTTPException):
+            self.close()
+            raise
+        if response.will_close:
+            self.close()
+        return response.status
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+
+class HTTPTarget:
+    """
+    Sends requests to a served app over HTTP
+    """
+
+    def __init__(self, url):
+        parts = urlsplit(url)
+        self.scheme = parts.scheme
+        self.netloc = parts.netloc
+
+    def client(self):
+        return HTTPClient(self.scheme, self.netloc)
+
+
+def send_requests(target, requests, concurrency):
+    """
+    Send (endpoint, request) pairs from concurrency client threads
+    Returns (endpoint, seconds, status) outcomes; status is 0 when the
+    request itself failed
+    """
+    pending = iter(requests)
+
+    def client_loop():
+        send = target.client()
+        outcomes = []
+        try:
+            for endpoint, request in pending:
+                start = time.perf_counter()
+                try:
+                    status = send(request)
+                except (OSError, http.client.HTTPException):
+                    status = 0
+                outcomes.append((endpoint, time.perf_counter() - start, status))
+        finally:
+            if isinstance(send, HTTPClient):
+                send.close()
+        return outcomes
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = [pool.submit(client_loop) for _ in range(concurrency)]
+        return [outcome for future in futures for outcome in future.result()]
+
+
+def run_worker(index):
+    """
+    Warm up, wait for the other workers, then send this worker's share of
+    the requests; returns (start, end, outcomes) with wall clock times
+    """
+    state = _worker_state
+    processes = state['processes']
+    requests = state['requests'][index::processes]
+    concurrency = state['concurrency'] // processes + (index < state['concurrency'] % processes)
+    target = HTTPTarget(state['url']) if state['url'] else WSGITarget()
+
+    send_requests(target, requests[:state['warmup']], concurrency)
+    if state['barrier'] is not None:
+        state['barrier'].wait()
+    start = time.time()
+    outcomes = send_requests(target, requests, concurrency)
+    return start, time.time(), outcomes
+
+
+def summarize(outcomes, elapsed):
+    """
+    Throughput, latency percentiles in milliseconds and error rate of outcomes
+    """
+    latencies = sorted(seconds for _, seconds, _ in outcomes)
+    statuses = Counter(status for _, _, status in outcomes)
+    errors = sum(count for status, count in statuses.items() if not 200 <= status < 300)
+    return {
+        'requests': len(latencies),
+        'requests_per_second': round(len(latencies) / elapsed, 1),
+        'mean_ms': round(sum(latencies) / len(latencies) * 1000, 2),
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 2),
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+        'max_ms': round(latencies[-1] * 1000, 2),
+        'errors': errors,
+        'error_rate': round(errors / len(latencies), 4),
+        'statuses': {str(status): count for status, count in sorted(statuses.items())},
+    }
+
+
+def change(before, after):
+    if not before:
+        return 'n/a'
+    return f'{(after - before) / before * 100:+.1f}%'
+
+
+class Command(BaseCommand):
+    help = 'Load test the task API and panel pages and report throughput and latency percentiles'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--url', help='Base URL of a served app using this database, e.g. http://127.0.0.1:8000 '
+                          '(default: in-process WSGI on a throwaway database)'
+        )
+        parser.add_argument(
+            '--mix', default=DEFAULT_MIX,
+            help=f'Comma separated endpoint=weight pairs (default: {DEFAULT_MIX})'
+        )
+        parser.add_argument('--requests', type=int, default=2000, help='Timed requests (default: 2000)')
+        parser.add_argument(
+            '--concurrency', type=int, default=8, help='Requests in flight across all processes (default: 8)'
+        )
+        parser.add_argument('--processes', type=int, default=1, help='Worker processes (default: 1)')
+        parser.add_argument(
+            '--warmup', type=int, default=20, help='Untimed requests per process before the run (default: 20)'
+        )
+        parser.add_argument('--accounts', type=int, default=20, help='Users whose requests are sent (default: 20)')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed of the requests and data (default: 0)')
+        parser.add_argument(
+            '--password', default=SAMPLE_PASSWORD,
+            help=f'Password of the accounts for token requests (default: {SAMPLE_PASSWORD})'
+        )
+        parser.add_argument('--tasks', default='10k', help='Tasks generated in-process, e.g. 100k (default: 10k)')
+        parser.add_argument('--users', default='200', help='Users generated in-process (default: 200)')
+        parser.add_argument('--admins', default='10', help='Admins generated in-process (default: 10)')
+        parser.add_argument('--json', dest='json_path', help='Write the report to this JSON file')
+        parser.add_argument('--markdown', dest='markdown_path', help='Write the report to this Markdown file')
+        parser.add_argument('--compare', help='JSON report of an earlier run to compare with')
+
+    def handle(self, *args, **options):
+        try:
+            mix = parse_mix(options['mix'])
+            sizes = {name: parse_size(options[name]) for name in ('tasks', 'users', 'admins')}
+        except ValueError as e:
+            raise CommandError(str(e))
+        for name in ('requests', 'concurrency', 'processes', 'accounts'):
+            if options[name] <= 0:
+                raise CommandError(f'--{name} must be positive.')
+        if options['warmup'] < 0:
+            raise CommandError('--warmup must not be negative.')
+        if options['concurrency'] < options['processes']:
+            raise CommandError('--concurrency must be at least --processes.')
+        if options['url'] and urlsplit(options['url']).scheme not in ('http', 'https'):
+            raise CommandError('--url must be an http:// or https:// URL.')
+        baseline = None
+        if options['compare']:
+            try:
+                with open(options['compare']) as f:
+                    baseline = json.load(f)
+            except (OSError, ValueError) as e:
+                raise CommandError(f'Cannot read {options["compare"]}: {e}')
+
+        if options['url']:
+            results = self.run_load(mix, options)
+            target = options['url']
+        else:
+            results = self.run_in_process(mix, sizes, options)
+            target = (
+                f'in-process WSGI, {sizes["tasks"]} tasks, {sizes["users"]} users, {sizes["admins"]} admins'
+            )
+
+        report = {
+            'commit': current_commit(),
+            'target': target,
+            'mix': mix,
+            'requests': options['requests'],
+            'concurrency': options['concurrency'],
+            'processes': options['processes'],
+            'warmup': options['warmup'],
+            'accounts': options['accounts'],
+            'seed': options['seed'],
+            **results,
+        }
+        self.print_results(report)
+        if baseline is not None:
+            self.print_comparison(baseline, report)
+        if options['json_path']:
+            with open(options['json_path'], 'w') as f:
+                json.dump(report, f, indent=2)
+        if options['markdown_path']:
+            with open(options['markdown_path'], 'w') as f:
+                f.write(self.markdown(report, baseline))
+
+        errors = report['total']['errors']
+        if errors:
+            # Status 0 is a request that got no response
+            statuses = ', '.join(
+                f'{count} x {status}' for status, count in report['total']['statuses'].items()
+                if not 200 <= int(status) < 300
+            )
+            raise CommandError(f'{errors} request(s) failed: {statuses}.')
+        self.stdout.write(self.style.SUCCESS('All requests succeeded.'))
+
+    def run_in_process(self, mix, sizes, options):
+        """
+        Generate data in a throwaway SQLite file database and run the load on it
+        """
+        # Worker threads and processes open their own connections to one
+        # file; SQLite's shared in-memory test database does not allow that
+        test_dir = tempfile.mkdtemp()
+        connection.settings_dict['TEST']['NAME'] = os.path.join(test_dir, 'load_test.sqlite3')
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            # Only the test database has the data; replicas would be stale copies
+            with override_settings(DATABASE_REPLICAS=[]):
+                self.stdout.write(f'Generating {sizes["tasks"]} tasks...')
+                call_command(
+                    'generate_data', superadmins='1', admins=str(sizes['admins']), users=str(sizes['users']),
+                    tasks=str(sizes['tasks']), seed=options['seed'], password=options['password'],
+                    stdout=io.StringIO(),
+                )
+                return self.run_load(mix, options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+            shutil.rmtree(test_dir, ignore_errors=True)
+
+    def run_load(self, mix, options):
+        """
+        Build the requests, send them from the worker processes and
+        summarize the outcomes per endpoint
+        """
+        requests = self.build_requests(mix, options)
+        processes = options['processes']
+        # Workers open their own connections
+        connections.close_all()
+        _worker_state.update({
+            'requests': requests,
+            'processes': processes,
+            'concurrency': options['concurrency'],
+            'warmup': options['warmup'],
+            'url': options['url'],
+            'barrier': None,
+        })
+        self.stdout.write(
+            f'Sending {len(requests)} requests, {options["concurrency"]} at a time '
+            f'from {processes} process(es)...'
+        )
+        # Failed requests are counted, not logged one traceback at a time
+        request_logger = logging.getLogger('django.request')
+        request_logger.disabled = True
+        try:
+            if processes == 1:
+                runs = [run_worker(0)]
+            else:
+                context = multiprocessing.get_context('fork')
+                _worker_state['barrier'] = context.Barrier(processes, timeout=START_TIMEOUT)
+                # Pool starts every process up front, so all of them reach the barrier
+                with context.Pool(processes) as pool:
+                    runs = pool.map(run_worker, range(processes), chunksize=1)
+        finally:
+            request_logger.disabled = False
+            _worker_state.clear()
+
+        elapsed = max(end for _, end, _ in runs) - min(start for start, _, _ in runs)
+        outcomes = [outcome for _, _, run_outcomes in runs for outcome in run_outcomes]
+        return {
+            'elapsed_seconds': round(elapsed, 3),
+            'total': summarize(outcomes, elapsed),
+            'endpoints': {
+                endpoint: summarize([outcome for outcome in outcomes if outcome[0] == endpoint], elapsed)
+                for endpoint in ENDPOINTS if endpoint in mix
+            },
+        }
+
+    def build_requests(self, mix, options):
+        """
+        --requests (endpoint, call_wsgi arguments) pairs drawn from the mix,
+        made as generate_data's accounts: JWTs and sessions are issued
+        directly, so only token requests pay for password hashing
+        """
+        users = list(
+            generated_accounts('user').filter(assigned_to_admin__isnull=False)[:options['accounts']]
+        )
+        if not users:
+            raise CommandError('No users with an admin found; run `manage.py generate_data` first.')
+        admins = {admin.id: admin for admin in generated_accounts('admin').filter(
+            id__in={user.assigned_to_admin_id for user in users}
+        )}
+        superadmin = generated_accounts('superadmin').first()
+        tokens = {}
+        sessions = {}
+
+        def token(account):
+            if account.id not in tokens:
+                tokens[account.id] = str(CustomTokenObtainPairSerializer.get_token(account).access_token)
+            return tokens[account.id]
+
+        def session(account):
+            if account.id not in sessions:
+                client = Client()
+                client.force_login(account)
+                sessions[account.id] = {
+                    'HTTP_COOKIE': f'{settings.SESSION_COOKIE_NAME}={client.cookies[settings.SESSION_COOKIE_NAME].value}'
+                }
+            return sessions[account.id]
+
+        specs = {endpoint: [] for endpoint in mix}
+        for user in users:
+            admin = admins.get(user.assigned_to_admin_id)
+            if 'token' in specs:
+                body = json.dumps({'username': user.username, 'password': options['password']}).encode()
+                specs['token'].append(('POST', '/api/token/', None, body, 'application/json', {}))
+            if 'list' in specs:
+                specs['list'].append(('GET', '/api/tasks/?page_size=50', token(user), b'', 'application/json', {}))
+            if 'update' in specs:
+                open_tasks = Task.objects.filter(assigned_to=user).exclude(status='completed').order_by('id')
+                for task_id in open_tasks.values_list('id', flat=True)[:UPDATE_TASKS_PER_USER]:
+                    for status in ('in_progress', 'pending'):
+                        body = json.dumps({'status': status}).encode()
+                        specs['update'].append(
+                            ('PUT', f'/api/tasks/{task_id}/', token(user), body, 'application/json', {})
+                        )
+            if 'report' in specs and admin is not None:
+                completed = Task.objects.filter(assigned_to=user, status='completed').order_by('id')
+                task_id = completed.values_list('id', flat=True).first()
+                if task_id is not None:
+                    specs['report'].append(
+                        ('GET', f'/api/tasks/{task_id}/report/', token(admin), b'', 'application/json', {})
+                    )
+            if 'panel_user' in specs:
+                specs['panel_user'].append(('GET', '/panel/user/dashboard/', None, b'', 'text/html', session(user)))
+            if 'panel_admin' in specs and admin is not None:
+                specs['panel_admin'].append(('GET', '/panel/admin/tasks/', None, b'', 'text/html', session(admin)))
+        if 'panel_superadmin' in specs and superadmin is not None:
+            specs['panel_superadmin'].append(
+                ('GET', '/panel/superadmin/tasks/', None, b'', 'text/html', session(superadmin))
+            )
+
+        missing = [endpoint for endpoint, endpoint_specs in specs.items() if not endpoint_specs]
+        if missing:
+            raise CommandError(
+                f'No requests can be made for: {", ".join(missing)}; generate more data or drop them from --mix.'
+            )
+        rng = random.Random(options['seed'])
+        endpoints = list(mix)
+        chosen = rng.choices(endpoints, weights=[mix[endpoint] for endpoint in endpoints], k=options['requests'])
+        return [(endpoint, rng.choice(specs[endpoint])) for endpoint in chosen]
+
+    def print_results(self, report):
+        self.stdout.write(
+            f'{"endpoint":<17} {"requests":>8} {"req/s":>8} {"p50 ms":>8} {"p95 ms":>8} '
+            f'{"p99 ms":>8} {"max ms":>8} {"errors":>6}'
+        )
+        rows = list(report['endpoints'].items()) + [('total', report['total'])]
+        for endpoint, result in rows:
+            self.stdout.write(
+                f'{endpoint:<17} {result["requests"]:>8} {result["requests_per_second"]:>8.1f} '
+                f'{result["p50_ms"]:>8.2f} {result["p95_ms"]:>8.2f} {result["p99_ms"]:>8.2f} '
+                f'{result["max_ms"]:>8.2f} {result["errors"]:>6}'
+            )
+
+    def comparison_rows(self, baseline, report):
+        """
+        (endpoint, req/s change, p50, p95, p99 changes, error rates) of the
+        endpoints in both reports
+        """
+        before_results = {**baseline.get('endpoints', {}), 'total': baseline.get('total')}
+        after_results = {**report['endpoints'], 'total': report['total']}
+        rows = []
+        for endpoint, after in after_results.items():
+            before = before_results.get(endpoint)
+            if not before:
+                continue
+            rows.append((
+                endpoint,
+                change(before['requests_per_second'], after['requests_per_second']),
+                change(before['p50_ms'], after['p50_ms']),
+                change(before['p95_ms'], after['p95_ms']),
+                change(before['p99_ms'], after['p99_ms']),
+                f'{before["error_rate"]:.2%} -> {after["error_rate"]:.2%}',
+            ))
+        return rows
+
+    def print_comparison(self, baseline, report):
+        self.stdout.write(f'Compared with {baseline.get("commit") or "the baseline"}:')
+        self.stdout.write(
+            f'{"endpoint":<17} {"req/s":>8} {"p50":>8} {"p95":>8} {"p99":>8} {"error rate":>16}'
+        )
+        for endpoint, *changes in self.comparison_rows(baseline, report):
+            rps, p50, p95, p99, error_rate = changes
+            self.stdout.write(f'{endpoint:<17} {rps:>8} {p50:>8} {p95:>8} {p99:>8} {error_rate:>16}')
+
+    def markdown(self, report, baseline=None):
+        mix = ', '.join(f'{endpoint}={weight:g}' for endpoint, weight in report['mix'].items())
+        lines = [
+            '# Load test report',
+            '',
+            f'- Commit: {report["commit"] or "unknown"}',
+            f'- Target: {report["target"]}',
+            f'- Requests: {report["requests"]} after {report["warmup"]} warm-up request(s) per process',
+            f'- Concurrency: {report["concurrency"]} over {report["processes"]} process(es)',
+            f'- Mix: {mix}',
+            f'- Accounts: {report["accounts"]}, seed {report["seed"]}',
+            f'- Elapsed: {report["elapsed_seconds"]}s',
+            '',
+            '| endpoint | requests | req/s | mean ms | p50 ms | p95 ms | p99 ms | max ms | errors | error rate |',
+            '| --- | ---: | ---: | ---: | ---: | ---: | ---: | ---: | ---: | ---: |',
+        ]
+        rows = list(report['endpoints'].items()) + [('total', report['total'])]
+        for endpoint, result in rows:
+            lines.append(
+                f'| {endpoint} | {result["requests"]} | {result["requests_per_second"]:.1f} | '
+                f'{result["mean_ms"]:.2f} | {result["p50_ms"]:.2f} | {result["p95_ms"]:.2f} | '
+                f'{result["p99_ms"]:.2f} | {result["max_ms"]:.2f} | {result["errors"]} | '
+                f'{result["error_rate"]:.2%} |'
+            )
+        if baseline is not None:
+            lines += [
+                '',
+                f'## Compared with {baseline.get("commit") or "the baseline"}',
+                '',
+                '| endpoint | req/s | p50 | p95 | p99 | error rate |',
+                '| --- | ---: | ---: | ---: | ---: | ---: |',
+            ]
+            for row in self.comparison_rows(baseline, report):
+                lines.append('| ' + ' | '.join(row) + ' |')
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,37 @@
+"""
+Prune the task change log read by delta sync (GET /api/tasks/changes/)
+
+Deletes rows superseded by a later change to the same task and rows older
+than the retention window. Run it daily, e.g. from cron; sync clients
+whose cursors are older than the window download the full list again.
+
+Usage: python manage.py prune_task_changes [--days N]
+"""
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from tasks.changes import prune_task_changes
+
+
+class Command(BaseCommand):
+    help = 'Delete superseded and expired rows of the task change log'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=settings.TASKS_CHANGE_LOG_RETENTION_DAYS,
+            help=f'Keep rows this many days (default: TASKS_CHANGE_LOG_RETENTION_DAYS, '
+                 f'{settings.TASKS_CHANGE_LOG_RETENTION_DAYS})'
+        )
+
+    def handle(self, *args, **options):
+        if options['days'] < settings.TASKS_CHANGE_LOG_RETENTION_DAYS:
+            # Cursors younger than the setting are still accepted
+            raise CommandError(
+                f'--days cannot be below TASKS_CHANGE_LOG_RETENTION_DAYS '
+                f'({settings.TASKS_CHANGE_LOG_RETENTION_DAYS}).'
+            )
+        superseded, expired = prune_task_changes(options['days'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Deleted {superseded} superseded and {expired} expired task change row(s).'
+        ))
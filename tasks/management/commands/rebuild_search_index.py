@@ -0,0 +1,27 @@
+"""
+Rebuild the task_fts full-text search index from the task table
+
+Triggers keep the index in sync with every write, so this is only needed
+after restoring data with the triggers dropped or to compact the index.
+
+Usage: python manage.py rebuild_search_index [--optimize]
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from tasks.search import rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = 'Re-index every task for full-text search'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--optimize', action='store_true',
+            help='Also merge the index segments into one, which speeds up searches'
+        )
+
+    def handle(self, *args, **options):
+        if not rebuild_search_index(optimize=options['optimize']):
+            raise CommandError('The database has no full-text search index (SQLite only).')
+        self.stdout.write(self.style.SUCCESS('Rebuilt the task search index.'))
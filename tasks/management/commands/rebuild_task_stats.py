@@ -0,0 +1,60 @@
+"""
+Rebuild the denormalized per-user task counters (UserTaskStats) and the
+completed-task rollups (TaskRollup)
+
+With --user, only those users' counters are brought up to date and their
+rollups are resynced by a job on the 'rollups' queue; only counter drift
+is reported.
+
+Usage: python manage.py rebuild_task_stats [--check] [--user ID ...]
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from tasks.counters import find_task_stats_drift, rebuild_user_task_stats
+from tasks.rollups import find_rollup_drift, rebuild_rollups, resync_user_rollups
+
+
+class Command(BaseCommand):
+    help = 'Recompute per-user task counters and completed-task rollups from the task table and report drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check', action='store_true',
+            help='Only report drift between stored and actual counts; exit with an error if any'
+        )
+        parser.add_argument('--user', type=int, action='append', dest='user_ids', help='Limit to this user id')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows per bulk upsert (default: 1000)')
+
+    def handle(self, *args, **options):
+        user_ids = options['user_ids']
+
+        with transaction.atomic():
+            drift = find_task_stats_drift(user_ids)
+            for user_id, (stored, expected) in sorted(drift.items()):
+                self.stdout.write(f'User {user_id}: stored {stored}, expected {expected}')
+            rollup_drift = find_rollup_drift() if user_ids is None else {}
+            for key, (stored, expected) in sorted(rollup_drift.items()):
+                self.stdout.write(f'Rollup {":".join(map(str, key))}: stored {stored}, expected {expected}')
+
+            if options['check']:
+                if drift or rollup_drift:
+                    raise CommandError(
+                        f'{len(drift)} user counter row(s) and {len(rollup_drift)} rollup bucket(s) have drifted.'
+                    )
+                self.stdout.write(self.style.SUCCESS('All task counters and rollups are accurate.'))
+                return
+
+            total = rebuild_user_task_stats(user_ids, batch_size=options['batch_size'])
+            if user_ids is None:
+                rebuild_rollups(batch_size=options['batch_size'])
+            else:
+                resync_user_rollups(user_ids)
+
+        # A resync of some users' rollups is queued on the 'rollups' queue
+        rollups = 'the rollups' if user_ids is None else 'queued their rollup resync'
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt task counters for {total} user(s) and {rollups}; '
+            f'{len(drift)} user(s) and {len(rollup_drift)} rollup bucket(s) had drifted.'
+        ))
@@ -0,0 +1,142 @@
+"""
+Run the background jobs queued by writes (see tasks/jobs.py)
+
+Claims due jobs of each queue and runs them in a thread pool, keeping at
+most JOBS_QUEUE_CONCURRENCY[queue] of a queue running across all workers,
+so several workers can share the queues. Jobs whose worker died are queued
+again after JOBS_RUNNING_TIMEOUT. Queue depths are logged every
+--stats-interval seconds; Ctrl-C or SIGTERM stops claiming and waits for
+the running jobs.
+
+Usage: python manage.py run_jobs [--queues rollups] [--once]
+       python manage.py run_jobs --stats
+       python manage.py run_jobs --retry-failed
+"""
+
+import json
+import signal
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from tasks.jobs import (
+    claim_jobs, queue_metrics, requeue_stale_jobs, retry_failed_jobs, run_job, worker_name
+)
+
+
+class Command(BaseCommand):
+    help = 'Run queued background jobs in a thread pool'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--queues', default=','.join(settings.JOBS_QUEUE_CONCURRENCY),
+            help=f'Comma separated queues to work on (default: {",".join(settings.JOBS_QUEUE_CONCURRENCY)})'
+        )
+        parser.add_argument('--once', action='store_true', help='Run the due jobs, then exit')
+        parser.add_argument(
+            '--poll-interval', type=float, default=settings.JOBS_POLL_INTERVAL,
+            help=f'Seconds between checks for due jobs when idle (default: {settings.JOBS_POLL_INTERVAL})'
+        )
+        parser.add_argument(
+            '--stats-interval', type=float, default=60,
+            help='Seconds between queue depth log lines, 0 to disable (default: 60)'
+        )
+        parser.add_argument('--stats', action='store_true', help='Print queue depths as JSON and exit')
+        parser.add_argument('--retry-failed', action='store_true', help='Queue failed jobs again and exit')
+
+    def handle(self, *args, **options):
+        queues = [queue for queue in options['queues'].split(',') if queue]
+        unknown = sorted(set(queues) - set(settings.JOBS_QUEUE_CONCURRENCY))
+        if unknown:
+            raise CommandError(f'Unknown queue: {", ".join(unknown)}; see JOBS_QUEUE_CONCURRENCY.')
+        if options['poll_interval'] <= 0:
+            raise CommandError('--poll-interval must be positive.')
+
+        if options['stats']:
+            self.stdout.write(json.dumps(queue_metrics(), indent=2))
+            return
+        if options['retry_failed']:
+            count = retry_failed_jobs(queues)
+            self.stdout.write(self.style.SUCCESS(f'Queued {count} failed job(s) again.'))
+            return
+
+        self.stopping = threading.Event()
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGTERM, lambda *_: self.stopping.set())
+        try:
+            succeeded, failed = self.work(queues, options)
+        except KeyboardInterrupt:
+            # work() already waited for the running jobs
+            return
+        self.stdout.write(self.style.SUCCESS(f'{succeeded} job(s) succeeded, {failed} failed.'))
+
+    def work(self, queues, options):
+        """
+        Claim and run jobs until stopped, or until none is due with --once
+        Returns (succeeded, failed) counts
+        """
+        worker = worker_name()
+        limits = {queue: settings.JOBS_QUEUE_CONCURRENCY[queue] for queue in queues}
+        # Running future -> queue
+        running = {}
+        counts = {True: 0, False: 0}
+        last_requeue = last_stats = time.monotonic()
+        requeue_stale_jobs()
+        self.stdout.write(f'Worker {worker} running queues: {", ".join(queues)}')
+
+        pool = ThreadPoolExecutor(max_workers=sum(limits.values()), thread_name_prefix='job')
+        try:
+            while not self.stopping.is_set():
+                claimed = 0
+                for queue in queues:
+                    mine = sum(1 for q in running.values() if q == queue)
+                    # claim_jobs also counts the jobs other workers are running
+                    for job in claim_jobs(queue, limits[queue] - mine, worker):
+                        running[pool.submit(self.run, job)] = queue
+                        claimed += 1
+
+                if options['once'] and not claimed and not running:
+                    break
+                if running:
+                    done, _ = wait(running, timeout=options['poll_interval'], return_when=FIRST_COMPLETED)
+                    for future in done:
+                        del running[future]
+                        counts[future.result()] += 1
+                elif not claimed:
+                    self.stopping.wait(options['poll_interval'])
+
+                now = time.monotonic()
+                if now - last_requeue >= settings.JOBS_RUNNING_TIMEOUT / 2:
+                    requeued = requeue_stale_jobs()
+                    if requeued:
+                        self.stdout.write(self.style.WARNING(f'Queued {requeued} stale job(s) again.'))
+                    last_requeue = now
+                if options['stats_interval'] and now - last_stats >= options['stats_interval']:
+                    self.log_stats()
+                    last_stats = now
+        finally:
+            # Running jobs finish; nothing new is claimed
+            pool.shutdown(wait=True)
+            for future in running:
+                counts[future.result()] += 1
+            close_old_connections()
+        return counts[True], counts[False]
+
+    def run(self, job):
+        try:
+            return run_job(job)
+        finally:
+            # Worker threads keep their own connections
+            close_old_connections()
+
+    def log_stats(self):
+        for queue, metrics in sorted(queue_metrics().items()):
+            self.stdout.write(
+                f'queue {queue}: {metrics["due"]} due, {metrics["queued"]} queued, '
+                f'{metrics["running"]} running, {metrics["failed"]} failed, '
+                f'oldest due {metrics["oldest_due_seconds"]}s'
+            )
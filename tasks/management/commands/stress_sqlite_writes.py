@@ -0,0 +1,240 @@
+"""
+Concurrent task updates against SQLite, counting "database is locked" errors
+
+Seeds a throwaway SQLite file database and starts --writers threads at
+once, each sending --updates status changes to its own task through
+Django's WSGIHandler: half as API PUTs (api_views.update_task), half as
+panel form posts (panel_views.user_update_task). Each mode runs on a fresh
+database with different backend OPTIONS:
+
+  django      Django's SQLite defaults (deferred BEGIN, rollback journal,
+              5 second busy timeout), for comparison
+  default     SQLITE_DEFAULT_OPTIONS (BEGIN IMMEDIATE, 20 second timeout)
+  production  SQLITE_PRODUCTION_OPTIONS (also WAL and retries)
+
+Fails if the default or production mode had any failed update.
+
+Usage: python manage.py stress_sqlite_writes --writers 200 --updates 5
+"""
+
+import json
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.core.signals import got_request_exception
+from django.db import connection
+from django.test import Client
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+from django.utils.crypto import get_random_string
+
+from tasks.models import CustomUser, Task
+from tasks.seeding import Seeder, parse_size
+from tasks.serializers import CustomTokenObtainPairSerializer
+from tasks.sqlite_backend.base import is_lock_error
+
+from .benchmark_asgi import call_wsgi, percentile
+
+
+MODES = ('django', 'default', 'production')
+
+# Modes the project runs in, which must not fail any update
+CHECKED_MODES = ('default', 'production')
+
+
+def mode_options(mode):
+    if mode == 'production':
+        return dict(settings.SQLITE_PRODUCTION_OPTIONS)
+    if mode == 'default':
+        return dict(settings.SQLITE_DEFAULT_OPTIONS)
+    return {}
+
+
+class Command(BaseCommand):
+    help = 'Run many concurrent task updates on SQLite and count lock errors'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int, default=200, help='Concurrent writer threads (default: 200)')
+        parser.add_argument('--updates', type=int, default=5, help='Updates sent by each writer (default: 5)')
+        parser.add_argument('--tasks', default='2k', help='Task volume to seed, e.g. 2k (default: 2k)')
+        parser.add_argument(
+            '--modes', default=','.join(MODES),
+            help=f'Comma separated database modes to compare (default: {",".join(MODES)})'
+        )
+        parser.add_argument('--json', dest='json_path', help='Write raw results to this JSON file')
+
+    def handle(self, *args, **options):
+        if connection.settings_dict['ENGINE'] != 'tasks.sqlite_backend':
+            raise CommandError("The default database must use the 'tasks.sqlite_backend' engine.")
+        try:
+            size = parse_size(options['tasks'])
+        except ValueError as e:
+            raise CommandError(str(e))
+        if options['writers'] <= 0 or options['updates'] <= 0:
+            raise CommandError('--writers and --updates must be positive.')
+        modes = options['modes'].split(',')
+        unknown = sorted(set(modes) - set(MODES))
+        if unknown:
+            raise CommandError(f'Unknown mode: {", ".join(unknown)}')
+
+        self.stdout.write(
+            f'{"mode":<11} {"writers":>7} {"requests":>8} {"req/s":>8} {"p50 ms":>8} '
+            f'{"p99 ms":>8} {"max ms":>8} {"locked":>6} {"other":>6}'
+        )
+        results = []
+        for mode in modes:
+            result = self.run_mode(mode, size, options['writers'], options['updates'])
+            results.append(result)
+            self.stdout.write(
+                f'{mode:<11} {result["writers"]:>7} {result["requests"]:>8} '
+                f'{result["requests_per_second"]:>8.1f} {result["p50_ms"]:>8.2f} {result["p99_ms"]:>8.2f} '
+                f'{result["max_ms"]:>8.2f} {result["lock_errors"]:>6} {result["other_errors"]:>6}'
+            )
+
+        if options['json_path']:
+            with open(options['json_path'], 'w') as f:
+                json.dump({'tasks': size, 'results': results}, f, indent=2)
+
+        failed = [
+            result for result in results
+            if result['mode'] in CHECKED_MODES and (result['lock_errors'] or result['other_errors'])
+        ]
+        if failed:
+            modes = ' and '.join(result['mode'] for result in failed)
+            raise CommandError(f'Updates failed in {modes} mode; see the locked and other columns.')
+        self.stdout.write(self.style.SUCCESS('No failed updates in default or production mode.'))
+
+    def run_mode(self, mode, size, writers, updates):
+        """
+        Seed a fresh database with the mode's OPTIONS and hammer it
+        """
+        settings_dict = connection.settings_dict
+        old_options = settings_dict['OPTIONS']
+        test_dir = tempfile.mkdtemp()
+        # Threads open their own connections from this settings dict
+        settings_dict['OPTIONS'] = mode_options(mode)
+        settings_dict['TEST']['NAME'] = os.path.join(test_dir, f'stress_{mode}.sqlite3')
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            # Only the test database is seeded; replicas would be stale copies
+            with override_settings(DATABASE_REPLICAS=[]):
+                Seeder().seed(size)
+                workload = self.build_workload(writers, updates)
+                connection.close()
+                elapsed, latencies, failures = self.hammer(workload)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+            settings_dict['OPTIONS'] = old_options
+            shutil.rmtree(test_dir, ignore_errors=True)
+
+        latencies.sort()
+        return {
+            'mode': mode,
+            'writers': writers,
+            'requests': len(latencies),
+            'requests_per_second': len(latencies) / elapsed,
+            'p50_ms': percentile(latencies, 0.50) * 1000,
+            'p99_ms': percentile(latencies, 0.99) * 1000,
+            'max_ms': latencies[-1] * 1000,
+            'lock_errors': failures['locked'],
+            'other_errors': failures['other'],
+        }
+
+    def build_workload(self, writers, updates):
+        """
+        One list of request arguments for call_wsgi per writer, each
+        toggling the status of its own task, alternately via API and panel
+        """
+        tasks = list(Task.objects.exclude(status='completed').order_by('id')[:writers])
+        if len(tasks) < writers:
+            raise CommandError(f'Only {len(tasks)} open tasks seeded; raise --tasks for {writers} writers.')
+        users = {user.id: user for user in CustomUser.objects.filter(role='user')}
+        tokens = {}
+        sessions = {}
+        workload = []
+        for i, task in enumerate(tasks):
+            user = users[task.assigned_to_id]
+            statuses = ['in_progress' if n % 2 == 0 else 'pending' for n in range(updates)]
+            if i % 2 == 0:
+                if user.id not in tokens:
+                    tokens[user.id] = str(CustomTokenObtainPairSerializer.get_token(user).access_token)
+                workload.append([
+                    ('PUT', f'/api/tasks/{task.id}/', tokens[user.id], json.dumps({'status': status}).encode())
+                    for status in statuses
+                ])
+            else:
+                if user.id not in sessions:
+                    client = Client()
+                    client.force_login(user)
+                    sessions[user.id] = client.cookies[settings.SESSION_COOKIE_NAME].value
+                csrf_token = get_random_string(32)
+                extra = {
+                    'HTTP_COOKIE': (
+                        f'{settings.SESSION_COOKIE_NAME}={sessions[user.id]}; '
+                        f'{settings.CSRF_COOKIE_NAME}={csrf_token}'
+                    ),
+                }
+                workload.append([
+                    (
+                        'POST', f'/panel/user/tasks/{task.id}/update/', None,
+                        urlencode({'status': status, 'csrfmiddlewaretoken': csrf_token}).encode(),
+                        'application/x-www-form-urlencoded', extra,
+                    )
+                    for status in statuses
+                ])
+        return workload
+
+    def hammer(self, workload):
+        """
+        Start every writer at once; returns (elapsed, latencies, failures)
+        """
+        handler = WSGIHandler()
+        start_line = threading.Barrier(len(workload))
+        failures = Counter()
+        failures_lock = threading.Lock()
+        latencies = []
+
+        def record_failure(sender, **kwargs):
+            error = sys.exc_info()[1]
+            with failures_lock:
+                failures['locked' if is_lock_error(error) else 'other'] += 1
+
+        def writer(requests):
+            start_line.wait()
+            timings = []
+            for request in requests:
+                start = time.perf_counter()
+                status = call_wsgi(handler, *request)
+                timings.append(time.perf_counter() - start)
+                if status >= 400 and status != 500:
+                    # 500s are counted by record_failure with their cause
+                    with failures_lock:
+                        failures['other'] += 1
+            return timings
+
+        # Failed requests are counted, not logged one traceback at a time
+        request_logger = logging.getLogger('django.request')
+        request_logger.disabled = True
+        got_request_exception.connect(record_failure)
+        try:
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=len(workload)) as pool:
+                for timings in pool.map(writer, workload):
+                    latencies.extend(timings)
+            elapsed = time.perf_counter() - start
+        finally:
+            got_request_exception.disconnect(record_failure)
+            request_logger.disabled = False
+        return elapsed, latencies, failures
@@ -0,0 +1,57 @@
+"""
+Copy the primary SQLite database to its replicas
+
+Local stand-in for database replication: writes a replication heartbeat on
+the primary, then copies the whole primary file into every SQLite alias in
+DATABASE_REPLICAS with SQLite's online backup API. PrimaryReplicaRouter
+reads the heartbeat on each replica to measure its lag, so a replica that
+is not refreshed within REPLICA_MAX_LAG_SECONDS stops being read.
+
+Usage: python manage.py sync_replicas [--interval 5]
+"""
+
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.utils import timezone
+
+from tasks.models import ReplicationHeartbeat
+from tasks.routers import PRIMARY
+
+
+class Command(BaseCommand):
+    help = 'Copy the primary SQLite database to the DATABASE_REPLICAS aliases'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval', type=float,
+            help='Keep copying every this many seconds instead of copying once'
+        )
+
+    def handle(self, *args, **options):
+        if not settings.DATABASE_REPLICAS:
+            raise CommandError('No replicas configured; set REPLICA_DATABASE_PATH.')
+        aliases = [PRIMARY] + list(settings.DATABASE_REPLICAS)
+        if any(connections[alias].vendor != 'sqlite' for alias in aliases):
+            raise CommandError('Replicas can only be copied between SQLite databases.')
+
+        interval = options['interval']
+        while True:
+            self.sync()
+            if interval is None:
+                break
+            time.sleep(interval)
+
+    def sync(self):
+        ReplicationHeartbeat.objects.using(PRIMARY).update_or_create(
+            id=1, defaults={'written_at': timezone.now()}
+        )
+        primary = connections[PRIMARY]
+        primary.ensure_connection()
+        for alias in settings.DATABASE_REPLICAS:
+            replica = connections[alias]
+            replica.ensure_connection()
+            primary.connection.backup(replica.connection)
+            self.stdout.write(f'Copied {PRIMARY} to {alias}.')
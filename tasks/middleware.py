@@ -0,0 +1,95 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.utils.decorators import sync_and_async_middleware
+
+from . import profiling
+from .routers import RequestRouting, current_request
+
+
+@sync_and_async_middleware
+def replica_routing_middleware(get_response):
+    """
+    Make the request visible to PrimaryReplicaRouter and pin the user's
+    reads to the primary after the request wrote (see tasks/routers.py)
+    """
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            routing = RequestRouting(request)
+            token = current_request.set(routing)
+            try:
+                response = await get_response(request)
+            finally:
+                current_request.reset(token)
+            if routing.wrote:
+                # Reading the session may query the database
+                await sync_to_async(routing.finish)()
+            return response
+    else:
+        def middleware(request):
+            routing = RequestRouting(request)
+            token = current_request.set(routing)
+            try:
+                response = get_response(request)
+            finally:
+                current_request.reset(token)
+            routing.finish()
+            return response
+    return middleware
+
+
+class RequestProfilingMiddleware:
+    """
+    Time the SQL, template and response rendering of each request while
+    profiling is switched on, and report it in a Server-Timing header and a
+    log line (see tasks/profiling.py)
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        profiling.install()
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        switch = profiling.profiling_switch()
+        if not switch['enabled']:
+            return self.get_response(request)
+        profile = profiling.RequestProfile()
+        token = profiling.current_profile.set(profile)
+        profiler = profiling.start_sampled_profiler() if profiling.sampled(switch) else None
+        try:
+            response = self.get_response(request)
+        except BaseException:
+            if profiler is not None:
+                profiling.stop_profiler(profiler)
+            raise
+        finally:
+            profiling.current_profile.reset(token)
+        return self.finish(request, response, profile, switch, profiler)
+
+    async def __acall__(self, request):
+        switch = profiling.profiling_switch()
+        if not switch['enabled']:
+            return await self.get_response(request)
+        profile = profiling.RequestProfile()
+        token = profiling.current_profile.set(profile)
+        try:
+            response = await self.get_response(request)
+        finally:
+            profiling.current_profile.reset(token)
+        return self.finish(request, response, profile, switch)
+
+    def process_template_response(self, request, response):
+        # Runs inside the profiled request, just before Django renders the response
+        return profiling.render_response(response)
+
+    def finish(self, request, response, profile, switch, profiler=None):
+        summary = profile.summary(request, response)
+        if profiler is not None:
+            summary['profile_dump'] = profiling.dump_sampled_profile(profiler, summary, switch['slow_ms'])
+        profiling.log_summary(summary, switch['slow_ms'])
+        response['Server-Timing'] = profiling.server_timing(summary)
+        return response
@@ -0,0 +1,54 @@
+# Generated by Django 4.2.7 on 2026-10-18 04:05
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+import django.db.models.deletion
+
+
+def populate_user_task_stats(apps, schema_editor):
+    CustomUser = apps.get_model('tasks', 'CustomUser')
+    Task = apps.get_model('tasks', 'Task')
+    UserTaskStats = apps.get_model('tasks', 'UserTaskStats')
+
+    rows = {
+        row.pop('assigned_to_id'): row
+        for row in Task.objects.order_by().values('assigned_to_id').annotate(
+            total_tasks=Count('id'),
+            pending_tasks=Count('id', filter=Q(status='pending')),
+            in_progress_tasks=Count('id', filter=Q(status='in_progress')),
+            completed_tasks=Count('id', filter=Q(status='completed')),
+            worked_hours=Sum('worked_hours'),
+        )
+    }
+    stats = []
+    for user_id in CustomUser.objects.values_list('pk', flat=True).iterator():
+        row = rows.get(user_id, {})
+        row['worked_hours'] = row.get('worked_hours') or 0
+        stats.append(UserTaskStats(user_id=user_id, **row))
+    UserTaskStats.objects.bulk_create(stats, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0002_task_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserTaskStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='task_stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('total_tasks', models.IntegerField(default=0)),
+                ('pending_tasks', models.IntegerField(default=0)),
+                ('in_progress_tasks', models.IntegerField(default=0)),
+                ('completed_tasks', models.IntegerField(default=0)),
+                ('worked_hours', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+            ],
+            options={
+                'db_table': 'user_task_stats',
+            },
+        ),
+        migrations.RunPython(populate_user_task_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.7 on 2026-10-18 04:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0004_task_access_pattern_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='usertaskstats',
+            name='tasks_modified_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='usertaskstats',
+            name='tasks_version',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+    ]
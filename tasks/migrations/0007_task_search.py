@@ -0,0 +1,75 @@
+from django.db import migrations
+
+
+# External-content FTS5 index over the task text columns, kept in sync with
+# the task table by triggers so every write path (save, update, bulk_create,
+# raw inserts) is covered. The assignee id is indexed too so searches scoped
+# to a few users intersect posting lists instead of joining every match.
+CREATE_SQL = [
+    """
+    CREATE VIRTUAL TABLE task_fts USING fts5(
+        title, description, completion_report, assigned_to_id,
+        content='task', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER task_fts_insert AFTER INSERT ON task BEGIN
+        INSERT INTO task_fts(rowid, title, description, completion_report, assigned_to_id)
+        VALUES (new.id, new.title, new.description, new.completion_report, new.assigned_to_id);
+    END
+    """,
+    """
+    CREATE TRIGGER task_fts_delete AFTER DELETE ON task BEGIN
+        INSERT INTO task_fts(task_fts, rowid, title, description, completion_report, assigned_to_id)
+        VALUES ('delete', old.id, old.title, old.description, old.completion_report, old.assigned_to_id);
+    END
+    """,
+    """
+    CREATE TRIGGER task_fts_update AFTER UPDATE OF title, description, completion_report, assigned_to_id ON task
+    WHEN old.title IS NOT new.title
+        OR old.description IS NOT new.description
+        OR old.completion_report IS NOT new.completion_report
+        OR old.assigned_to_id IS NOT new.assigned_to_id
+    BEGIN
+        INSERT INTO task_fts(task_fts, rowid, title, description, completion_report, assigned_to_id)
+        VALUES ('delete', old.id, old.title, old.description, old.completion_report, old.assigned_to_id);
+        INSERT INTO task_fts(rowid, title, description, completion_report, assigned_to_id)
+        VALUES (new.id, new.title, new.description, new.completion_report, new.assigned_to_id);
+    END
+    """,
+    "INSERT INTO task_fts(task_fts) VALUES ('rebuild')",
+]
+
+DROP_SQL = [
+    'DROP TRIGGER IF EXISTS task_fts_update',
+    'DROP TRIGGER IF EXISTS task_fts_delete',
+    'DROP TRIGGER IF EXISTS task_fts_insert',
+    'DROP TABLE IF EXISTS task_fts',
+]
+
+
+def create_search_index(apps, schema_editor):
+    # Other databases fall back to unindexed LIKE search (see tasks.search)
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for sql in CREATE_SQL:
+        schema_editor.execute(sql)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for sql in DROP_SQL:
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0006_panel_task_list_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,88 @@
+# Generated by Django 4.2.7 on 2026-10-18 05:05
+
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+
+
+def populate_task_rollups(apps, schema_editor):
+    Task = apps.get_model('tasks', 'Task')
+    TaskRollup = apps.get_model('tasks', 'TaskRollup')
+
+    # Completion times were not recorded; the last update is the best guess
+    completed = Task.objects.filter(status='completed')
+    completed.update(completed_at=F('updated_at'))
+
+    starts = {
+        'day': lambda day: day,
+        'week': lambda day: day - timedelta(days=day.weekday()),
+        'month': lambda day: day.replace(day=1),
+    }
+    totals = defaultdict(lambda: [0, Decimal('0.00')])
+    rows = completed.order_by().values(
+        'assigned_to_id',
+        admin_id=F('assigned_to__assigned_to_admin_id'),
+        day=TruncDate('completed_at'),
+    ).annotate(completed_tasks=Count('id'), worked_hours=Sum('worked_hours'))
+    for row in rows.iterator():
+        scopes = [('all', 0), ('user', row['assigned_to_id'])]
+        if row['admin_id']:
+            scopes.append(('admin', row['admin_id']))
+        for scope, scope_id in scopes:
+            for period, start in starts.items():
+                bucket = totals[(scope, scope_id, period, start(row['day']))]
+                bucket[0] += row['completed_tasks']
+                bucket[1] += Decimal(row['worked_hours'] or 0)
+    TaskRollup.objects.bulk_create(
+        [
+            TaskRollup(
+                scope=scope, scope_id=scope_id, period=period, period_start=start,
+                completed_tasks=count, worked_hours=hours,
+            )
+            for (scope, scope_id, period, start), (count, hours) in totals.items()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0009_replication_heartbeat'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.CharField(choices=[('all', 'All users'), ('admin', 'Users of an admin'), ('user', 'One user')], max_length=10)),
+                ('scope_id', models.PositiveIntegerField(default=0)),
+                ('period', models.CharField(choices=[('day', 'Day'), ('week', 'Week'), ('month', 'Month')], max_length=10)),
+                ('period_start', models.DateField()),
+                ('completed_tasks', models.IntegerField(default=0)),
+                ('worked_hours', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+            ],
+            options={
+                'db_table': 'task_rollup',
+            },
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='completed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='taskrollup',
+            constraint=models.UniqueConstraint(fields=('scope', 'scope_id', 'period', 'period_start'), name='task_rollup_bucket_uniq'),
+        ),
+        migrations.AddIndex(
+            model_name='taskrollup',
+            index=models.Index(fields=['scope', 'period', 'period_start'], name='task_rollup_period_idx'),
+        ),
+        migrations.RunPython(populate_task_rollups, migrations.RunPython.noop),
+    ]
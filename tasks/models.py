@@ -1,8 +1,35 @@
 from django.contrib.auth.models import AbstractUser
-from django.db import models
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models, transaction
+from django.utils import timezone
 
 
-class CustomUser(AbstractUser):
+class LoadedValuesMixin:
+    """
+    Remembers the field values a row was loaded with, so signal handlers
+    can tell what a save changed (e.g. a task reassigned to another user)
+    """
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        # post_save handlers have seen the old values; the saved ones are next
+        deferred = self.get_deferred_fields()
+        self._loaded_values = {
+            field.attname: getattr(self, field.attname)
+            for field in self._meta.concrete_fields
+            if field.attname not in deferred
+        }
+
+    def get_loaded_value(self, attname):
+        return getattr(self, '_loaded_values', {}).get(attname)
+
+
+class CustomUser(LoadedValuesMixin, AbstractUser):
     """
     Custom User Model with role-based access control
     """
@@ -21,9 +48,19 @@ class CustomUser(AbstractUser):
         related_name='assigned_users',
         limit_choices_to={'role': 'admin'}
     )
+    # Issued JWTs carry this version; bumping it revokes them (see tasks/authentication.py)
+    token_version = models.PositiveIntegerField(default=0)
+    
+    # Changes to these fields make the claims of issued tokens stale
+    TOKEN_CLAIM_FIELDS = ('role', 'assigned_to_admin_id', 'is_active', 'password')
     
     class Meta:
         db_table = 'custom_user'
+        indexes = [
+            # Panel user/admin listings ordered by -date_joined
+            models.Index(fields=['role', 'date_joined'], name='user_role_joined_idx'),
+            models.Index(fields=['assigned_to_admin', 'role', 'date_joined'], name='user_admin_role_joined_idx'),
+        ]
     
     def __str__(self):
         return f"{self.username} ({self.get_role_display()})"
@@ -36,9 +73,29 @@ class CustomUser(AbstractUser):
     
     def is_regular_user(self):
         return self.role == 'user'
+    
+    def save(self, *args, **kwargs):
+        # A role, admin, password or activation change revokes issued tokens
+        loaded = getattr(self, '_loaded_values', {})
+        if any(field in loaded and loaded[field] != getattr(self, field) for field in self.TOKEN_CLAIM_FIELDS):
+            self.token_version += 1
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = {*kwargs['update_fields'], 'token_version'}
+        super().save(*args, **kwargs)
 
 
-class Task(models.Model):
+class TaskQuerySet(models.QuerySet):
+    def for_admin(self, admin):
+        """
+        Tasks assigned to the users of an admin
+        Resolving the admin's users first lets SQLite search the task
+        indexes per user instead of walking the whole task table
+        """
+        users = CustomUser.objects.filter(assigned_to_admin=admin).values('id')
+        return self.filter(assigned_to__in=users)
+
+
+class Task(LoadedValuesMixin, models.Model):
     """
     Task Model with completion report and worked hours
     """
@@ -66,13 +123,199 @@ class Task(models.Model):
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
     completion_report = models.TextField(blank=True, null=True)
     worked_hours = models.DecimalField(max_digits=5, decimal_places=2, blank=True, null=True)
+    # When the task last became completed; buckets it in the analytics rollups
+    completed_at = models.DateTimeField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = TaskQuerySet.as_manager()
+    
     class Meta:
         db_table = 'task'
         ordering = ['-created_at']
+        indexes = [
+            # Keyset pagination of a user's task list (see tasks.pagination)
+            models.Index(fields=['assigned_to', 'created_at', 'id'], name='task_user_created_idx'),
+            models.Index(fields=['assigned_to', 'due_date', 'id'], name='task_user_due_idx'),
+            models.Index(fields=['assigned_to', 'status', 'id'], name='task_user_status_idx'),
+            # Status filtered lists of a user, newest first
+            models.Index(fields=['assigned_to', 'status', 'created_at'], name='task_user_status_created_idx'),
+            # Status counts and overdue lookups across all tasks
+            models.Index(fields=['status', 'due_date'], name='task_status_due_idx'),
+            # Unfiltered task list, newest first
+            models.Index(fields=['created_at', 'id'], name='task_created_idx'),
+            # Panel task lists: sorted by due date, and status filtered newest first
+            models.Index(fields=['due_date', 'id'], name='task_due_idx'),
+            models.Index(fields=['status', 'created_at', 'id'], name='task_status_created_idx'),
+        ]
     
     def __str__(self):
         return f"{self.title} - {self.assigned_to.username}"
+    
+    def save(self, *args, **kwargs):
+        self.set_completed_at()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'status' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'completed_at'}
+        # Per-user counters are updated by a post_save handler, which runs
+        # inside this transaction so the counters commit with the task row
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+    
+    def set_completed_at(self, now=None):
+        """
+        Stamp completed_at when the task becomes completed, clear it otherwise
+        Call before writes that bypass save() (bulk_update)
+        """
+        if self.status != 'completed':
+            self.completed_at = None
+        elif self.completed_at is None or (
+            not self._state.adding and self.get_loaded_value('status') != 'completed'
+        ):
+            self.completed_at = now or timezone.now()
+
 
+class UserTaskStats(models.Model):
+    """
+    Denormalized task counters per user, maintained incrementally on Task
+    writes (see tasks/counters.py) so user listings need no aggregation
+    """
+    user = models.OneToOneField(
+        CustomUser,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='task_stats'
+    )
+    total_tasks = models.IntegerField(default=0)
+    pending_tasks = models.IntegerField(default=0)
+    in_progress_tasks = models.IntegerField(default=0)
+    completed_tasks = models.IntegerField(default=0)
+    worked_hours = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    # Bumped on every write to the user's tasks; used as HTTP validator
+    tasks_version = models.PositiveBigIntegerField(default=0)
+    tasks_modified_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        db_table = 'user_task_stats'
+    
+    def __str__(self):
+        return f"{self.user_id}: {self.completed_tasks}/{self.total_tasks} tasks completed"
+
+
+
+class TaskRollup(models.Model):
+    """
+    Completed tasks and worked hours per scope and calendar bucket,
+    maintained incrementally on Task writes (see tasks/rollups.py) so
+    analytics read one row per bucket instead of aggregating tasks
+    """
+    SCOPE_CHOICES = (
+        ('all', 'All users'),
+        ('admin', 'Users of an admin'),
+        ('user', 'One user'),
+    )
+    PERIOD_CHOICES = (
+        ('day', 'Day'),
+        ('week', 'Week'),
+        ('month', 'Month'),
+    )
+    
+    scope = models.CharField(max_length=10, choices=SCOPE_CHOICES)
+    # Admin or user id; 0 for the 'all' scope
+    scope_id = models.PositiveIntegerField(default=0)
+    period = models.CharField(max_length=10, choices=PERIOD_CHOICES)
+    # First day of the bucket: the day, the week's Monday or the month's 1st
+    period_start = models.DateField()
+    completed_tasks = models.IntegerField(default=0)
+    worked_hours = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    
+    class Meta:
+        db_table = 'task_rollup'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['scope', 'scope_id', 'period', 'period_start'], name='task_rollup_bucket_uniq'
+            ),
+        ]
+        indexes = [
+            # One bucket of every user (GET /api/analytics/tasks/users)
+            models.Index(fields=['scope', 'period', 'period_start'], name='task_rollup_period_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.scope}:{self.scope_id} {self.period} {self.period_start}: {self.completed_tasks} tasks"
+
+
+class ReplicationHeartbeat(models.Model):
+    """
+    Single row the primary rewrites periodically (manage.py sync_replicas);
+    its age on a replica is that replica's lag (see tasks/routers.py)
+    """
+    written_at = models.DateTimeField()
+    
+    class Meta:
+        db_table = 'replication_heartbeat'
+    
+    def __str__(self):
+        return f"Heartbeat at {self.written_at}"
+
+
+class TaskChange(models.Model):
+    """
+    Append-only log of writes to each user's task list, read by the delta
+    sync endpoint (see tasks/changes.py)
+    """
+    # Covered by task_change_user_idx
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='task_changes', db_index=False)
+    # Not a foreign key: tombstones outlive their tasks
+    task_id = models.BigIntegerField()
+    # Tombstone: the task was deleted or reassigned away from the user
+    deleted = models.BooleanField(default=False)
+    changed_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        db_table = 'task_change'
+        indexes = [
+            # A user's changes after a sync cursor
+            models.Index(fields=['user', 'id'], name='task_change_user_idx'),
+            # Pruning of expired rows
+            models.Index(fields=['changed_at'], name='task_change_time_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.user_id}: task {self.task_id} {'deleted' if self.deleted else 'changed'}"
+
+
+class Job(models.Model):
+    """
+    Deferred work queued by a write in its own transaction and run after
+    it commits by the `manage.py run_jobs` worker (see tasks/jobs.py)
+    """
+    STATUS_CHOICES = (
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('failed', 'Failed'),
+    )
+    
+    # Name the job function was registered under with @job
+    name = models.CharField(max_length=100)
+    queue = models.CharField(max_length=50, default='default')
+    payload = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    attempts = models.PositiveIntegerField(default=0)
+    # Not claimed before this time; pushed back after a failed attempt
+    run_at = models.DateTimeField(default=timezone.now)
+    # Worker that claimed the job
+    claimed_by = models.CharField(max_length=64, blank=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        db_table = 'job'
+        indexes = [
+            # Due jobs of a queue, oldest first
+            models.Index(fields=['queue', 'status', 'run_at'], name='job_claim_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.name} on {self.queue} ({self.status})"
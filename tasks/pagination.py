@@ -0,0 +1,187 @@
+import json
+from base64 import b64decode, b64encode
+from urllib import parse
+
+from django.db.models import Q
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class TaskCursorPagination(BasePagination):
+    """
+    Keyset (cursor) pagination for task lists
+
+    Every ordering is made unique by adding the primary key as a tie-breaker,
+    so each page is fetched with a WHERE clause on the last seen sort key
+    instead of an OFFSET scan. Fetching page N costs the same as page 1 as
+    long as the matching (assigned_to, <sort key>, id) index exists.
+    """
+    cursor_query_param = 'cursor'
+    ordering_query_param = 'ordering'
+    page_size_query_param = 'page_size'
+    page_size = 50
+    max_page_size = 200
+
+    # Allowed sort keys mapped to the value parser used to decode cursors
+    orderings = {
+        '-created_at': parse_datetime,
+        'due_date': parse_date,
+        'status': str,
+    }
+    default_ordering = '-created_at'
+    invalid_cursor_message = 'Invalid cursor.'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self.set_page(list(self.get_page_queryset(queryset, request)))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """
+        paginate_queryset for async views, fetching the page with the async ORM
+        """
+        return self.set_page([row async for row in self.get_page_queryset(queryset, request)])
+
+    def get_page_queryset(self, queryset, request):
+        """
+        The queryset slice holding the requested page plus one row
+        """
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request)
+        self.page_size = self.get_page_size(request)
+        self.field = self.ordering.lstrip('-')
+        self.descending = self.ordering.startswith('-')
+
+        self.cursor = self.decode_cursor(request)
+        self.reverse = self.cursor['reverse'] if self.cursor else False
+
+        # A reverse (previous page) fetch walks the index the other way
+        descending = self.descending != self.reverse
+        if descending:
+            order_by = ['-' + self.field, '-id']
+        else:
+            order_by = [self.field, 'id']
+        queryset = queryset.order_by(*order_by)
+
+        if self.cursor:
+            value = self.cursor['value']
+            lookup = 'lt' if descending else 'gt'
+            queryset = queryset.filter(
+                Q(**{f'{self.field}__{lookup}': value}) |
+                Q(**{self.field: value, f'id__{lookup}': self.cursor['id']})
+            )
+
+        # Fetch one extra row to find out whether another page follows
+        return queryset[:self.page_size + 1]
+
+    def set_page(self, results):
+        """
+        Keep the page rows of a fetched page queryset and set the links
+        """
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if self.reverse:
+            results.reverse()
+
+        if self.reverse:
+            self.has_next = self.cursor is not None
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = self.cursor is not None
+
+        self.page = results
+        return results
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'prev': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_query_params(self, request):
+        # Also used by the panel views with plain Django requests
+        return getattr(request, 'query_params', request.GET)
+
+    def get_ordering(self, request):
+        ordering = self.get_query_params(request).get(self.ordering_query_param, self.default_ordering)
+        if ordering not in self.orderings:
+            return self.default_ordering
+        return ordering
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(self.get_query_params(request)[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def encode_cursor(self, task, reverse):
+        # Pages hold model instances or values() rows
+        if isinstance(task, dict):
+            value, pk = task[self.field], task['id']
+        else:
+            value, pk = getattr(task, self.field), task.pk
+        if hasattr(value, 'isoformat'):
+            value = value.isoformat()
+        payload = {'o': self.ordering, 'v': value, 'id': pk, 'r': int(reverse)}
+        encoded = b64encode(json.dumps(payload, separators=(',', ':')).encode('ascii')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def decode_cursor(self, request):
+        encoded = self.get_query_params(request).get(self.cursor_query_param)
+        if encoded is None:
+            return None
+
+        try:
+            payload = json.loads(b64decode(parse.unquote(encoded).encode('ascii')).decode('ascii'))
+            value = self.orderings[self.ordering](payload['v'])
+            cursor = {
+                'value': value,
+                'id': int(payload['id']),
+                'reverse': bool(payload['r']),
+            }
+        except (TypeError, ValueError, KeyError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+        # A cursor is only meaningful for the ordering it was issued for
+        if value is None or payload.get('o') != self.ordering:
+            raise NotFound(self.invalid_cursor_message)
+        return cursor
+
+
+# Sort options of the panel task tables, with their labels
+PANEL_TASK_ORDERINGS = (
+    ('-created_at', 'Newest first'),
+    ('created_at', 'Oldest first'),
+    ('due_date', 'Due date (soonest)'),
+    ('-due_date', 'Due date (latest)'),
+)
+
+
+class PanelTaskPagination(TaskCursorPagination):
+    """
+    Keyset pagination for the panel task tables, which list tasks across
+    users and can be sorted by creation or due date in either direction
+    """
+    orderings = {
+        '-created_at': parse_datetime,
+        'created_at': parse_datetime,
+        'due_date': parse_date,
+        '-due_date': parse_date,
+    }
@@ -2,6 +2,7 @@ from django.urls import path
 from .panel_views import (
     panel_login,
     panel_logout,
+    panel_task_events,
     # SuperAdmin URLs
     superadmin_dashboard,
     superadmin_manage_admins,
@@ -12,6 +13,7 @@ from .panel_views import (
     superadmin_edit_user,
     superadmin_delete_user,
     superadmin_manage_tasks,
+    superadmin_export_tasks,
     superadmin_view_task_report,
     # Admin URLs
     admin_dashboard,
@@ -33,6 +35,7 @@ urlpatterns = [
     # Authentication
     path('login/', panel_login, name='panel_login'),
     path('logout/', panel_logout, name='panel_logout'),
+    path('events/', panel_task_events, name='panel_task_events'),
     
     # SuperAdmin URLs
     path('superadmin/dashboard/', superadmin_dashboard, name='superadmin_dashboard'),
@@ -44,6 +47,7 @@ urlpatterns = [
     path('superadmin/users/<int:user_id>/edit/', superadmin_edit_user, name='superadmin_edit_user'),
     path('superadmin/users/<int:user_id>/delete/', superadmin_delete_user, name='superadmin_delete_user'),
     path('superadmin/tasks/', superadmin_manage_tasks, name='superadmin_manage_tasks'),
+    path('superadmin/tasks/export/', superadmin_export_tasks, name='superadmin_export_tasks'),
     path('superadmin/tasks/<int:task_id>/report/', superadmin_view_task_report, name='superadmin_view_task_report'),
     
     # Admin URLs
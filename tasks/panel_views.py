@@ -1,13 +1,125 @@
+from asgiref.sync import sync_to_async
 from django.shortcuts import render, redirect, get_object_or_404
-from django.contrib.auth import authenticate, login, logout
+from django.conf import settings
+from django.contrib.auth import authenticate, get_user, login, logout
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.db.models import Q
-from django.http import HttpResponse
+from django.db.models import Count, Q
+from django.http import Http404, HttpResponse, HttpResponseBadRequest, HttpResponseForbidden
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
+from .events import served_over_asgi, stream_response
+from .exports import EXPORT_FORMATS, export_response, parse_export_filters
+from .filters import filter_tasks, parse_task_filters
+from .fragments import SUPERADMIN_SCOPE, admin_scope, fragment_context
 from .models import CustomUser, Task
+from .pagination import PANEL_TASK_ORDERINGS, PanelTaskPagination
+from .rollups import dashboard_widget
+from .search import admin_search_scope, search_tasks
+from .stats import get_admin_stats, get_superadmin_stats, get_user_stats
 from datetime import datetime
 
 
+# Filters offered on every panel task list (see tasks.filters)
+TASK_LIST_FILTERS = ('status', 'assignee', 'due_from', 'due_to', 'overdue')
+
+
+class TaskTable:
+    """
+    One page of a filtered, keyset paginated panel task table
+    Nothing is queried until the template reads the table, so a page whose
+    table fragment is cached runs none of these queries. The total comes
+    from the cached dashboard counters when unfiltered and from a count
+    capped at PANEL_TASK_COUNT_LIMIT rows otherwise, so neither walks the
+    whole table. With a query the table shows the best search matches
+    instead of pages; search_scope(filters) gives the user ids to scope the
+    search to.
+    """
+
+    def __init__(self, request, tasks, filters, query, total_tasks, search_scope):
+        self.request = request
+        self.filters = filters
+        self.query = query
+        self.paginator = PanelTaskPagination()
+        self._tasks = tasks
+        self._total_tasks = total_tasks
+        self._search_scope = search_scope
+
+    @cached_property
+    def _results(self):
+        # (queryset, ranked); ranked is None when not searching
+        if not self.query:
+            return self._tasks, None
+        return search_tasks(self._tasks, self.query, self._search_scope(self.filters))
+
+    @property
+    def ranked(self):
+        return self._results[1]
+
+    @cached_property
+    def _page(self):
+        # (tasks, next_url, prev_url)
+        tasks = self._results[0]
+        if self.query:
+            return list(tasks[:self.paginator.get_page_size(self.request)]), None, None
+        try:
+            page = self.paginator.paginate_queryset(tasks, self.request)
+        except NotFound:
+            raise Http404('Invalid cursor.')
+        return page, self.paginator.get_next_link(), self.paginator.get_previous_link()
+
+    @property
+    def tasks(self):
+        return self._page[0]
+
+    @property
+    def next_url(self):
+        return self._page[1]
+
+    @property
+    def prev_url(self):
+        return self._page[2]
+
+    @cached_property
+    def _total(self):
+        if not (self.filters or self.query):
+            return self._total_tasks(), False
+        limit = settings.PANEL_TASK_COUNT_LIMIT
+        total = self._results[0].order_by()[:limit + 1].count()
+        return min(total, limit), total > limit
+
+    @property
+    def total_tasks(self):
+        return self._total[0]
+
+    @property
+    def total_capped(self):
+        return self._total[1]
+
+
+def _task_list_context(request, tasks, filter_names, total_tasks, search_scope):
+    """
+    Context for a panel task table (see TaskTable) and its filter form
+    """
+    try:
+        filters = parse_task_filters(request.GET, filter_names)
+    except ValueError as e:
+        messages.error(request, f'Invalid filter: {e}')
+        filters = {}
+    query = request.GET.get('q', '').strip()
+    table = TaskTable(request, filter_tasks(tasks, filters), filters, query, total_tasks, search_scope)
+    
+    return {
+        'table': table,
+        'query': query,
+        'filter_values': request.GET,
+        'filters_active': bool(filters or query),
+        'status_choices': Task.STATUS_CHOICES,
+        'orderings': PANEL_TASK_ORDERINGS,
+        'ordering': table.paginator.get_ordering(request),
+    }
+
+
 def panel_login(request):
     """
     Login page for Admin Panel
@@ -55,6 +167,21 @@ def panel_logout(request):
     return redirect('panel_login')
 
 
+async def panel_task_events(request):
+    """
+    Server-Sent Events stream of the task writes the logged-in panel user
+    can see; the task pages use it to offer a reload instead of polling
+    Only served under ASGI (see tasks/events.py)
+    """
+    if not served_over_asgi(request):
+        return HttpResponseBadRequest('Event streams are only served by the ASGI application.')
+    # Loading the session user queries the database
+    user = await sync_to_async(get_user)(request)
+    if not user.is_authenticated:
+        return HttpResponseForbidden('Log in to receive task events.')
+    return stream_response(request, user)
+
+
 # ==================== SUPERADMIN VIEWS ====================
 
 @login_required(login_url='panel_login')
@@ -66,17 +193,10 @@ def superadmin_dashboard(request):
         messages.error(request, 'You do not have permission to access this page.')
         return redirect('panel_login')
     
-    total_admins = CustomUser.objects.filter(role='admin').count()
-    total_users = CustomUser.objects.filter(role='user').count()
-    total_tasks = Task.objects.count()
-    completed_tasks = Task.objects.filter(status='completed').count()
-    
-    context = {
-        'total_admins': total_admins,
-        'total_users': total_users,
-        'total_tasks': total_tasks,
-        'completed_tasks': completed_tasks,
-    }
+    # total_admins, total_users, total_tasks, completed_tasks
+    context = get_superadmin_stats()
+    # Completed work of everyone, from the rollup tables
+    context['analytics'] = dashboard_widget('all', 0)
     return render(request, 'panel/superadmin/dashboard.html', context)
 
 
@@ -89,7 +209,9 @@ def superadmin_manage_admins(request):
         messages.error(request, 'You do not have permission to access this page.')
         return redirect('panel_login')
     
-    admins = CustomUser.objects.filter(role='admin').order_by('-date_joined')
+    admins = CustomUser.objects.filter(role='admin').annotate(
+        assigned_user_count=Count('assigned_users')
+    ).order_by('-date_joined')
     context = {'admins': admins}
     return render(request, 'panel/superadmin/manage_admins.html', context)
 
@@ -157,8 +279,11 @@ def superadmin_manage_users(request):
         messages.error(request, 'You do not have permission to access this page.')
         return redirect('panel_login')
     
-    users = CustomUser.objects.filter(role='user').order_by('-date_joined')
-    context = {'users': users}
+    # Evaluated by the template only when the cached table has expired
+    users = CustomUser.objects.filter(role='user').select_related(
+        'assigned_to_admin', 'task_stats'
+    ).order_by('-date_joined')
+    context = {'users': users, **fragment_context(SUPERADMIN_SCOPE)}
     return render(request, 'panel/superadmin/manage_users.html', context)
 
 
@@ -265,11 +390,41 @@ def superadmin_manage_tasks(request):
         messages.error(request, 'You do not have permission to access this page.')
         return redirect('panel_login')
     
-    tasks = Task.objects.all().order_by('-created_at')
-    context = {'tasks': tasks}
+    context = _task_list_context(
+        request,
+        Task.objects.select_related('assigned_to', 'created_by'),
+        filter_names=('admin',) + TASK_LIST_FILTERS,
+        total_tasks=lambda: get_superadmin_stats()['total_tasks'],
+        search_scope=lambda filters: admin_search_scope(filters['admin']) if 'admin' in filters else None,
+    )
+    context['admins'] = CustomUser.objects.filter(role='admin').order_by('username')
+    context.update(fragment_context(SUPERADMIN_SCOPE))
     return render(request, 'panel/superadmin/manage_tasks.html', context)
 
 
+@login_required(login_url='panel_login')
+def superadmin_export_tasks(request):
+    """
+    SuperAdmin - Download tasks with completion reports as CSV or NDJSON
+    Filters: ?admin=ID, ?status=..., ?date_from= / ?date_to= (created date)
+    The file is streamed, so large exports run in constant memory
+    """
+    if not request.user.is_superadmin():
+        messages.error(request, 'You do not have permission to access this page.')
+        return redirect('panel_login')
+    
+    export_format = request.GET.get('output', 'csv')
+    try:
+        if export_format not in EXPORT_FORMATS:
+            raise ValueError(f'output must be one of: {", ".join(EXPORT_FORMATS)}.')
+        filters = parse_export_filters(request.GET)
+    except ValueError as e:
+        messages.error(request, f'Invalid export filter: {e}')
+        return redirect('superadmin_manage_tasks')
+    
+    return export_response(filters, export_format)
+
+
 @login_required(login_url='panel_login')
 def superadmin_view_task_report(request, task_id):
     """
@@ -299,15 +454,10 @@ def admin_dashboard(request):
         messages.error(request, 'You do not have permission to access this page.')
         return redirect('panel_login')
     
-    my_users = CustomUser.objects.filter(assigned_to_admin=request.user, role='user')
-    my_tasks = Task.objects.filter(assigned_to__assigned_to_admin=request.user)
-    completed_tasks = my_tasks.filter(status='completed').count()
-    
-    context = {
-        'total_users': my_users.count(),
-        'total_tasks': my_tasks.count(),
-        'completed_tasks': completed_tasks,
-    }
+    # total_users, total_tasks, completed_tasks
+    context = get_admin_stats(request.user)
+    # Completed work of this admin's users, from the rollup tables
+    context['analytics'] = dashboard_widget('admin', request.user.id)
     return render(request, 'panel/admin/dashboard.html', context)
 
 
@@ -320,20 +470,12 @@ def admin_view_users(request):
         messages.error(request, 'You do not have permission to access this page.')
         return redirect('panel_login')
     
-    users = CustomUser.objects.filter(assigned_to_admin=request.user, role='user').order_by('-date_joined')
-    
-    # Add task counts for each user
-    users_with_counts = []
-    for user in users:
-        total_tasks = user.tasks.count()
-        completed_tasks = user.tasks.filter(status='completed').count()
-        users_with_counts.append({
-            'user': user,
-            'total_tasks': total_tasks,
-            'completed_tasks': completed_tasks
-        })
-    
-    context = {'users_with_counts': users_with_counts}
+    # Task counts come from the denormalized counters joined to each user;
+    # evaluated by the template only when the cached table has expired
+    users = CustomUser.objects.filter(
+        assigned_to_admin=request.user, role='user'
+    ).select_related('task_stats').order_by('-date_joined')
+    context = {'users': users, **fragment_context(admin_scope(request.user.id))}
     return render(request, 'panel/admin/view_users.html', context)
 
 
@@ -346,8 +488,13 @@ def admin_manage_tasks(request):
         messages.error(request, 'You do not have permission to access this page.')
         return redirect('panel_login')
     
-    tasks = Task.objects.filter(assigned_to__assigned_to_admin=request.user).order_by('-created_at')
-    context = {'tasks': tasks}
+    context = _task_list_context(
+        request,
+        Task.objects.for_admin(request.user).select_related('assigned_to', 'created_by'),
+        filter_names=TASK_LIST_FILTERS,
+        total_tasks=lambda: get_admin_stats(request.user)['total_tasks'],
+        search_scope=lambda filters: admin_search_scope(request.user),
+    )
     return render(request, 'panel/admin/manage_tasks.html', context)
 
 
@@ -393,7 +540,7 @@ def admin_edit_task(request, task_id):
         messages.error(request, 'You do not have permission to access this page.')
         return redirect('panel_login')
     
-    task = get_object_or_404(Task, id=task_id, assigned_to__assigned_to_admin=request.user)
+    task = get_object_or_404(Task.objects.for_admin(request.user), id=task_id)
     users = CustomUser.objects.filter(assigned_to_admin=request.user, role='user')
     
     if request.method == 'POST':
@@ -420,7 +567,7 @@ def admin_delete_task(request, task_id):
         messages.error(request, 'You do not have permission to access this page.')
         return redirect('panel_login')
     
-    task = get_object_or_404(Task, id=task_id, assigned_to__assigned_to_admin=request.user)
+    task = get_object_or_404(Task.objects.for_admin(request.user), id=task_id)
     
     if request.method == 'POST':
         title = task.title
@@ -441,7 +588,7 @@ def admin_view_task_report(request, task_id):
         messages.error(request, 'You do not have permission to access this page.')
         return redirect('panel_login')
     
-    task = get_object_or_404(Task, id=task_id, assigned_to__assigned_to_admin=request.user)
+    task = get_object_or_404(Task.objects.for_admin(request.user), id=task_id)
     
     if task.status != 'completed':
         messages.warning(request, 'This task is not completed yet.')
@@ -499,19 +646,8 @@ def user_dashboard(request):
     # Get user's tasks
     tasks = Task.objects.filter(assigned_to=request.user).order_by('-created_at')
     
-    # Calculate statistics
-    total_tasks = tasks.count()
-    completed_tasks = tasks.filter(status='completed').count()
-    pending_tasks = tasks.filter(status='pending').count()
-    in_progress_tasks = tasks.filter(status='in_progress').count()
-    
-    context = {
-        'tasks': tasks,
-        'total_tasks': total_tasks,
-        'completed_tasks': completed_tasks,
-        'pending_tasks': pending_tasks,
-        'in_progress_tasks': in_progress_tasks,
-    }
+    # total_tasks, completed_tasks, pending_tasks, in_progress_tasks
+    context = {'tasks': tasks, **get_user_stats(request.user)}
     
     response = render(request, 'panel/user/dashboard.html', context)
     # Add cache control headers
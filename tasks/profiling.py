@@ -0,0 +1,360 @@
+"""
+Opt-in per-request profiling (tasks.middleware.RequestProfilingMiddleware)
+
+While profiling is on, each request records its SQL queries (count, time,
+and repeats of a statement with the same parameters), the time spent
+rendering templates and DRF responses, and its total time. The numbers are
+sent in a Server-Timing header, which browser dev tools show with the
+request, and logged as one JSON line on the 'tasks.profiling' logger
+(WARNING for requests over slow_ms). Template and response rendering times
+include the queries run while rendering, e.g. of querysets evaluated in a
+template. Templates are timed by the ProfiledDjangoTemplates backend and
+DRF responses by the middleware's process_template_response hook; both do
+nothing outside profiled requests.
+
+A sample_rate share of profiled requests also runs under cProfile, or
+pyinstrument when REQUEST_PROFILING_PROFILER says so and it is installed.
+Those slower than slow_ms are dumped to REQUEST_PROFILING_DUMP_DIR. Only
+sync requests are sampled: a profiler follows one thread, and async views
+run their queries in others.
+
+Profiling follows REQUEST_PROFILING_ENABLED unless a SuperAdmin switches it
+with PUT /api/profiling/. The switch is stored in the cache for a limited
+time, and each process rereads it every REQUEST_PROFILING_CHECK_INTERVAL
+seconds. With the default LocMemCache, the switch only reaches the process
+that served the PUT; several server processes need a shared cache.
+"""
+
+import cProfile
+import json
+import logging
+import os
+import random
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.template.backends.django import DjangoTemplates, Template
+from django.utils import timezone
+from django.utils.functional import LazyObject, empty
+from rest_framework.response import Response
+
+try:
+    import pyinstrument
+except ImportError:
+    pyinstrument = None
+
+
+logger = logging.getLogger(__name__)
+
+SWITCH_KEY = 'request_profiling'
+
+# Repeated statements named in a log line, and characters kept of each
+TOP_REPEATS = 3
+SQL_LENGTH = 300
+
+# Set by the middleware for the duration of a profiled request
+current_profile = ContextVar('current_profile', default=None)
+
+# (checked at, switch) of this process
+_switch = None
+
+_installed = False
+
+
+def default_switch():
+    return {
+        'enabled': settings.REQUEST_PROFILING_ENABLED,
+        'sample_rate': settings.REQUEST_PROFILING_SAMPLE_RATE,
+        'slow_ms': settings.REQUEST_PROFILING_SLOW_MS,
+        'expires_at': None,
+    }
+
+
+def read_switch():
+    """
+    The profiling switch as last set with set_switch(), or the settings
+    """
+    return cache.get(SWITCH_KEY) or default_switch()
+
+
+def profiling_switch():
+    """
+    The switch as seen by this process, reread every
+    REQUEST_PROFILING_CHECK_INTERVAL seconds
+    """
+    global _switch
+    now = time.monotonic()
+    if _switch is None or now - _switch[0] >= settings.REQUEST_PROFILING_CHECK_INTERVAL:
+        _switch = (now, read_switch())
+    return _switch[1]
+
+
+def parse_switch(data):
+    """
+    Validate a PUT /api/profiling/ body: 'enabled' and optional
+    'sample_rate' (0 to 1), 'slow_ms' and 'seconds' the switch holds for
+    Returns (switch, seconds); raises ValueError for invalid values
+    """
+    if not isinstance(data, dict) or not isinstance(data.get('enabled'), bool):
+        raise ValueError('"enabled" must be true or false.')
+    switch = default_switch()
+    switch['enabled'] = data['enabled']
+    try:
+        switch['sample_rate'] = float(data.get('sample_rate', switch['sample_rate']))
+        switch['slow_ms'] = int(data.get('slow_ms', switch['slow_ms']))
+        seconds = int(data.get('seconds', settings.REQUEST_PROFILING_SWITCH_SECONDS))
+    except (TypeError, ValueError):
+        raise ValueError('"sample_rate", "slow_ms" and "seconds" must be numbers.')
+    if not 0 <= switch['sample_rate'] <= 1:
+        raise ValueError('"sample_rate" must be between 0 and 1.')
+    if switch['slow_ms'] < 0:
+        raise ValueError('"slow_ms" must not be negative.')
+    if not 0 < seconds <= settings.REQUEST_PROFILING_MAX_SWITCH_SECONDS:
+        raise ValueError(
+            f'"seconds" must be between 1 and {settings.REQUEST_PROFILING_MAX_SWITCH_SECONDS}.'
+        )
+    return switch, seconds
+
+
+def set_switch(switch, seconds):
+    """
+    Store the switch for seconds, after which the settings apply again
+    This process follows it at once, others on their next check
+    """
+    global _switch
+    switch = dict(switch, expires_at=timezone.now() + timedelta(seconds=seconds))
+    cache.set(SWITCH_KEY, switch, seconds)
+    _switch = None
+    return switch
+
+
+class RequestProfile:
+    """
+    Timings of one request
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.sql_seconds = 0.0
+        # (sql, params) -> executions
+        self.statements = Counter()
+        self.seconds = Counter()
+        self._depth = Counter()
+
+    def record_query(self, sql, params, seconds):
+        self.queries += 1
+        self.sql_seconds += seconds
+        self.statements[(sql, repr(params))] += 1
+
+    def duplicates(self):
+        """
+        Queries repeating an earlier one of the request, parameters and all
+        """
+        return sum(count - 1 for count in self.statements.values())
+
+    def top_repeats(self):
+        """
+        The statements run most often with different parameters, N+1 style
+        """
+        counts = Counter()
+        for (sql, _), count in self.statements.items():
+            counts[sql] += count
+        return [
+            {'sql': sql[:SQL_LENGTH], 'count': count}
+            for sql, count in counts.most_common(TOP_REPEATS) if count > 1
+        ]
+
+    def summary(self, request, response):
+        total_ms = (time.perf_counter() - self.started) * 1000
+        match = request.resolver_match
+        return {
+            'method': request.method,
+            'path': request.path,
+            'view': match.view_name if match else None,
+            'status': response.status_code,
+            'user_id': _user_id(request),
+            'total_ms': round(total_ms, 2),
+            'sql_queries': self.queries,
+            'sql_ms': round(self.sql_seconds * 1000, 2),
+            'duplicate_queries': self.duplicates(),
+            'template_ms': round(self.seconds['template'] * 1000, 2),
+            'serialize_ms': round(self.seconds['serialize'] * 1000, 2),
+            'top_repeats': self.top_repeats(),
+        }
+
+
+def _user_id(request):
+    """
+    Id of the request's user if something already loaded it, without
+    loading it here: that queries the database, which async requests
+    cannot do from the event loop
+    DRF views replace AuthenticationMiddleware's lazy session user with the
+    user they authenticated, e.g. the token user of a JWT request.
+    """
+    user = getattr(request, 'user', None)
+    if isinstance(user, LazyObject):
+        user = user._wrapped
+    return None if user is empty else getattr(user, 'pk', None)
+
+
+def record_query(execute, sql, params, many, context):
+    """
+    Execute wrapper on every connection; times queries of profiled requests
+    """
+    profile = current_profile.get()
+    if profile is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        profile.record_query(sql, params, time.perf_counter() - start)
+
+
+def _add_query_wrapper(connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+@contextmanager
+def timing(kind):
+    """
+    Add the block's time to the profiled request's kind, counting nested
+    blocks (e.g. render_to_string inside a template) once
+    """
+    profile = current_profile.get()
+    if profile is None or profile._depth[kind]:
+        yield
+        return
+    profile._depth[kind] += 1
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.seconds[kind] += time.perf_counter() - start
+        profile._depth[kind] -= 1
+
+
+class ProfiledTemplate(Template):
+    def render(self, context=None, request=None):
+        with timing('template'):
+            return super().render(context, request)
+
+
+class ProfiledDjangoTemplates(DjangoTemplates):
+    """
+    Django template backend timing the templates rendered by profiled
+    requests; included and extended templates count in their parent's time
+    """
+
+    def from_string(self, template_code):
+        return ProfiledTemplate(super().from_string(template_code).template, self)
+
+    def get_template(self, template_name):
+        return ProfiledTemplate(super().get_template(template_name).template, self)
+
+
+def render_response(response):
+    """
+    Render a DRF response of a profiled request, timing it
+    Django renders the response right after the template response
+    middleware, so rendering it here changes nothing but the timing.
+    """
+    if current_profile.get() is not None and isinstance(response, Response):
+        with timing('serialize'):
+            response.render()
+    return response
+
+
+def install():
+    """
+    Hook query execution; the hook only times queries while
+    current_profile is set
+    """
+    global _installed
+    if _installed:
+        return
+    _installed = True
+    connection_created.connect(_add_query_wrapper, dispatch_uid='tasks.profiling')
+    for connection in connections.all(initialized_only=True):
+        _add_query_wrapper(connection)
+
+
+def server_timing(summary):
+    """
+    Server-Timing header value of a request summary
+    """
+    return ', '.join([
+        f'sql;dur={summary["sql_ms"]};desc="{summary["sql_queries"]} queries, '
+        f'{summary["duplicate_queries"]} duplicate"',
+        f'template;dur={summary["template_ms"]}',
+        f'serialize;dur={summary["serialize_ms"]}',
+        f'total;dur={summary["total_ms"]}',
+    ])
+
+
+def log_summary(summary, slow_ms):
+    level = logging.WARNING if summary['total_ms'] >= slow_ms else logging.INFO
+    logger.log(level, json.dumps(summary, cls=DjangoJSONEncoder), extra={'profile': summary})
+
+
+def start_sampled_profiler():
+    """
+    A started cProfile or pyinstrument profiler, or None if another
+    profiler is already running in this thread
+    """
+    try:
+        if settings.REQUEST_PROFILING_PROFILER == 'pyinstrument' and pyinstrument is not None:
+            profiler = pyinstrument.Profiler()
+            profiler.start()
+        else:
+            profiler = cProfile.Profile()
+            profiler.enable()
+    except (RuntimeError, ValueError):
+        return None
+    return profiler
+
+
+def stop_profiler(profiler):
+    if isinstance(profiler, cProfile.Profile):
+        profiler.disable()
+    else:
+        profiler.stop()
+
+
+def dump_sampled_profile(profiler, summary, slow_ms):
+    """
+    Stop a sampled profiler and dump it when the request was slow
+    Returns the dump's path, or None
+    """
+    stop_profiler(profiler)
+    if summary['total_ms'] < slow_ms:
+        return None
+    os.makedirs(settings.REQUEST_PROFILING_DUMP_DIR, exist_ok=True)
+    slug = re.sub(r'[^A-Za-z0-9]+', '-', summary['path']).strip('-') or 'root'
+    name = (
+        f'{time.strftime("%Y%m%d-%H%M%S")}-{summary["method"]}-{slug[:80]}-'
+        f'{int(summary["total_ms"])}ms-{os.getpid()}'
+    )
+    if isinstance(profiler, cProfile.Profile):
+        path = os.path.join(settings.REQUEST_PROFILING_DUMP_DIR, f'{name}.prof')
+        profiler.dump_stats(path)
+    else:
+        path = os.path.join(settings.REQUEST_PROFILING_DUMP_DIR, f'{name}.html')
+        with open(path, 'w') as f:
+            f.write(profiler.output_html())
+    return path
+
+
+def sampled(switch):
+    return switch['sample_rate'] > 0 and random.random() < switch['sample_rate']
@@ -0,0 +1,506 @@
+"""
+Completed-task rollups by user, admin and day / week / month
+
+Every completed task adds 1 and its worked hours to the TaskRollup row of
+its bucket for each period and scope: its assignee ('user'), the
+assignee's admin ('admin') and everyone ('all'). Buckets use the local
+date of completed_at. Task signals and the bulk write paths move these
+contributions as tasks enter or leave completed, change hours or move
+between users, so analytics read one row per bucket however many tasks
+there are.
+
+Those updates run as jobs on the 'rollups' queue after the write commits
+(see tasks/jobs.py), so rollups trail the task table by the queue's lag.
+Contribution jobs may run in any order: they commute, go to the
+assignee's admin at the time the job runs, and are skipped for deleted
+users, while moving a user between admins happens in the write itself. A
+resync of users whose task state was unknown leaves out their
+contributions still queued, which relies on the queue running one job at
+a time. rebuild_rollups cancels every rollups job, running ones included,
+as the task table it reads already holds their effect.
+"""
+
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from .jobs import enqueue, job
+from .models import CustomUser, Job, Task, TaskRollup
+
+
+PERIODS = ('day', 'week', 'month')
+
+# Task fields a task's rollup contribution depends on
+ROLLUP_FIELDS = ('assigned_to_id', 'status', 'worked_hours', 'completed_at')
+
+# Parameters of one rollup UPDATE, well under SQLite's variable limit
+ROLLUP_UPDATE_PARAMS = 500
+
+
+def period_start(day, period):
+    """
+    First day of the bucket holding day
+    """
+    if period == 'week':
+        return day - timedelta(days=day.weekday())
+    if period == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def next_period_start(start, period):
+    if period == 'week':
+        return start + timedelta(days=7)
+    if period == 'month':
+        return (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return start + timedelta(days=1)
+
+
+def _scopes(user_id, admin_id):
+    scopes = [('all', 0), ('user', user_id)]
+    if admin_id:
+        scopes.append(('admin', admin_id))
+    return scopes
+
+
+def _bucket_keys(scopes, day):
+    return [
+        (scope, scope_id, period, period_start(day, period))
+        for scope, scope_id in scopes
+        for period in PERIODS
+    ]
+
+
+def _hours(worked_hours):
+    # Views may assign worked_hours as a float before saving
+    return Decimal(str(worked_hours or 0)).quantize(Decimal('0.01'))
+
+
+def task_rollup_state(task):
+    return tuple(getattr(task, field) for field in ROLLUP_FIELDS)
+
+
+def loaded_rollup_state(task):
+    """
+    Rollup state the task was loaded with, or None if unknown
+    """
+    loaded = getattr(task, '_loaded_values', {})
+    if not all(field in loaded for field in ROLLUP_FIELDS):
+        return None
+    return tuple(loaded[field] for field in ROLLUP_FIELDS)
+
+
+def _contribution(state):
+    """
+    (user_id, day, hours) a task state adds to the rollups, or None
+    """
+    if state is None:
+        return None
+    assigned_to_id, status, worked_hours, completed_at = state
+    if status != 'completed' or completed_at is None or not assigned_to_id:
+        return None
+    return assigned_to_id, timezone.localdate(completed_at), _hours(worked_hours)
+
+
+def rollup_contributions(changes):
+    """
+    ((user_id, day, hours), sign) pairs moving task contributions from their
+    old to their new state
+    changes are (old, new) pairs of (assigned_to_id, status, worked_hours,
+    completed_at) tuples, None for a created or deleted task
+    """
+    contributions = []
+    for old, new in changes:
+        old, new = _contribution(old), _contribution(new)
+        if old == new:
+            continue
+        if old is not None:
+            contributions.append((old, -1))
+        if new is not None:
+            contributions.append((new, 1))
+    return contributions
+
+
+def defer_rollup_changes(changes):
+    """
+    Queue a job moving task contributions from their old to their new
+    state (see rollup_contributions); writes that leave every contribution
+    as it was, like most writes to tasks that are not completed, queue nothing
+    """
+    contributions = rollup_contributions(changes)
+    if contributions:
+        enqueue('apply_rollup_contributions', contributions=[
+            [user_id, day, hours, sign] for (user_id, day, hours), sign in contributions
+        ])
+
+
+@job('apply_rollup_contributions', queue='rollups')
+def apply_rollup_contributions(contributions):
+    """
+    Job applying contributions queued by defer_rollup_changes
+    """
+    _apply_contributions([
+        ((user_id, parse_date(day), Decimal(hours)), sign) for user_id, day, hours, sign in contributions
+    ])
+
+
+def _apply_contributions(contributions):
+    if not contributions:
+        return
+    user_ids = {user_id for (user_id, _, _), _ in contributions}
+    # Admins as they are now, not when the contribution was queued: moving a
+    # user between admins moves only the contributions applied so far
+    admin_of = dict(CustomUser.objects.filter(id__in=user_ids).values_list('id', 'assigned_to_admin_id'))
+    deltas = defaultdict(lambda: (0, 0))
+    for (user_id, day, hours), sign in contributions:
+        if user_id not in admin_of:
+            # Deleted since; remove_user_rollups dropped what was applied
+            continue
+        for key in _bucket_keys(_scopes(user_id, admin_of[user_id]), day):
+            count, total = deltas[key]
+            deltas[key] = (count + sign, total + sign * hours)
+    _apply_deltas(deltas)
+
+
+def _apply_deltas(deltas):
+    """
+    Add {(scope, scope_id, period, period_start): (completed_tasks, worked_hours)}
+    to the rollup rows, creating missing ones
+    """
+    deltas = {key: delta for key, delta in deltas.items() if delta != (0, 0)}
+    if not deltas:
+        return
+    TaskRollup.objects.bulk_create(
+        [
+            TaskRollup(scope=scope, scope_id=scope_id, period=period, period_start=start)
+            for scope, scope_id, period, start in deltas
+        ],
+        ignore_conflicts=True,
+    )
+    # Buckets moved by the same amount share an UPDATE, so a single task
+    # change is a single statement
+    by_delta = defaultdict(list)
+    for key, delta in deltas.items():
+        by_delta[delta].append(key)
+    for (count, hours), keys in by_delta.items():
+        for condition in _bucket_conditions(keys):
+            TaskRollup.objects.filter(condition).update(
+                completed_tasks=F('completed_tasks') + count,
+                worked_hours=F('worked_hours') + hours,
+            )
+
+
+def _bucket_conditions(keys):
+    """
+    Q objects matching the bucket keys between them, each with at most
+    about ROLLUP_UPDATE_PARAMS parameters
+    Keys of the same scope, period and start share one scope_id__in term:
+    OR-ing a term per key overflows SQLite's expression depth limit on
+    writes touching a few hundred users
+    """
+    scope_ids = defaultdict(list)
+    for scope, scope_id, period, start in keys:
+        scope_ids[(scope, period, start)].append(scope_id)
+    condition, params = Q(), 0
+    for (scope, period, start), ids in scope_ids.items():
+        for i in range(0, len(ids), ROLLUP_UPDATE_PARAMS):
+            chunk = ids[i:i + ROLLUP_UPDATE_PARAMS]
+            if params and params + len(chunk) + 3 > ROLLUP_UPDATE_PARAMS:
+                yield condition
+                condition, params = Q(), 0
+            condition |= Q(scope=scope, period=period, period_start=start, scope_id__in=chunk)
+            params += len(chunk) + 3
+    if params:
+        yield condition
+
+
+def _user_rows(user_id):
+    return TaskRollup.objects.filter(scope='user', scope_id=user_id).values_list(
+        'period', 'period_start', 'completed_tasks', 'worked_hours'
+    )
+
+
+def reassign_user_rollups(user_id, old_admin_id, new_admin_id):
+    """
+    Move a user's contributions between admins, reading the user's own
+    rows rather than their tasks
+    """
+    deltas = defaultdict(lambda: (0, 0))
+    for period, start, count, hours in _user_rows(user_id):
+        for admin_id, sign in ((old_admin_id, -1), (new_admin_id, 1)):
+            if admin_id:
+                old_count, old_hours = deltas[('admin', admin_id, period, start)]
+                deltas[('admin', admin_id, period, start)] = (old_count + sign * count, old_hours + sign * hours)
+    _apply_deltas(deltas)
+
+
+@job('remove_user_rollups', queue='rollups')
+def remove_user_rollups(user_id, admin_id):
+    """
+    Remove a deleted user's contributions, along with the rows of their
+    own scope and, for an admin, of their admin scope
+    Queued as a job by the user deletion; contributions queued before it
+    are skipped whichever runs first
+    """
+    deltas = defaultdict(lambda: (0, 0))
+    for period, start, count, hours in _user_rows(user_id):
+        for scope, scope_id in _scopes(user_id, admin_id):
+            if scope != 'user':
+                old_count, old_hours = deltas[(scope, scope_id, period, start)]
+                deltas[(scope, scope_id, period, start)] = (old_count - count, old_hours - hours)
+    _apply_deltas(deltas)
+    TaskRollup.objects.filter(Q(scope='user') | Q(scope='admin'), scope_id=user_id).delete()
+
+
+def compute_rollups(user_ids=None):
+    """
+    Aggregate the rollups from the task table
+    Returns {(scope, scope_id, period, period_start): (completed_tasks, worked_hours)};
+    with user_ids, only the contributions of those users' tasks
+    """
+    tasks = Task.objects.filter(status='completed', completed_at__isnull=False)
+    if user_ids is not None:
+        tasks = tasks.filter(assigned_to_id__in=user_ids)
+    rows = tasks.order_by().values(
+        'assigned_to_id',
+        admin_id=F('assigned_to__assigned_to_admin_id'),
+        day=TruncDate('completed_at'),
+    ).annotate(completed_tasks=Count('id'), worked_hours=Sum('worked_hours'))
+
+    totals = defaultdict(lambda: (0, 0))
+    for row in rows.iterator():
+        hours = _hours(row['worked_hours'])
+        for key in _bucket_keys(_scopes(row['assigned_to_id'], row['admin_id']), row['day']):
+            count, total = totals[key]
+            totals[key] = (count + row['completed_tasks'], total + hours)
+    return dict(totals)
+
+
+def _stored_rollups(user_ids=None):
+    rollups = TaskRollup.objects.exclude(completed_tasks=0, worked_hours=0)
+    if user_ids is not None:
+        rollups = rollups.filter(scope='user', scope_id__in=user_ids)
+    return {
+        (scope, scope_id, period, start): (count, hours)
+        for scope, scope_id, period, start, count, hours in rollups.values_list(
+            'scope', 'scope_id', 'period', 'period_start', 'completed_tasks', 'worked_hours'
+        ).iterator()
+    }
+
+
+def rebuild_rollups(batch_size=1000):
+    """
+    Replace every rollup row with one computed from the task table
+    Call this after writes that bypass model signals (bulk_create, update)
+    """
+    with transaction.atomic():
+        # Every rollups job only moves the rollups towards the task table
+        # the rebuild reads. Running ones are cancelled too: their own row
+        # is gone when they finish, so they roll back instead of applying
+        # on top of the rebuilt rows (see run_job)
+        Job.objects.filter(queue='rollups').delete()
+        rollups = compute_rollups()
+        TaskRollup.objects.all().delete()
+        TaskRollup.objects.bulk_create(
+            [
+                TaskRollup(
+                    scope=scope, scope_id=scope_id, period=period, period_start=start,
+                    completed_tasks=count, worked_hours=hours,
+                )
+                for (scope, scope_id, period, start), (count, hours) in rollups.items()
+            ],
+            batch_size=batch_size,
+        )
+    return len(rollups)
+
+
+def resync_user_rollups(user_ids):
+    """
+    Queue a job bringing the rollups in line with the given users' tasks
+    Used when a task's previous state is unknown
+    """
+    enqueue('apply_user_rollups_resync', user_ids=sorted(set(user_ids)))
+
+
+def _pending_user_contributions(user_ids):
+    """
+    User-scope deltas of the contributions of these users still in the job table
+    """
+    deltas = defaultdict(lambda: (0, 0))
+    payloads = Job.objects.filter(queue='rollups', name='apply_rollup_contributions').values_list('payload', flat=True)
+    for payload in payloads.iterator():
+        for user_id, day, hours, sign in payload['contributions']:
+            if user_id not in user_ids:
+                continue
+            for key in _bucket_keys([('user', user_id)], parse_date(day)):
+                count, total = deltas[key]
+                deltas[key] = (count + sign, total + sign * Decimal(hours))
+    return deltas
+
+
+@job('apply_user_rollups_resync', queue='rollups')
+def apply_user_rollups_resync(user_ids):
+    """
+    Job setting the users' rollups to their tasks' totals, adjusting their
+    admin and 'all' buckets by the same amounts as their own buckets
+    The rollups queue runs one job at a time, so contributions still queued
+    apply after this one: they are left out of the totals set here
+    """
+    user_ids = set(user_ids)
+    pending = _pending_user_contributions(user_ids)
+    expected = {key: value for key, value in compute_rollups(user_ids).items() if key[0] == 'user'}
+    stored = _stored_rollups(user_ids)
+    admin_of = dict(CustomUser.objects.filter(id__in=user_ids).values_list('id', 'assigned_to_admin_id'))
+    deltas = defaultdict(lambda: (0, 0))
+    for key in expected.keys() | stored.keys() | pending.keys():
+        _, user_id, period, start = key
+        if user_id not in admin_of:
+            # Deleted since; remove_user_rollups drops their rows
+            continue
+        expected_count, expected_hours = expected.get(key, (0, 0))
+        pending_count, pending_hours = pending.get(key, (0, 0))
+        stored_count, stored_hours = stored.get(key, (0, 0))
+        count = expected_count - pending_count - stored_count
+        hours = expected_hours - pending_hours - stored_hours
+        for scope, scope_id in _scopes(user_id, admin_of[user_id]):
+            old_count, old_hours = deltas[(scope, scope_id, period, start)]
+            deltas[(scope, scope_id, period, start)] = (old_count + count, old_hours + hours)
+    _apply_deltas(deltas)
+
+
+def find_rollup_drift():
+    """
+    Compare stored rollups with the task table
+    Returns {bucket key: (stored, expected)} for every bucket that differs
+    """
+    expected = compute_rollups()
+    stored = _stored_rollups()
+    return {
+        key: (stored.get(key), expected.get(key))
+        for key in expected.keys() | stored.keys()
+        if stored.get(key) != expected.get(key)
+    }
+
+
+def parse_period(params):
+    """
+    ?period=day|week|month, default week; raises ValueError
+    """
+    period = params.get('period', 'week')
+    if period not in PERIODS:
+        raise ValueError(f'period must be one of: {", ".join(PERIODS)}.')
+    return period
+
+
+def parse_day(params, name):
+    """
+    Date in ?<name>=YYYY-MM-DD or None when empty; raises ValueError
+    """
+    value = params.get(name, '').strip()
+    if not value:
+        return None
+    try:
+        day = parse_date(value)
+    except ValueError:
+        day = None
+    if day is None:
+        raise ValueError(f'{name} must be a date (YYYY-MM-DD).')
+    return day
+
+
+def parse_analytics_params(params):
+    """
+    (period, start, end) from ?period= and the ?from= / ?to= dates; without
+    from, the last TASKS_ANALYTICS_DEFAULT_BUCKETS buckets up to ?to= or
+    today. Raises ValueError for invalid values
+    """
+    period = parse_period(params)
+    end = parse_day(params, 'to') or timezone.localdate()
+    start = parse_day(params, 'from')
+    if start is None:
+        start = period_start(end, period)
+        for _ in range(settings.TASKS_ANALYTICS_DEFAULT_BUCKETS - 1):
+            start = period_start(start - timedelta(days=1), period)
+    if start > end:
+        raise ValueError('from must not be after to.')
+    return period, start, end
+
+
+def rollup_series(scope, scope_id, period, start, end):
+    """
+    Completed tasks and worked hours of every bucket from start to end,
+    zeros for buckets without completions
+    Raises ValueError when the range spans more than TASKS_ANALYTICS_MAX_BUCKETS
+    """
+    start = period_start(start, period)
+    starts = []
+    day = start
+    while day <= end:
+        starts.append(day)
+        if len(starts) > settings.TASKS_ANALYTICS_MAX_BUCKETS:
+            raise ValueError(f'At most {settings.TASKS_ANALYTICS_MAX_BUCKETS} buckets can be requested.')
+        day = next_period_start(day, period)
+
+    rows = {
+        row[0]: row[1:]
+        for row in TaskRollup.objects.filter(
+            scope=scope, scope_id=scope_id, period=period, period_start__range=(start, end)
+        ).values_list('period_start', 'completed_tasks', 'worked_hours')
+    }
+    series = []
+    for day in starts:
+        count, hours = rows.get(day, (0, Decimal('0.00')))
+        series.append({'period_start': day, 'completed_tasks': count, 'worked_hours': hours})
+    return series
+
+
+def user_rollups_queryset(period, start, admin_id=None):
+    """
+    Per-user rollup rows of the bucket starting at start with usernames,
+    most hours first; limited to an admin's users with admin_id
+    """
+    rows = TaskRollup.objects.filter(scope='user', period=period, period_start=start).exclude(
+        completed_tasks=0, worked_hours=0
+    )
+    if admin_id is not None:
+        rows = rows.filter(
+            scope_id__in=CustomUser.objects.filter(assigned_to_admin_id=admin_id).values('id')
+        )
+    return rows.annotate(
+        username=Subquery(CustomUser.objects.filter(id=OuterRef('scope_id')).values('username')[:1])
+    ).order_by('-worked_hours', '-completed_tasks', 'scope_id')
+
+
+def user_rollups(period, start, admin_id=None):
+    """
+    Completed tasks and worked hours of each user in one bucket, see user_rollups_queryset
+    """
+    return [
+        {'user_id': user_id, 'username': username, 'completed_tasks': count, 'worked_hours': hours}
+        for user_id, username, count, hours in user_rollups_queryset(period, start, admin_id).values_list(
+            'scope_id', 'username', 'completed_tasks', 'worked_hours'
+        )
+    ]
+
+
+def dashboard_widget(scope, scope_id):
+    """
+    Last TASKS_ANALYTICS_WIDGET_WEEKS weeks and this month for the panel
+    dashboards, with bar widths relative to the busiest week
+    """
+    today = timezone.localdate()
+    weeks = rollup_series(
+        scope, scope_id, 'week', today - timedelta(weeks=settings.TASKS_ANALYTICS_WIDGET_WEEKS - 1), today
+    )
+    busiest = max(week['worked_hours'] for week in weeks) or 1
+    for week in weeks:
+        week['bar_percent'] = int(week['worked_hours'] * 100 / busiest)
+    month = rollup_series(scope, scope_id, 'month', today, today)[0]
+    return {'weeks': weeks, 'month': month}
@@ -0,0 +1,166 @@
+"""
+Primary / read-replica database routing
+
+Reads of tasks app models made while serving a GET request go to one of
+the DATABASE_REPLICAS aliases; everything else goes to the primary
+('default'): writes, reads of requests that may write, reads inside a
+transaction, reads outside requests (management commands), auth,
+session and admin tables, and the PRIMARY_MODELS, whose reads must see
+the latest writes.
+
+Read-your-writes: once a request writes a tasks model, the rest of that
+request and the same user's requests for the next REPLICA_MAX_LAG_SECONDS
+read from the primary. Replicas whose replication heartbeat is older than
+REPLICA_MAX_LAG_SECONDS are skipped, so a pinned user never reads data
+older than their own writes.
+"""
+
+import random
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.contrib.auth import SESSION_KEY
+from django.core.cache import cache
+from django.db import DatabaseError, connections
+from django.utils import timezone
+from rest_framework_simplejwt.exceptions import TokenBackendError
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.state import token_backend
+
+
+PRIMARY = 'default'
+
+# Apps whose tables are read from replicas
+REPLICATED_APPS = {'tasks'}
+# Models of REPLICATED_APPS always read from the primary: accounts (roles,
+# activation and token_version decide what a request may do) and the
+# per-user task versions used as ETag validators, which other users'
+# writes bump and the read-your-writes pin would not cover
+PRIMARY_MODELS = {'tasks.customuser', 'tasks.usertaskstats'}
+
+# Set by tasks.middleware.replica_routing_middleware for the duration of a request
+current_request = ContextVar('current_request', default=None)
+
+# Replica alias -> (checked at, lag in seconds or None when unreachable)
+_replica_lags = {}
+
+
+def pin_key(user_id):
+    return f'replica_pin:{user_id}'
+
+
+def request_user_id(request):
+    """
+    Id of the user making the request, read without querying the database
+    The JWT signature is not checked: the id only selects a pin, and the
+    view authenticates the token anyway.
+    """
+    header = request.META.get('HTTP_AUTHORIZATION', '').split()
+    if len(header) == 2 and header[0] in jwt_settings.AUTH_HEADER_TYPES:
+        try:
+            return token_backend.decode(header[1], verify=False).get(jwt_settings.USER_ID_CLAIM)
+        except TokenBackendError:
+            return None
+    session = getattr(request, 'session', None)
+    return session.get(SESSION_KEY) if session is not None else None
+
+
+class RequestRouting:
+    """
+    Routing state of one request
+    """
+
+    def __init__(self, request):
+        self.request = request
+        # Requests that may write read the rows they update from the primary
+        self.safe = request.method in ('GET', 'HEAD', 'OPTIONS')
+        self.wrote = False
+        self.replica = None
+        self._pinned = None
+
+    def is_pinned(self):
+        if self._pinned is None:
+            user_id = request_user_id(self.request)
+            self._pinned = user_id is not None and bool(cache.get(pin_key(user_id)))
+        return self._pinned
+
+    def finish(self):
+        """
+        Pin the user's reads to the primary after a write
+        """
+        if not self.wrote:
+            return
+        user_id = request_user_id(self.request)
+        if user_id is not None:
+            cache.set(pin_key(user_id), True, settings.REPLICA_MAX_LAG_SECONDS)
+
+
+def replica_lag(alias):
+    """
+    Seconds since the primary's last heartbeat reached the replica, or None
+    if it cannot be read; rechecked every REPLICA_LAG_CHECK_INTERVAL seconds
+    """
+    from .models import ReplicationHeartbeat
+
+    checked_at, lag = _replica_lags.get(alias, (None, None))
+    now = time.monotonic()
+    if checked_at is None or now - checked_at >= settings.REPLICA_LAG_CHECK_INTERVAL:
+        try:
+            written_at = ReplicationHeartbeat.objects.using(alias).values_list('written_at', flat=True).first()
+        except DatabaseError:
+            written_at = None
+        lag = (timezone.now() - written_at).total_seconds() if written_at else None
+        _replica_lags[alias] = (now, lag)
+    return lag
+
+
+def healthy_replicas():
+    """
+    Replica aliases currently within REPLICA_MAX_LAG_SECONDS of the primary
+    """
+    return [
+        alias for alias in settings.DATABASE_REPLICAS
+        if (lag := replica_lag(alias)) is not None and lag <= settings.REPLICA_MAX_LAG_SECONDS
+    ]
+
+
+class PrimaryReplicaRouter:
+    """
+    Database router sending request reads to replicas (see module docstring)
+    """
+
+    def db_for_read(self, model, **hints):
+        routing = current_request.get()
+        if (
+            routing is None
+            or not settings.DATABASE_REPLICAS
+            or model._meta.app_label not in REPLICATED_APPS
+            or model._meta.label_lower in PRIMARY_MODELS
+            or connections[PRIMARY].in_atomic_block
+            or not routing.safe
+            or routing.wrote
+            or routing.is_pinned()
+        ):
+            return PRIMARY
+        replicas = healthy_replicas()
+        if not replicas:
+            return PRIMARY
+        # One replica per request keeps its reads consistent with each other
+        if routing.replica not in replicas:
+            routing.replica = random.choice(replicas)
+        return routing.replica
+
+    def db_for_write(self, model, **hints):
+        routing = current_request.get()
+        if routing is not None and model._meta.app_label in REPLICATED_APPS:
+            routing.wrote = True
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Every alias holds the same data
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their schema from the primary through replication
+        return db == PRIMARY
@@ -0,0 +1,125 @@
+"""
+Full-text search over task titles, descriptions and completion reports
+
+On SQLite the task queryset is filtered on the ids the task_fts FTS5 table
+(migration 0007) matches, so role scoping and filters stay ordinary ORM
+filters. Searches
+limited to a few users also name them in the MATCH expression, which lets
+FTS5 intersect posting lists instead of visiting every match.
+
+Results are ordered by bm25 relevance, title matches weighted highest.
+Ranking has to score every match, so queries matching more than
+TASKS_SEARCH_RANK_LIMIT tasks are returned newest first instead, which
+FTS5 serves straight from its index. Other databases fall back to an
+unranked case-insensitive LIKE search.
+"""
+
+import re
+
+from django.conf import settings
+from django.db import connections, router
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from .models import CustomUser, Task
+
+
+# Columns searched by user terms; assigned_to_id is only used for scoping
+TEXT_COLUMNS = '{title description completion_report}'
+
+# bm25 column weights: title, description, completion_report, assigned_to_id
+RANK_SQL = 'bm25(task_fts, 10.0, 2.0, 1.0, 0.0)'
+
+
+def search_terms(query):
+    """
+    Words of a user query; punctuation and FTS5 operators are dropped
+    """
+    return re.findall(r'\w+', query)
+
+
+def _quote(term):
+    return '"{}"'.format(str(term).replace('"', '""'))
+
+
+def match_expression(terms, user_ids=None):
+    """
+    FTS5 MATCH expression requiring every term in the text columns and,
+    when user_ids is given, one of those assignees
+    """
+    expression = '{} : ({})'.format(TEXT_COLUMNS, ' '.join(_quote(term) for term in terms))
+    if user_ids is not None:
+        expression += ' AND assigned_to_id : ({})'.format(' OR '.join(_quote(user_id) for user_id in user_ids))
+    return expression
+
+
+def admin_search_scope(admin):
+    """
+    Ids of the admin's users to pass to search_tasks, or None when there
+    are too many to name in a MATCH expression
+    """
+    limit = settings.TASKS_SEARCH_MAX_SCOPE_USERS
+    user_ids = list(
+        CustomUser.objects.filter(assigned_to_admin=admin).order_by().values_list('id', flat=True)[:limit + 1]
+    )
+    return user_ids if len(user_ids) <= limit else None
+
+
+def search_tasks(tasks, query, user_ids=None):
+    """
+    Restrict a Task queryset to the tasks matching query and order them
+    Pass the ids of the users the queryset is limited to as user_ids to
+    speed up scoped searches. Returns (queryset, ranked) where ranked tells
+    whether the results are ordered by relevance or newest first.
+    """
+    terms = search_terms(query)
+    if not terms or user_ids == []:
+        return tasks.none(), True
+
+    connection = connections[router.db_for_read(Task)]
+    if connection.vendor != 'sqlite':
+        for term in terms:
+            tasks = tasks.filter(
+                Q(title__icontains=term) | Q(description__icontains=term) | Q(completion_report__icontains=term)
+            )
+        return tasks.order_by('-created_at', '-id'), False
+
+    expression = match_expression(terms, user_ids)
+    limit = settings.TASKS_SEARCH_RANK_LIMIT
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT COUNT(*) FROM (SELECT rowid FROM task_fts WHERE task_fts MATCH %s LIMIT %s)',
+            [expression, limit + 1],
+        )
+        ranked = cursor.fetchone()[0] <= limit
+
+    matches = RawSQL('SELECT rowid FROM task_fts WHERE task_fts MATCH %s', [expression])
+    tasks = tasks.filter(id__in=matches)
+    if ranked:
+        # bm25 only scores rows of a MATCH query. The LIMIT keeps SQLite from
+        # pushing the task id into that query, which would rerun the MATCH
+        # for every task; instead the scores are computed once and looked up
+        rank = RawSQL(
+            f'SELECT ranks.rank FROM (SELECT rowid, {RANK_SQL} AS rank FROM task_fts '
+            f'WHERE task_fts MATCH %s LIMIT %s) AS ranks '
+            f'WHERE ranks.rowid = {connection.ops.quote_name(Task._meta.db_table)}.id',
+            [expression, limit],
+        )
+        return tasks.order_by(rank.asc(), 'id'), True
+    # Newest first: task ids are the index's rowids
+    return tasks.order_by('-id'), False
+
+
+def rebuild_search_index(optimize=False):
+    """
+    Re-index every task from the task table, and optionally merge the
+    index segments. Returns False when the database has no search index
+    """
+    connection = connections[router.db_for_write(Task)]
+    if connection.vendor != 'sqlite':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute("INSERT INTO task_fts(task_fts) VALUES ('rebuild')")
+        if optimize:
+            cursor.execute("INSERT INTO task_fts(task_fts) VALUES ('optimize')")
+    return True
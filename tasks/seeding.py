@@ -0,0 +1,293 @@
+"""
+Seeding helpers for benchmarks and query plan checks, and the synthetic
+data generator behind `manage.py generate_data`
+"""
+
+import math
+import random
+from contextlib import contextmanager
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.utils import timezone
+
+from .counters import rebuild_user_task_stats
+from .models import CustomUser, Task, UserTaskStats
+from .rollups import rebuild_rollups
+
+
+BENCH_PASSWORD = 'bench-password'
+BATCH_SIZE = 5000
+STATUSES = ['pending', 'in_progress', 'completed']
+# Varied task text so search benchmarks see realistic term frequencies
+WORDS = (
+    'invoice report migration deploy review backend frontend database cache '
+    'customer billing onboarding security audit release hotfix analytics '
+    'dashboard export import payment refund shipping inventory warehouse '
+    'schedule meeting design prototype research budget forecast contract '
+    'support ticket escalation training documentation translation upgrade '
+    'monitoring alert backup restore network server mobile android ios'
+).split()
+
+
+def parse_size(value):
+    """
+    Parse a row count such as 1000, 100k or 1M
+    Raises ValueError for anything else
+    """
+    number = value.strip().lower()
+    multiplier = 1
+    if number.endswith('k'):
+        multiplier, number = 1000, number[:-1]
+    elif number.endswith('m'):
+        multiplier, number = 1000000, number[:-1]
+    try:
+        return int(float(number) * multiplier)
+    except ValueError:
+        raise ValueError(f'Invalid size "{value}".')
+
+
+class Seeder:
+    """
+    Tops up the benchmark database to a target task volume
+
+    Users and admins scale with the task count so per-row queries in user
+    listings show up as well. A single precomputed password hash is shared
+    by every seeded account.
+    """
+
+    def __init__(self):
+        self.password = make_password(BENCH_PASSWORD)
+        self.superadmin = CustomUser.objects.create(
+            username='bench_superadmin', password=self.password, role='superadmin'
+        )
+
+    def seed(self, total_tasks, total_users=None):
+        """
+        Top up to total_tasks tasks and total_users regular users
+        (by default one user per 200 tasks)
+        """
+        admins = self._top_up_users('admin', 1 + total_tasks // 10000)
+        users = self._top_up_users('user', total_users or 5 + total_tasks // 200, admins)
+        self._top_up_tasks(total_tasks, admins, users)
+        # bulk_create bypasses the signals that maintain the counters
+        rebuild_user_task_stats()
+        rebuild_rollups()
+
+    def _top_up_users(self, role, count, admins=None):
+        existing = CustomUser.objects.filter(role=role).count()
+        new_users = []
+        for i in range(existing, count):
+            new_users.append(CustomUser(
+                username=f'bench_{role}{i}',
+                email=f'bench_{role}{i}@example.com',
+                password=self.password,
+                role=role,
+                assigned_to_admin_id=admins[i % len(admins)] if admins else None,
+            ))
+        CustomUser.objects.bulk_create(new_users, batch_size=BATCH_SIZE)
+        return list(CustomUser.objects.filter(role=role).order_by('id').values_list('id', flat=True))
+
+    def _top_up_tasks(self, total_tasks, admins, users):
+        admin_of = dict(CustomUser.objects.filter(role='user').values_list('id', 'assigned_to_admin_id'))
+        start = Task.objects.count()
+        today = date.today()
+        now = timezone.now()
+        for batch_start in range(start, total_tasks, BATCH_SIZE):
+            batch = []
+            for i in range(batch_start, min(batch_start + BATCH_SIZE, total_tasks)):
+                user_id = users[i % len(users)]
+                # Cycle statuses per user so every user owns tasks of each status
+                status = STATUSES[(i // len(users)) % len(STATUSES)]
+                completed = status == 'completed'
+                batch.append(Task(
+                    title=f'Benchmark task {i}',
+                    description=' '.join(WORDS[(i * k * 7 + k) % len(WORDS)] for k in range(1, 13)),
+                    assigned_to_id=user_id,
+                    created_by_id=admin_of[user_id],
+                    due_date=today + timedelta(days=i % 60 - 30),
+                    status=status,
+                    completion_report='Benchmark completion report.' if completed else None,
+                    worked_hours=Decimal('2.50') if completed else None,
+                    # Spread completions over the last 90 days of analytics buckets
+                    completed_at=now - timedelta(days=i % 90) if completed else None,
+                ))
+            Task.objects.bulk_create(batch)
+
+    def fixtures(self):
+        """
+        Stable objects used to fill URL kwargs and authenticate requests
+        """
+        admin = CustomUser.objects.filter(role='admin').order_by('id').first()
+        user = CustomUser.objects.filter(role='user', assigned_to_admin=admin).order_by('id').first()
+        return {
+            'superadmin': self.superadmin,
+            'admin': admin,
+            'user': user,
+            'task': Task.objects.filter(assigned_to=user).exclude(status='completed').order_by('id').first(),
+            'completed_task': Task.objects.filter(assigned_to=user, status='completed').order_by('id').first(),
+        }
+
+
+# Password of every account made by generate_data
+SAMPLE_PASSWORD = 'sample123456'
+
+
+def generated_username(role, index):
+    """
+    superadmin, superadmin2, ..., admin1, admin2, ..., user1, user2, ...
+    """
+    if role == 'superadmin' and index == 0:
+        return 'superadmin'
+    return f'{role}{index + 1}'
+
+
+def generated_accounts(role):
+    """
+    Accounts of a role named like generate_data names them, oldest first
+    """
+    return CustomUser.objects.filter(role=role, username__regex=rf'^{role}[0-9]*$').order_by('id')
+
+
+@contextmanager
+def explicit_timestamps(model):
+    """
+    Let bulk_create keep the created_at / updated_at values set on the
+    instances instead of stamping them with the current time
+    """
+    fields = [
+        field for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)
+    ]
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+class DataGenerator:
+    """
+    Reproducible synthetic accounts and tasks at production volumes
+
+    Every batch of rows draws from its own random generator, seeded from
+    the seed, the row kind and the batch number, and dates count back from
+    the end of the as_of day (default today). The same options, seed and
+    day therefore produce the same rows on an empty database, whether the
+    batches are made by one process or several (which may number them in
+    another order), or by several top-ups.
+
+    Distributions:
+    - Users join admins and own tasks in uneven, log-normal shares.
+    - Tasks are created over the last `days` days and are due one day to a
+      few months later, two weeks on median.
+    - Most overdue tasks are completed; most tasks due later are still
+      pending or in progress.
+    - Completed tasks log a quarter hour to 80 hours, four on median.
+    """
+
+    def __init__(self, seed=0, batch_size=BATCH_SIZE, days=365, as_of=None):
+        self.seed = seed
+        self.batch_size = batch_size
+        self.days = days
+        # Looked up once; per-row lookups cost as much as the rest of a row
+        self.tz = timezone.get_current_timezone()
+        self.now = datetime.combine(as_of or timezone.localdate(), time.max, tzinfo=self.tz)
+
+    def rng(self, kind, batch=0):
+        return random.Random(f'{self.seed}:{kind}:{batch}')
+
+    def share_weights(self, kind, count):
+        """
+        Cumulative log-normal weights of count owners, for random.choices
+        """
+        rng = self.rng(f'{kind}-weights')
+        total = 0
+        cumulative = []
+        for _ in range(count):
+            total += rng.lognormvariate(0, 0.75)
+            cumulative.append(total)
+        return cumulative
+
+    def generate_users(self, role, count, password, admin_ids=None):
+        """
+        Top up the role to count generated accounts; regular users are spread
+        over admin_ids. Returns the ids of the role's generated accounts
+        """
+        existing = generated_accounts(role).count()
+        admin_weights = self.share_weights('admin', len(admin_ids)) if admin_ids else None
+        for batch in range(existing // self.batch_size, math.ceil(count / self.batch_size)):
+            rng = self.rng(role, batch)
+            start = batch * self.batch_size
+            users = []
+            for index in range(start, min(start + self.batch_size, count)):
+                joined = self.now - timedelta(days=rng.uniform(0, self.days), seconds=rng.uniform(0, 86400))
+                admin_id = rng.choices(admin_ids, cum_weights=admin_weights)[0] if admin_ids else None
+                if index < existing:
+                    # Drawn anyway so the rows after it match a one-shot run
+                    continue
+                username = generated_username(role, index)
+                users.append(CustomUser(
+                    username=username,
+                    email=f'{username}@example.com',
+                    password=password,
+                    role=role,
+                    first_name=role.capitalize(),
+                    last_name=str(index + 1),
+                    assigned_to_admin_id=admin_id,
+                    date_joined=joined,
+                ))
+            CustomUser.objects.bulk_create(users)
+            # The counter rows create_user_task_stats would have made
+            UserTaskStats.objects.bulk_create([UserTaskStats(user_id=user.pk) for user in users])
+        return list(generated_accounts(role).values_list('id', flat=True))
+
+    def task_batch(self, batch, user_ids, user_weights, admin_of, skip=0, stop=None):
+        """
+        Unsaved tasks of one batch, from its row skip up to (not including)
+        its row stop, by default the end of the batch
+        """
+        rng = self.rng('task', batch)
+        start = batch * self.batch_size
+        today = self.now.date()
+        tasks = []
+        for index in range(start, start + (self.batch_size if stop is None else stop)):
+            user_id = rng.choices(user_ids, cum_weights=user_weights)[0]
+            created_at = self.now - timedelta(days=rng.uniform(0, self.days))
+            # Median e^2.6, about two weeks
+            lead_days = min(1 + int(rng.lognormvariate(2.6, 0.8)), 120)
+            due_date = created_at.astimezone(self.tz).date() + timedelta(days=lead_days)
+            roll = rng.random()
+            if due_date < today:
+                status = 'completed' if roll < 0.85 else 'in_progress' if roll < 0.95 else 'pending'
+            else:
+                status = 'completed' if roll < 0.15 else 'in_progress' if roll < 0.5 else 'pending'
+            words = rng.choices(WORDS, k=14)
+            title = ' '.join(words[:rng.randint(2, 4)]).capitalize()
+            completed = status == 'completed'
+            if completed:
+                # Quarter hours around a median of e^1.386 = 4
+                hours = Decimal(min(max(round(rng.lognormvariate(1.386, 0.7) * 4) / 4, 0.25), 80))
+                due_at = datetime.combine(due_date, time(18), tzinfo=self.tz)
+                span = (due_at - created_at).total_seconds()
+                completed_at = min(created_at + timedelta(seconds=span * rng.uniform(0.1, 1.3)), self.now)
+            if index - start < skip:
+                continue
+            tasks.append(Task(
+                title=title,
+                description=' '.join(words[4:]),
+                assigned_to_id=user_id,
+                created_by_id=admin_of[user_id],
+                due_date=due_date,
+                status=status,
+                completion_report=f'Done: {" ".join(words[10:])}.' if completed else None,
+                worked_hours=hours.quantize(Decimal('0.01')) if completed else None,
+                completed_at=completed_at if completed else None,
+                created_at=created_at,
+                updated_at=completed_at if completed else created_at,
+            ))
+        return tasks
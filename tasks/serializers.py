@@ -1,4 +1,9 @@
-from rest_framework import serializers
+from django.conf import settings
+from django.utils import timezone
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from .authentication import add_token_claims
 from .models import Task, CustomUser
 
 
@@ -12,7 +17,134 @@ class UserSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'role']
 
 
-class TaskSerializer(serializers.ModelSerializer):
+class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
+    """
+    JWT pair with role, admin and token version claims, which let
+    StatelessJWTAuthentication authenticate requests without a user query
+    Refreshed access tokens copy the claims from the refresh token.
+    """
+    @classmethod
+    def get_token(cls, user):
+        return add_token_claims(super().get_token(user), user)
+
+
+class SparseFieldsetMixin:
+    """
+    Lets clients choose the serialized fields with ?fields=a,b or ?exclude=a,b
+    Pass the chosen names as fields=; ValuesSerializer then queries only
+    their columns, so unused text columns are never read
+    """
+    fields_query_param = 'fields'
+    exclude_query_param = 'exclude'
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+    @classmethod
+    def select_fields(cls, query_params):
+        """
+        Field names requested by the query string, in serializer order
+        Raises ValueError for unknown names or when both parameters are given
+        """
+        available = list(cls().fields)
+        requested = query_params.get(cls.fields_query_param)
+        excluded = query_params.get(cls.exclude_query_param)
+        if requested is not None and excluded is not None:
+            raise ValueError(
+                f'Use either ?{cls.fields_query_param}= or ?{cls.exclude_query_param}=, not both.'
+            )
+        names = requested if requested is not None else excluded
+        if names is None:
+            return available
+
+        names = {name.strip() for name in names.split(',') if name.strip()}
+        unknown = names - set(available)
+        if unknown:
+            raise ValueError(
+                f'Unknown field(s): {", ".join(sorted(unknown))}. '
+                f'Available fields: {", ".join(available)}.'
+            )
+        if requested is not None:
+            return [name for name in available if name in names]
+        return [name for name in available if name not in names]
+
+
+class ValuesSerializer:
+    """
+    Read-only fast path for a ModelSerializer over values() rows
+
+    Resolves the serializer's fields once and then builds each row's dict
+    directly from the queried columns, skipping model instances and the
+    per-row attribute lookups of Serializer.to_representation. Values are
+    converted by the serializer's own fields, so the output matches
+    serializer_class(instances, many=True).data exactly.
+    """
+
+    def __init__(self, serializer_class, fields=None):
+        serializer = serializer_class(fields=fields)
+        self.columns = []
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            if isinstance(field, serializers.PrimaryKeyRelatedField) and field.pk_field is None:
+                # values() already returns the related id
+                convert = None
+            elif type(field) is serializers.CharField:
+                # CharField.to_representation is str(); database strings need nothing
+                convert = None
+            elif type(field) is serializers.DateTimeField:
+                convert = self._datetime_converter(field)
+            else:
+                convert = field.to_representation
+            self.columns.append((name, field.source.replace('.', '__'), convert))
+
+    @staticmethod
+    def _datetime_converter(field):
+        """
+        DateTimeField.to_representation with the current timezone looked up
+        once instead of for every value
+        """
+        output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+        if (
+            not settings.USE_TZ
+            or hasattr(field, 'timezone')
+            or output_format is None
+            or output_format.lower() != ISO_8601
+        ):
+            return field.to_representation
+        current_timezone = timezone.get_current_timezone()
+
+        def convert(value):
+            if not timezone.is_aware(value):
+                return field.to_representation(value)
+            value = value.astimezone(current_timezone).isoformat()
+            if value.endswith('+00:00'):
+                value = value[:-6] + 'Z'
+            return value
+        return convert
+
+    def values(self, queryset, required=()):
+        """
+        queryset.values() with the columns behind the fields plus the required lookups
+        """
+        paths = [path for _, path, _ in self.columns] + list(required)
+        return queryset.values(*dict.fromkeys(paths))
+
+    def to_representation(self, row):
+        ret = {}
+        for name, path, convert in self.columns:
+            value = row[path]
+            ret[name] = convert(value) if convert is not None and value is not None else value
+        return ret
+
+    def serialize(self, rows):
+        return [self.to_representation(row) for row in rows]
+
+
+class TaskSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """
     Serializer for Task listing
     """
@@ -55,7 +187,19 @@ class TaskUpdateSerializer(serializers.ModelSerializer):
         return data
 
 
-class TaskReportSerializer(serializers.ModelSerializer):
+class TaskBulkCreateSerializer(serializers.ModelSerializer):
+    """
+    Serializer for one item of a bulk task creation request
+    The assignee is validated by the view in one query for the whole batch
+    """
+    assigned_to = serializers.IntegerField(source='assigned_to_id')
+    
+    class Meta:
+        model = Task
+        fields = ['title', 'description', 'assigned_to', 'due_date', 'status']
+
+
+class TaskReportSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """
     Serializer for viewing task completion report
     """
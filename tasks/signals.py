@@ -0,0 +1,232 @@
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from .authentication import user_states
+from .changes import record_task_changes, task_save_changes
+from .events import ALL_CHANNEL, admin_channel, publish_on_commit, publish_task_events, task_save_events
+from .counters import apply_task_change, rebuild_user_task_stats
+from .models import CustomUser, Task, UserTaskStats
+from .jobs import enqueue
+from .rollups import (
+    defer_rollup_changes, loaded_rollup_state, reassign_user_rollups, resync_user_rollups, task_rollup_state
+)
+from .stats import invalidate_stats, invalidate_task_stats
+
+
+# Saves that only touch these fields do not change any dashboard figure
+USER_FIELDS_WITHOUT_STATS = {'last_login', 'password'}
+
+# Task fields that feed the per-user counters
+TASK_COUNTER_FIELDS = ('assigned_to_id', 'status', 'worked_hours')
+
+
+def _loaded_counter_state(task):
+    loaded = getattr(task, '_loaded_values', {})
+    if not all(field in loaded for field in TASK_COUNTER_FIELDS):
+        return None
+    return tuple(loaded[field] for field in TASK_COUNTER_FIELDS)
+
+
+def _current_counter_state(task):
+    return tuple(getattr(task, field) for field in TASK_COUNTER_FIELDS)
+
+
+@receiver(post_save, sender=Task)
+def update_counters_on_task_save(sender, instance, created, raw=False, **kwargs):
+    """
+    Move the task's contribution to the per-user counters
+    Runs inside the transaction opened by Task.save
+    """
+    if raw:
+        return
+    if created:
+        apply_task_change(None, _current_counter_state(instance))
+        return
+
+    old = _loaded_counter_state(instance)
+    if old is None:
+        # Previous state unknown (instance not loaded from the database)
+        rebuild_user_task_stats([instance.assigned_to_id])
+        return
+    apply_task_change(old, _current_counter_state(instance))
+
+
+@receiver(post_delete, sender=Task)
+def update_counters_on_task_delete(sender, instance, origin=None, **kwargs):
+    """
+    Remove the task's contribution from the per-user counters
+    Runs inside the deletion transaction, including cascades
+    """
+    origin_model = getattr(origin, 'model', type(origin))
+    if origin_model is CustomUser:
+        # Deleting the assignee cascades to its tasks and its counter row
+        return
+    old = _loaded_counter_state(instance) or _current_counter_state(instance)
+    apply_task_change(old, None)
+
+
+@receiver(post_save, sender=Task)
+def update_rollups_on_task_save(sender, instance, created, raw=False, **kwargs):
+    """
+    Queue the move of the task's contribution to the completed-task rollups
+    """
+    if raw:
+        return
+    if created:
+        defer_rollup_changes([(None, task_rollup_state(instance))])
+        return
+    old = loaded_rollup_state(instance)
+    if old is None:
+        # Previous state unknown (instance not loaded from the database)
+        resync_user_rollups([instance.assigned_to_id])
+        return
+    defer_rollup_changes([(old, task_rollup_state(instance))])
+
+
+@receiver(post_delete, sender=Task)
+def update_rollups_on_task_delete(sender, instance, origin=None, **kwargs):
+    """
+    Queue the removal of the task's contribution from the completed-task rollups
+    """
+    origin_model = getattr(origin, 'model', type(origin))
+    if origin_model is CustomUser:
+        # Handled once per user by remove_deleted_user_rollups
+        return
+    defer_rollup_changes([(loaded_rollup_state(instance) or task_rollup_state(instance), None)])
+
+
+@receiver(post_save, sender=Task)
+def log_task_save(sender, instance, created, raw=False, **kwargs):
+    """
+    Log the write for delta sync, with a tombstone for a previous assignee
+    """
+    if raw:
+        return
+    record_task_changes(task_save_changes(instance, created))
+
+
+@receiver(post_delete, sender=Task)
+def log_task_delete(sender, instance, origin=None, **kwargs):
+    """
+    Log a tombstone for the assignee of a deleted task
+    """
+    origin_model = getattr(origin, 'model', type(origin))
+    if origin_model is CustomUser:
+        # The assignee's change log is deleted along with them
+        return
+    user_id = instance.get_loaded_value('assigned_to_id') or instance.assigned_to_id
+    record_task_changes([(instance.pk, user_id, True)])
+
+
+@receiver(post_save, sender=Task)
+def push_task_save(sender, instance, created, raw=False, **kwargs):
+    """
+    Push the write to the event streams once it commits
+    """
+    if raw:
+        return
+    publish_task_events(task_save_events(instance, created))
+
+
+@receiver(post_delete, sender=Task)
+def push_task_delete(sender, instance, origin=None, **kwargs):
+    """
+    Push the deletion to the event streams once it commits
+    """
+    origin_model = getattr(origin, 'model', type(origin))
+    if origin_model is CustomUser:
+        # Covered by the user.deleted event of push_user_delete
+        return
+    user_id = instance.get_loaded_value('assigned_to_id') or instance.assigned_to_id
+    publish_task_events([('task.deleted', {'id': instance.pk}, user_id)])
+
+
+@receiver(pre_delete, sender=CustomUser)
+def push_user_delete(sender, instance, **kwargs):
+    """
+    Tell the admin and SuperAdmin streams that a user and their tasks are gone
+    """
+    if instance.is_regular_user():
+        channels = [ALL_CHANNEL]
+        if instance.assigned_to_admin_id:
+            channels.append(admin_channel(instance.assigned_to_admin_id))
+        publish_on_commit(channels, 'user.deleted', {'id': instance.pk})
+
+
+@receiver(post_save, sender=CustomUser)
+def move_user_rollups(sender, instance, created, raw=False, **kwargs):
+    """
+    A user moved to another admin takes their completed work along
+    """
+    if created or raw or 'assigned_to_admin_id' not in getattr(instance, '_loaded_values', {}):
+        return
+    old_admin_id = instance.get_loaded_value('assigned_to_admin_id')
+    if old_admin_id != instance.assigned_to_admin_id:
+        reassign_user_rollups(instance.pk, old_admin_id, instance.assigned_to_admin_id)
+
+
+@receiver(pre_delete, sender=CustomUser)
+def remove_deleted_user_rollups(sender, instance, **kwargs):
+    """
+    Deleting a user cascades to their tasks, whose contributions are
+    removed by one job reading the user's rollup rows
+    """
+    enqueue('remove_user_rollups', user_id=instance.pk, admin_id=instance.assigned_to_admin_id)
+
+
+@receiver(post_save, sender=CustomUser)
+def create_user_task_stats(sender, instance, created, raw=False, **kwargs):
+    """
+    Every user gets an empty counter row so listings can join it directly
+    """
+    if created and not raw:
+        UserTaskStats.objects.get_or_create(user=instance)
+
+
+@receiver(post_save, sender=Task)
+@receiver(post_delete, sender=Task)
+def invalidate_task_dashboard_stats(sender, instance, **kwargs):
+    """
+    Drop cached dashboard stats of the task's current and previous assignee
+    """
+    invalidate_task_stats({instance.assigned_to_id, instance.get_loaded_value('assigned_to_id')})
+
+
+@receiver(post_save, sender=CustomUser)
+@receiver(post_delete, sender=CustomUser)
+def invalidate_user_dashboard_stats(sender, instance, update_fields=None, **kwargs):
+    """
+    Drop cached dashboard stats when users are created, deleted,
+    change role or move between admins
+    """
+    if update_fields and set(update_fields) <= USER_FIELDS_WITHOUT_STATS:
+        return
+    invalidate_stats(
+        user_ids=[instance.pk],
+        admin_ids=[instance.pk, instance.assigned_to_admin_id, instance.get_loaded_value('assigned_to_admin_id')],
+    )
+
+
+@receiver(post_save, sender=CustomUser)
+@receiver(post_delete, sender=CustomUser)
+def forget_user_token_state(sender, instance, **kwargs):
+    """
+    Drop the user's cached token state (version, role) once the change commits
+    """
+    user_id = instance.pk
+    transaction.on_commit(lambda: user_states.forget(user_id))
+
+
+@receiver(pre_delete, sender=CustomUser)
+def revoke_unassigned_user_tokens(sender, instance, **kwargs):
+    """
+    Deleting an admin unassigns its users with an UPDATE that skips
+    CustomUser.save, so their token versions are bumped here
+    """
+    user_ids = list(CustomUser.objects.filter(assigned_to_admin=instance).values_list('id', flat=True))
+    if not user_ids:
+        return
+    CustomUser.objects.filter(id__in=user_ids).update(token_version=F('token_version') + 1)
+    transaction.on_commit(lambda: [user_states.forget(user_id) for user_id in user_ids])
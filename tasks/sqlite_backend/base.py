@@ -0,0 +1,64 @@
+"""
+SQLite backend for many concurrent writers
+
+Django's SQLite backend plus three OPTIONS, all off unless set:
+
+  pragmas           PRAGMAs run on every new connection, e.g.
+                    {'journal_mode': 'WAL', 'synchronous': 'NORMAL'}
+  transaction_mode  'IMMEDIATE' opens atomic blocks with BEGIN IMMEDIATE.
+                    A deferred BEGIN only takes the write lock at the first
+                    write, and a transaction that has already read cannot
+                    wait for it: SQLite fails it at once with "database is
+                    locked". Taking the lock up front makes writers queue
+                    on the busy timeout ('timeout' option) instead.
+  lock_retries      How many more times a BEGIN that still found the
+                    database locked after the busy timeout is retried,
+                    after a short random backoff
+
+See SQLITE_DEFAULT_OPTIONS and SQLITE_PRODUCTION_OPTIONS in settings.py.
+"""
+
+import random
+import time
+
+from django.db import OperationalError
+from django.db.backends.sqlite3 import base
+
+# Upper bound of the first retry's backoff in seconds, doubled per retry
+LOCK_RETRY_DELAY = 0.05
+
+BACKEND_OPTIONS = ('pragmas', 'transaction_mode', 'lock_retries')
+
+
+def is_lock_error(error):
+    return 'database is locked' in str(error) or 'database table is locked' in str(error)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+
+    def get_connection_params(self):
+        kwargs = super().get_connection_params()
+        # sqlite3.connect() rejects unknown arguments
+        for option in BACKEND_OPTIONS:
+            kwargs.pop(option, None)
+        return kwargs
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        for name, value in self.settings_dict['OPTIONS'].get('pragmas', {}).items():
+            conn.execute(f'PRAGMA {name} = {value}')
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        options = self.settings_dict['OPTIONS']
+        mode = options.get('transaction_mode')
+        statement = f'BEGIN {mode}' if mode else 'BEGIN'
+        retries = options.get('lock_retries', 0)
+        for attempt in range(retries + 1):
+            try:
+                self.cursor().execute(statement)
+                return
+            except OperationalError as e:
+                if attempt == retries or not is_lock_error(e):
+                    raise
+                time.sleep(random.uniform(0, LOCK_RETRY_DELAY * 2 ** attempt))
@@ -0,0 +1,96 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import Coalesce
+
+from .fragments import SUPERADMIN_SCOPE, admin_scope, bump_fragment_versions
+from .models import CustomUser, Task
+
+
+SUPERADMIN_STATS_KEY = 'dashboard_stats:superadmin'
+
+
+def admin_stats_key(admin_id):
+    return f'dashboard_stats:admin:{admin_id}'
+
+
+def user_stats_key(user_id):
+    return f'dashboard_stats:user:{user_id}'
+
+
+def _cached(key, compute):
+    stats = cache.get(key)
+    if stats is None:
+        stats = compute()
+        cache.set(key, stats, settings.DASHBOARD_STATS_CACHE_TIMEOUT)
+    return stats
+
+
+def get_superadmin_stats():
+    """
+    Admin/user counts and task counts for the SuperAdmin dashboard
+    One conditional aggregate per table, cached for a short TTL
+    """
+    def compute():
+        stats = CustomUser.objects.aggregate(
+            total_admins=Count('id', filter=Q(role='admin')),
+            total_users=Count('id', filter=Q(role='user')),
+        )
+        stats.update(Task.objects.aggregate(
+            total_tasks=Count('id'),
+            completed_tasks=Count('id', filter=Q(status='completed')),
+        ))
+        return stats
+    return _cached(SUPERADMIN_STATS_KEY, compute)
+
+
+def get_admin_stats(admin):
+    """
+    User and task counts for an Admin dashboard in a single aggregate query
+    over the admin's users and their denormalized task counters
+    """
+    def compute():
+        return CustomUser.objects.filter(assigned_to_admin=admin, role='user').aggregate(
+            total_users=Count('id'),
+            total_tasks=Coalesce(Sum('task_stats__total_tasks'), 0),
+            completed_tasks=Coalesce(Sum('task_stats__completed_tasks'), 0),
+        )
+    return _cached(admin_stats_key(admin.pk), compute)
+
+
+def get_user_stats(user):
+    """
+    Task counts by status for a User dashboard in a single aggregate query
+    """
+    def compute():
+        return Task.objects.filter(assigned_to=user).aggregate(
+            total_tasks=Count('id'),
+            pending_tasks=Count('id', filter=Q(status='pending')),
+            in_progress_tasks=Count('id', filter=Q(status='in_progress')),
+            completed_tasks=Count('id', filter=Q(status='completed')),
+        )
+    return _cached(user_stats_key(user.pk), compute)
+
+
+def invalidate_stats(user_ids=(), admin_ids=()):
+    """
+    Drop the cached stats and panel table fragments affected by a write
+    The SuperAdmin stats and tables cover everything, so they are always dropped
+    """
+    keys = [SUPERADMIN_STATS_KEY]
+    keys += [user_stats_key(user_id) for user_id in user_ids if user_id]
+    keys += [admin_stats_key(admin_id) for admin_id in admin_ids if admin_id]
+    cache.delete_many(keys)
+    bump_fragment_versions(
+        [SUPERADMIN_SCOPE] + [admin_scope(admin_id) for admin_id in set(admin_ids) if admin_id]
+    )
+
+
+def invalidate_task_stats(user_ids):
+    """
+    Drop the cached stats of the given task assignees and their admins
+    Call this after writes that bypass model signals (bulk_create, update)
+    """
+    user_ids = {user_id for user_id in user_ids if user_id}
+    admin_ids = CustomUser.objects.filter(pk__in=user_ids).values_list('assigned_to_admin_id', flat=True)
+    invalidate_stats(user_ids=user_ids, admin_ids=set(admin_ids))
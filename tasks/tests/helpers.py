@@ -0,0 +1,26 @@
+from rest_framework.test import APIClient
+
+from tasks.models import CustomUser, Task
+from tasks.serializers import CustomTokenObtainPairSerializer
+
+
+def create_account(username, role='user', admin=None, **fields):
+    return CustomUser.objects.create_user(username, password='pw', role=role, assigned_to_admin=admin, **fields)
+
+
+def create_task(user, **fields):
+    fields = {'title': 'Task', 'description': 'Description', 'due_date': '2026-01-01', **fields}
+    return Task.objects.create(assigned_to=user, **fields)
+
+
+def access_token(user):
+    return str(CustomTokenObtainPairSerializer.get_token(user).access_token)
+
+
+def api_client(user):
+    """
+    API client sending a JWT issued to user, authenticated like real requests
+    """
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {access_token(user)}')
+    return client
@@ -0,0 +1,83 @@
+from django.test import TestCase
+
+from tasks.authentication import user_states
+
+from .helpers import api_client, create_account
+
+
+class TokenRevocationTests(TestCase):
+    """
+    Tokens carry the user's token_version; changes to the claims revoke them
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = create_account('admin', role='admin')
+        cls.other_admin = create_account('other_admin', role='admin')
+        cls.user = create_account('user', admin=cls.admin)
+
+    def setUp(self):
+        user_states.clear()
+
+    def save(self, user, **fields):
+        # Saving forgets the cached token state once the change commits
+        with self.captureOnCommitCallbacks(execute=True):
+            for field, value in fields.items():
+                setattr(user, field, value)
+            user.save()
+
+    def assertAccepted(self, client):
+        self.assertEqual(client.get('/api/tasks/').status_code, 200)
+
+    def assertRevoked(self, client):
+        response = client.get('/api/tasks/')
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.json()['code'], 'token_revoked')
+
+    def test_token_is_accepted(self):
+        self.assertAccepted(api_client(self.user))
+
+    def test_role_change_revokes_tokens(self):
+        client = api_client(self.user)
+        self.assertAccepted(client)
+        self.save(self.user, role='admin')
+        self.assertRevoked(client)
+
+    def test_password_change_revokes_tokens(self):
+        client = api_client(self.user)
+        self.assertAccepted(client)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.set_password('new password')
+            self.user.save()
+        self.assertRevoked(client)
+        self.assertAccepted(api_client(self.user))
+
+    def test_moving_to_another_admin_revokes_tokens(self):
+        client = api_client(self.user)
+        self.assertAccepted(client)
+        self.save(self.user, assigned_to_admin=self.other_admin)
+        self.assertRevoked(client)
+
+    def test_other_saves_keep_tokens(self):
+        client = api_client(self.user)
+        self.save(self.user, first_name='Ada')
+        self.assertAccepted(client)
+
+    def test_deactivated_user_is_rejected(self):
+        client = api_client(self.user)
+        self.assertAccepted(client)
+        self.save(self.user, is_active=False)
+        self.assertEqual(client.get('/api/tasks/').status_code, 401)
+
+    def test_deleting_the_admin_revokes_its_users_tokens(self):
+        client = api_client(self.user)
+        self.assertAccepted(client)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.admin.delete()
+        self.assertRevoked(client)
+
+    def test_deleted_user_is_rejected(self):
+        client = api_client(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.delete()
+        self.assertEqual(client.get('/api/tasks/').status_code, 401)
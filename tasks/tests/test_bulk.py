@@ -0,0 +1,126 @@
+from django.test import TestCase, override_settings
+
+from tasks.models import Task, TaskChange, UserTaskStats
+
+from .helpers import api_client, create_account, create_task
+
+
+def bulk_item(user, **fields):
+    return {'title': 'Task', 'description': 'd', 'assigned_to': user.id, 'due_date': '2026-01-01', **fields}
+
+
+@override_settings(JOBS_RUN_INLINE=True)
+class BulkCreateTests(TestCase):
+    """
+    POST /api/tasks/bulk/
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = create_account('admin', role='admin')
+        cls.other_admin = create_account('other_admin', role='admin')
+        cls.user = create_account('user', admin=cls.admin)
+        cls.other_user = create_account('other_user', admin=cls.other_admin)
+
+    def post(self, items, user=None, **params):
+        client = api_client(user or self.admin)
+        url = '/api/tasks/bulk/'
+        if params:
+            url += '?' + '&'.join(f'{key}={value}' for key, value in params.items())
+        with self.captureOnCommitCallbacks(execute=True):
+            return client.post(url, items, format='json')
+
+    def test_creates_tasks_in_order(self):
+        items = [bulk_item(self.user, title=f'Task {i}', status='completed') for i in range(5)]
+        response = self.post(items, batch_size=2)
+        self.assertEqual(response.status_code, 201)
+        ids = [result['id'] for result in response.json()['results']]
+        tasks = Task.objects.in_bulk(ids)
+        self.assertEqual([tasks[task_id].title for task_id in ids], [f'Task {i}' for i in range(5)])
+        task = tasks[ids[0]]
+        self.assertEqual((task.created_by_id, task.status), (self.admin.id, 'completed'))
+        self.assertIsNotNone(task.completed_at)
+        self.assertIsNotNone(task.created_at)
+        stats = UserTaskStats.objects.get(user=self.user)
+        self.assertEqual((stats.total_tasks, stats.completed_tasks), (5, 5))
+        self.assertEqual(TaskChange.objects.filter(user_id=self.user.id, task_id__in=ids).count(), 5)
+
+    def test_defaults_status_to_pending(self):
+        response = self.post([bulk_item(self.user)])
+        self.assertEqual(response.status_code, 201)
+        task = Task.objects.get(id=response.json()['results'][0]['id'])
+        self.assertEqual((task.status, task.completed_at), ('pending', None))
+
+    def test_nothing_is_created_when_an_item_is_invalid(self):
+        items = [bulk_item(self.user), bulk_item(self.other_user), bulk_item(self.user, due_date='soon')]
+        response = self.post(items)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([result['index'] for result in response.json()['results']], [2])
+        items = [bulk_item(self.user), bulk_item(self.other_user)]
+        response = self.post(items)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([result['index'] for result in response.json()['results']], [1])
+        self.assertFalse(Task.objects.exists())
+
+    def test_only_admins_may_bulk_create(self):
+        self.assertEqual(self.post([bulk_item(self.user)], user=self.user).status_code, 403)
+        self.assertEqual(self.post([]).status_code, 400)
+        self.assertEqual(self.post({'title': 'x'}).status_code, 400)
+
+
+@override_settings(JOBS_RUN_INLINE=True)
+class BatchUpdateTests(TestCase):
+    """
+    PUT /api/tasks/batch/
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = create_account('admin', role='admin')
+        cls.user = create_account('user', admin=cls.admin)
+        cls.other_user = create_account('other_user', admin=cls.admin)
+
+    def setUp(self):
+        self.tasks = [create_task(self.user) for _ in range(3)]
+        self.other_task = create_task(self.other_user)
+
+    def put(self, items, atomic=None):
+        url = '/api/tasks/batch/' if atomic is None else f'/api/tasks/batch/?atomic={atomic}'
+        with self.captureOnCommitCallbacks(execute=True):
+            return api_client(self.user).put(url, items, format='json')
+
+    def statuses(self):
+        return [Task.objects.get(id=task.id).status for task in self.tasks]
+
+    def test_updates_every_task(self):
+        items = [{'id': task.id, 'status': 'in_progress'} for task in self.tasks]
+        items[0] = {'id': self.tasks[0].id, 'status': 'completed', 'completion_report': 'r', 'worked_hours': '2'}
+        response = self.put(items)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.statuses(), ['completed', 'in_progress', 'in_progress'])
+        self.assertIsNotNone(Task.objects.get(id=self.tasks[0].id).completed_at)
+        stats = UserTaskStats.objects.get(user=self.user)
+        self.assertEqual((stats.completed_tasks, stats.in_progress_tasks, stats.pending_tasks), (1, 2, 0))
+
+    def test_atomic_batch_saves_nothing_when_an_item_fails(self):
+        items = [
+            {'id': self.tasks[0].id, 'status': 'in_progress'},
+            {'id': self.tasks[1].id, 'status': 'completed'},
+            {'id': self.other_task.id, 'status': 'in_progress'},
+            {'id': self.tasks[0].id, 'status': 'pending'},
+            {'status': 'pending'},
+        ]
+        response = self.put(items)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([result['index'] for result in response.json()['results']], [1, 2, 3, 4])
+        self.assertEqual(self.statuses(), ['pending'] * 3)
+
+    def test_non_atomic_batch_saves_the_valid_items(self):
+        items = [{'id': self.tasks[0].id, 'status': 'in_progress'}, {'id': self.other_task.id, 'status': 'in_progress'}]
+        response = self.put(items, atomic='false')
+        self.assertEqual(response.status_code, 200)
+        results = response.json()['results']
+        self.assertTrue(results[0]['updated'])
+        self.assertIn('errors', results[1])
+        self.assertEqual(self.statuses(), ['in_progress', 'pending', 'pending'])
+        self.assertEqual(Task.objects.get(id=self.other_task.id).status, 'pending')
@@ -0,0 +1,99 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase
+from django.utils import timezone
+
+from tasks.changes import encode_cursor, parse_cursor, prune_task_changes
+from tasks.models import TaskChange
+
+from .helpers import api_client, create_account, create_task
+
+
+class TaskChangeFeedTests(TestCase):
+    """
+    GET /api/tasks/changes/ and its tombstones
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = create_account('admin', role='admin')
+        cls.user = create_account('user', admin=cls.admin)
+        cls.other_user = create_account('other_user', admin=cls.admin)
+
+    def setUp(self):
+        self.client = api_client(self.user)
+
+    def cursor(self):
+        return self.client.get('/api/tasks/changes/').json()['cursor']
+
+    def changes(self, cursor, **params):
+        response = self.client.get('/api/tasks/changes/', {'since': cursor, **params})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_created_and_updated_tasks(self):
+        cursor = self.cursor()
+        task = create_task(self.user)
+        task.title = 'Renamed'
+        task.save()
+        data = self.changes(cursor)
+        self.assertEqual([change['id'] for change in data['changes']], [task.id])
+        self.assertEqual(data['changes'][0]['title'], 'Renamed')
+        self.assertEqual(data['deleted'], [])
+        self.assertEqual(self.changes(data['cursor'])['changes'], [])
+
+    def test_deleted_task_leaves_a_tombstone(self):
+        task = create_task(self.user)
+        cursor = self.cursor()
+        task_id = task.id
+        task.delete()
+        data = self.changes(cursor)
+        self.assertEqual((data['changes'], data['deleted']), ([], [task_id]))
+
+    def test_reassigned_task_leaves_a_tombstone_for_the_previous_user(self):
+        task = create_task(self.user)
+        cursor = self.cursor()
+        other_cursor = api_client(self.other_user).get('/api/tasks/changes/').json()['cursor']
+        task.assigned_to = self.other_user
+        task.save()
+        self.assertEqual(self.changes(cursor)['deleted'], [task.id])
+        other = api_client(self.other_user).get('/api/tasks/changes/', {'since': other_cursor}).json()
+        self.assertEqual([change['id'] for change in other['changes']], [task.id])
+
+    def test_tombstones_survive_pruning(self):
+        task = create_task(self.user)
+        cursor = self.cursor()
+        task_id = task.id
+        task.delete()
+        prune_task_changes()
+        self.assertEqual(self.changes(cursor)['deleted'], [task_id])
+
+    def test_paging_keeps_the_issue_time_until_drained(self):
+        cursor = self.cursor()
+        tasks = [create_task(self.user) for _ in range(3)]
+        _, issued_at = parse_cursor(cursor)
+        later = timezone.now() + timedelta(hours=1)
+        with mock.patch('django.utils.timezone.now', return_value=later):
+            first = self.changes(cursor, page_size=2)
+            self.assertTrue(first['has_more'])
+            self.assertEqual(parse_cursor(first['cursor'])[1], issued_at)
+            last = self.changes(first['cursor'], page_size=2)
+        self.assertFalse(last['has_more'])
+        self.assertGreater(parse_cursor(last['cursor'])[1], issued_at)
+        self.assertEqual(
+            [change['id'] for change in first['changes'] + last['changes']], [task.id for task in tasks]
+        )
+
+    def test_expired_and_invalid_cursors(self):
+        old = timezone.now() - timedelta(days=31)
+        response = self.client.get('/api/tasks/changes/', {'since': encode_cursor(0, old)})
+        self.assertEqual(response.status_code, 410)
+        response = self.client.get('/api/tasks/changes/', {'since': 'nonsense'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_changes_of_other_users_are_not_returned(self):
+        cursor = self.cursor()
+        create_task(self.other_user)
+        self.assertEqual(self.changes(cursor)['changes'], [])
+        self.assertFalse(TaskChange.objects.filter(user_id=self.user.id).exists())
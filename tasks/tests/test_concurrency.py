@@ -0,0 +1,53 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import connection
+from django.test import TransactionTestCase, override_settings
+from rest_framework.test import APIClient
+
+from tasks.models import CustomUser, Task
+
+
+WRITERS = 8
+UPDATES = 5
+
+
+@override_settings(JOBS_RUN_INLINE=True)
+class ConcurrentTaskUpdateTests(TransactionTestCase):
+    """
+    Writers on a real database file, each in its own thread and connection
+    """
+
+    def setUp(self):
+        admin = CustomUser.objects.create_user('admin', password='pw', role='admin')
+        self.tasks = []
+        for i in range(WRITERS):
+            user = CustomUser.objects.create_user(f'user{i}', password='pw', role='user', assigned_to_admin=admin)
+            self.tasks.append(Task.objects.create(
+                title=f'Task {i}', description='d', assigned_to=user, created_by=admin, due_date='2026-01-01'
+            ))
+
+    def test_concurrent_updates_do_not_fail(self):
+        start_line = threading.Barrier(WRITERS)
+
+        def writer(task):
+            client = APIClient()
+            client.force_authenticate(task.assigned_to)
+            statuses = []
+            try:
+                start_line.wait()
+                for n in range(UPDATES):
+                    if n % 2:
+                        data = {'status': 'in_progress'}
+                    else:
+                        data = {'status': 'completed', 'completion_report': f'Report {n}', 'worked_hours': '1.5'}
+                    statuses.append(client.put(f'/api/tasks/{task.id}/', data, format='json').status_code)
+            except Exception as e:
+                statuses.append(e)
+            finally:
+                connection.close()
+            return statuses
+
+        with ThreadPoolExecutor(max_workers=WRITERS) as pool:
+            results = list(pool.map(writer, self.tasks))
+        self.assertEqual(results, [[200] * UPDATES] * WRITERS)
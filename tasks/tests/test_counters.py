@@ -0,0 +1,111 @@
+from django.test import TestCase, override_settings
+
+from tasks.counters import find_task_stats_drift
+from tasks.models import Task, UserTaskStats
+from tasks.rollups import find_rollup_drift
+
+from .helpers import api_client, create_account, create_task
+
+
+@override_settings(JOBS_RUN_INLINE=True)
+class CounterAndRollupDriftTests(TestCase):
+    """
+    Every write path keeps the per-user counters and the rollups equal to
+    what the task table says
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = create_account('admin', role='admin')
+        cls.other_admin = create_account('other_admin', role='admin')
+        cls.user = create_account('user', admin=cls.admin)
+        cls.other_user = create_account('other_user', admin=cls.admin)
+
+    def assertNoDrift(self):
+        self.assertEqual(find_task_stats_drift(), {})
+        self.assertEqual(find_rollup_drift(), {})
+
+    def write(self):
+        # Rollup jobs run inline once the write commits
+        return self.captureOnCommitCallbacks(execute=True)
+
+    def test_api_updates(self):
+        with self.write():
+            task = create_task(self.user)
+        client = api_client(self.user)
+        with self.write():
+            response = client.put(
+                f'/api/tasks/{task.id}/',
+                {'status': 'completed', 'completion_report': 'Done', 'worked_hours': '3.50'},
+                format='json',
+            )
+        self.assertEqual(response.status_code, 200)
+        stats = UserTaskStats.objects.get(user=self.user)
+        self.assertEqual((stats.completed_tasks, str(stats.worked_hours)), (1, '3.50'))
+        self.assertNoDrift()
+        with self.write():
+            client.put(f'/api/tasks/{task.id}/', {'status': 'in_progress'}, format='json')
+        self.assertNoDrift()
+
+    def test_model_saves_and_deletes(self):
+        with self.write():
+            task = create_task(self.user, status='completed', completion_report='Done', worked_hours=2)
+        self.assertNoDrift()
+        with self.write():
+            task.worked_hours = 5
+            task.save()
+        self.assertNoDrift()
+        with self.write():
+            task.assigned_to = self.other_user
+            task.save()
+        self.assertNoDrift()
+        with self.write():
+            task.delete()
+        self.assertNoDrift()
+
+    def test_save_of_an_unloaded_task(self):
+        with self.write():
+            task = create_task(self.user, status='completed', completion_report='Done', worked_hours=2)
+        # Loaded without the rollup fields, so the previous state is unknown
+        partial = Task.objects.only('id', 'title', 'assigned_to').get(id=task.id)
+        with self.write():
+            partial.worked_hours = 6
+            partial.save()
+        self.assertEqual(UserTaskStats.objects.get(user=self.user).worked_hours, 6)
+        self.assertNoDrift()
+
+    def test_batch_and_bulk_writes(self):
+        client = api_client(self.admin)
+        items = [
+            {'title': f'Task {i}', 'description': 'd', 'assigned_to': user.id, 'due_date': '2026-01-01'}
+            for i, user in enumerate([self.user, self.other_user] * 3)
+        ]
+        with self.write():
+            response = client.post('/api/tasks/bulk/', items, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertNoDrift()
+        task_ids = list(Task.objects.filter(assigned_to=self.user).values_list('id', flat=True))
+        with self.write():
+            response = api_client(self.user).put(
+                '/api/tasks/batch/',
+                [{'id': task_id, 'status': 'completed', 'completion_report': 'r', 'worked_hours': '1.25'}
+                 for task_id in task_ids],
+                format='json',
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertNoDrift()
+
+    def test_moving_and_deleting_users(self):
+        with self.write():
+            create_task(self.user, status='completed', completion_report='Done', worked_hours=4)
+            create_task(self.other_user, status='completed', completion_report='Done', worked_hours=1)
+        with self.write():
+            self.user.assigned_to_admin = self.other_admin
+            self.user.save()
+        self.assertNoDrift()
+        with self.write():
+            self.user.delete()
+        self.assertNoDrift()
+        with self.write():
+            self.admin.delete()
+        self.assertNoDrift()
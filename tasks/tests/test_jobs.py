@@ -0,0 +1,31 @@
+from unittest import mock
+
+from django.test import TestCase, override_settings
+
+from tasks import jobs
+from tasks.jobs import claim_jobs
+from tasks.models import Job
+
+
+@override_settings(JOBS_QUEUE_CONCURRENCY={'default': 4, 'rollups': 1})
+class ClaimJobsTests(TestCase):
+
+    def setUp(self):
+        for _ in range(3):
+            Job.objects.create(name='apply_rollup_contributions', queue='rollups', payload={'contributions': []})
+
+    def test_claims_up_to_the_queue_concurrency(self):
+        self.assertEqual(len(claim_jobs('rollups', 5, 'worker-a')), 1)
+        self.assertEqual(claim_jobs('rollups', 5, 'worker-b'), [])
+
+    def test_claim_rechecks_jobs_running_since_the_count(self):
+        claim_jobs('rollups', 1, 'worker-a')
+        # worker-b counted the running jobs before worker-a claimed
+        with mock.patch.object(jobs, 'running_jobs', return_value=0):
+            self.assertEqual(claim_jobs('rollups', 1, 'worker-b'), [])
+        self.assertEqual(Job.objects.filter(status='running').count(), 1)
+
+    def test_other_queues_claim_several(self):
+        for _ in range(3):
+            Job.objects.create(name='smoke', queue='default', payload={})
+        self.assertEqual(len(claim_jobs('default', 10, 'worker-a')), 3)
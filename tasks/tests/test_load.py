@@ -0,0 +1,38 @@
+import io
+import logging
+
+from django.core.management import call_command
+from django.test import TransactionTestCase, override_settings
+
+from tasks.management.commands.load_test import (
+    Command as LoadTestCommand, WSGITarget, parse_mix, send_requests, summarize
+)
+from tasks.seeding import SAMPLE_PASSWORD
+
+
+@override_settings(JOBS_RUN_INLINE=True)
+class LoadTestWorkloadTests(TransactionTestCase):
+    """
+    The load_test request mix, token requests and updates included, sent
+    from concurrent client threads: every request must succeed
+    """
+
+    def setUp(self):
+        call_command(
+            'generate_data', superadmins='1', admins='2', users='12', tasks='600', seed=0,
+            password=SAMPLE_PASSWORD, stdout=io.StringIO(),
+        )
+
+    def test_mixed_load_has_no_errors(self):
+        mix = parse_mix('list=5,update=6,report=2,token=1,panel_user=1,panel_admin=1,panel_superadmin=1')
+        options = {'requests': 200, 'accounts': 12, 'seed': 0, 'password': SAMPLE_PASSWORD}
+        requests = LoadTestCommand().build_requests(mix, options)
+        # Failed requests show up in the statuses below
+        request_logger = logging.getLogger('django.request')
+        request_logger.disabled = True
+        try:
+            outcomes = send_requests(WSGITarget(), requests, concurrency=8)
+        finally:
+            request_logger.disabled = False
+        summary = summarize(outcomes, elapsed=1)
+        self.assertEqual(summary['statuses'], {'200': len(requests)})
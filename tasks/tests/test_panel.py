@@ -0,0 +1,51 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from tasks.models import Task
+
+from .helpers import create_account, create_task
+
+
+class SuperadminTaskTableTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.superadmin = create_account('superadmin', role='superadmin')
+        cls.admin = create_account('admin', role='admin')
+        cls.user = create_account('user', admin=cls.admin)
+        for i in range(3):
+            create_task(cls.user, title=f'Invoice {i}')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.superadmin)
+
+    def task_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        table = Task._meta.db_table
+        return response, [query['sql'] for query in queries if f'"{table}"' in query['sql']]
+
+    def test_cached_table_runs_no_task_queries(self):
+        urls = ('/panel/superadmin/tasks/', '/panel/superadmin/tasks/?status=pending', '/panel/superadmin/tasks/?q=invoice')
+        for url in urls:
+            with self.subTest(url=url):
+                response, queries = self.task_queries(url)
+                self.assertContains(response, 'Invoice 0')
+                self.assertTrue(queries)
+                response, queries = self.task_queries(url)
+                self.assertContains(response, 'Invoice 0')
+                self.assertEqual(queries, [])
+
+    def test_task_write_renders_table_again(self):
+        self.task_queries('/panel/superadmin/tasks/')
+        with self.captureOnCommitCallbacks(execute=True):
+            create_task(self.user, title='Fresh task')
+        response, _ = self.task_queries('/panel/superadmin/tasks/')
+        self.assertContains(response, 'Fresh task')
+
+    def test_invalid_cursor_is_not_found(self):
+        response = self.client.get('/panel/superadmin/tasks/?cursor=bogus')
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,46 @@
+from django.core.cache import cache
+from django.template.base import Template
+from django.test import TestCase, override_settings
+from rest_framework.response import Response
+
+from tasks import profiling
+
+from .helpers import api_client, create_account, create_task
+
+
+@override_settings(REQUEST_PROFILING_ENABLED=True, REQUEST_PROFILING_SAMPLE_RATE=0)
+class RequestProfilingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = create_account('admin', role='admin')
+        cls.user = create_account('user', admin=cls.admin)
+        create_task(cls.user)
+
+    def setUp(self):
+        cache.delete(profiling.SWITCH_KEY)
+        profiling._switch = None
+        self.addCleanup(setattr, profiling, '_switch', None)
+
+    def profile(self, client, url):
+        with self.assertLogs('tasks.profiling', 'INFO') as logs:
+            response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Server-Timing', response)
+        return logs.records[-1].profile
+
+    def test_api_request_reports_token_user_and_serialization(self):
+        summary = self.profile(api_client(self.user), '/api/tasks/')
+        self.assertEqual(summary['user_id'], self.user.id)
+        self.assertGreater(summary['serialize_ms'], 0)
+        self.assertEqual(summary['template_ms'], 0)
+
+    def test_panel_request_reports_session_user_and_templates(self):
+        self.client.force_login(self.admin)
+        summary = self.profile(self.client, '/panel/admin/tasks/')
+        self.assertEqual(summary['user_id'], self.admin.id)
+        self.assertGreater(summary['template_ms'], 0)
+
+    def test_rendering_is_not_patched_process_wide(self):
+        self.profile(api_client(self.user), '/api/tasks/')
+        self.assertIsNone(getattr(Template.render, '__wrapped__', None))
+        self.assertIsNone(getattr(Response.rendered_content.fget, '__wrapped__', None))
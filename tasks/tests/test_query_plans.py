@@ -0,0 +1,35 @@
+from django.db import connection
+from django.test import TestCase, skipUnlessDBFeature
+
+from tasks.management.commands.check_query_plans import hot_querysets, plan_issues
+from tasks.models import CustomUser, Job, Task, TaskChange, UserTaskStats
+from tasks.seeding import Seeder
+
+
+# Enough rows for the planner to prefer the indexes it would use in production
+SEED_TASKS = 10000
+
+
+@skipUnlessDBFeature('supports_explaining_query_execution')
+class QueryPlanTests(TestCase):
+    """
+    The hot view querysets of check_query_plans, on a seeded and ANALYZEd database
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        seeder = Seeder()
+        seeder.seed(SEED_TASKS)
+        cls.fixtures = seeder.fixtures()
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def test_hot_querysets_use_indexes(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('The plan checks read SQLite EXPLAIN QUERY PLAN output.')
+        table_names = [model._meta.db_table for model in (CustomUser, Job, Task, TaskChange, UserTaskStats)]
+        for name, queryset, allowed in hot_querysets(self.fixtures):
+            with self.subTest(name):
+                plan = queryset.explain()
+                issues = [detail for kind, detail in plan_issues(plan, table_names) if kind not in allowed]
+                self.assertEqual(issues, [], plan)
@@ -0,0 +1,57 @@
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from tasks.models import CustomUser, Task, TaskRollup
+from tasks.rollups import _apply_deltas, compute_rollups, find_rollup_drift
+
+
+def create_users(admin, count):
+    CustomUser.objects.bulk_create([
+        CustomUser(username=f'user{i}', role='user', assigned_to_admin=admin) for i in range(count)
+    ])
+    return list(CustomUser.objects.filter(role='user').order_by('id'))
+
+
+@override_settings(JOBS_RUN_INLINE=True)
+class RollupUpdateTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = CustomUser.objects.create_user('admin', password='pw', role='admin')
+
+    def test_bulk_create_for_many_users_keeps_rollups_in_sync(self):
+        users = create_users(self.admin, 400)
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        items = [
+            {
+                'title': f'Task {i}', 'description': 'd', 'assigned_to': user.id, 'due_date': '2026-01-01',
+                'status': 'completed', 'completion_report': 'done', 'worked_hours': f'{1 + i % 7}.25',
+            }
+            for i, user in enumerate(users)
+        ]
+        with self.captureOnCommitCallbacks(execute=True):
+            response = client.post('/api/tasks/bulk/', items, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(find_rollup_drift(), {})
+        self.assertEqual(TaskRollup.objects.filter(scope='user').count(), 3 * len(users))
+
+    def test_deltas_for_thousands_of_buckets(self):
+        users = create_users(self.admin, 1000)
+        start = timezone.make_aware(datetime(2026, 3, 2, 12))
+        Task.objects.bulk_create([
+            Task(
+                title='t', description='d', assigned_to=user, due_date=start.date(), status='completed',
+                worked_hours=Decimal('2.00'), completed_at=start + timedelta(days=day),
+            )
+            for user in users
+            for day in range(3)
+        ])
+        rollups = compute_rollups()
+        self.assertGreater(len(rollups), 3000)
+        _apply_deltas(rollups)
+        self.assertEqual(find_rollup_drift(), {})
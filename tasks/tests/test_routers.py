@@ -0,0 +1,26 @@
+from unittest import mock
+
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from tasks.models import CustomUser, Task, UserTaskStats
+from tasks.routers import PRIMARY, PrimaryReplicaRouter, RequestRouting, current_request
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+@mock.patch('tasks.routers.healthy_replicas', return_value=['replica'])
+class RouterTests(SimpleTestCase):
+    def setUp(self):
+        self.router = PrimaryReplicaRouter()
+        token = current_request.set(RequestRouting(RequestFactory().get('/api/tasks/')))
+        self.addCleanup(current_request.reset, token)
+
+    def test_task_reads_use_replica(self, healthy_replicas):
+        self.assertEqual(self.router.db_for_read(Task), 'replica')
+
+    def test_account_and_stats_reads_use_primary(self, healthy_replicas):
+        self.assertEqual(self.router.db_for_read(CustomUser), PRIMARY)
+        self.assertEqual(self.router.db_for_read(UserTaskStats), PRIMARY)
+
+    def test_reads_after_write_use_primary(self, healthy_replicas):
+        self.assertEqual(self.router.db_for_write(Task), PRIMARY)
+        self.assertEqual(self.router.db_for_read(Task), PRIMARY)
@@ -0,0 +1,39 @@
+from django.test import TestCase, override_settings
+
+from tasks.models import Task
+from tasks.search import search_tasks
+
+from .helpers import create_account, create_task
+
+
+class SearchTasksTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_account('user')
+        cls.other_user = create_account('other_user')
+        cls.in_description = create_task(cls.user, title='Quarterly report', description='Send the invoice')
+        cls.in_title = create_task(cls.user, title='Invoice run', description='Monthly')
+        cls.unrelated = create_task(cls.user, title='Deploy', description='Release')
+        cls.other_users = create_task(cls.other_user, title='Invoice', description='Other user')
+
+    def search(self, tasks, query, user_ids=None):
+        tasks, ranked = search_tasks(tasks, query, user_ids)
+        return [task.id for task in tasks], ranked
+
+    def test_ranks_title_matches_first(self):
+        ids, ranked = self.search(Task.objects.filter(assigned_to=self.user), 'invoice', [self.user.id])
+        self.assertTrue(ranked)
+        self.assertEqual(ids, [self.in_title.id, self.in_description.id])
+
+    def test_requires_every_term(self):
+        ids, _ = self.search(Task.objects.all(), 'invoice monthly')
+        self.assertEqual(ids, [self.in_title.id])
+
+    @override_settings(TASKS_SEARCH_RANK_LIMIT=1)
+    def test_many_matches_are_newest_first(self):
+        ids, ranked = self.search(Task.objects.all(), 'invoice')
+        self.assertFalse(ranked)
+        self.assertEqual(ids, [self.other_users.id, self.in_title.id, self.in_description.id])
+
+    def test_no_terms_match_nothing(self):
+        self.assertEqual(self.search(Task.objects.all(), '"*'), ([], True))